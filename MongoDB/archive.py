@@ -0,0 +1,167 @@
+"""
+Hot/cold tiering: move posts older than a cutoff, with their likes, from posts
+and post_likes into posts_archive and post_likes_archive.
+
+Every batch takes the oldest posts below the cutoff (created_at index) and
+  1. copies them into posts_archive, marked likes_pending,
+  2. deletes them from posts, unless they were edited since the copy (their
+     copies are dropped again, the next batch retries them),
+  3. moves the likes of the posts that left posts into post_likes_archive and
+     recounts posts_archive.likes from them, which also covers likes added
+     during the move.
+Each step is idempotent. A run first finishes the likes of posts left
+likes_pending by an interrupted run.
+
+MongoPostsRepository falls back to the archive for id lookups and deep profile
+pages, so reads keep working while the job runs.
+
+Run periodically, e.g. nightly:
+    python -m MongoDB.archive --max-age-days 365 --batch-size 500
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, DeleteOne, ReplaceOne, UpdateOne, errors
+from pymongo.collection import Collection
+from pymongo.cursor import Cursor
+
+from MongoDB.mongo_repo import MongoPostsRepository
+from src.instrumentation import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+
+class PostArchiver:
+    def __init__(
+        self,
+        repo: MongoPostsRepository,
+        max_age: timedelta = timedelta(days=365),
+        batch_size: int = 500,
+        pause: float = 0.1,
+    ):
+        """
+        :param max_age: posts created longer ago than this are archived
+        :param batch_size: posts (and likes) moved per bulk write
+        :param pause: seconds to sleep between batches, to leave room for the live load
+        """
+        self.repo = repo
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        return (now or datetime.now(timezone.utc)) - self.max_age
+
+    def archive(self, cutoff: Optional[datetime] = None, max_batches: Optional[int] = None) -> int:
+        """Archive every post created before cutoff. :return: number of posts archived"""
+        cutoff = cutoff or self.cutoff()
+        self.finish_pending()
+        total = batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = self.archive_batch(cutoff)
+            total += moved
+            batches += 1
+            if moved == 0:
+                break
+            time.sleep(self.pause)
+        logger.info("✅ Archived %s post(s) created before %s", total, cutoff.isoformat())
+        return total
+
+    @staticmethod
+    def oldest_cursor(posts: Collection, cutoff: datetime, limit: int) -> Cursor:
+        """The oldest posts created before cutoff, through the created_at index."""
+        return posts.find({"created_at": {"$lt": cutoff}}).sort("created_at", ASCENDING).limit(limit)
+
+    def archive_batch(self, cutoff: datetime) -> int:
+        """Move the oldest batch_size posts created before cutoff. :return: number of posts moved"""
+        docs = list(self.oldest_cursor(self.repo.posts, cutoff, self.batch_size))
+        if not docs:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        self.repo.archived_posts.bulk_write(
+            [ReplaceOne({"_id": d["_id"]}, {**d, "archived_at": now, "likes_pending": True}, upsert=True) for d in docs],
+            ordered=False,
+        )
+        self.repo.posts.bulk_write(
+            [DeleteOne({"_id": d["_id"], "updated_at": d.get("updated_at")}) for d in docs],
+            ordered=False,
+        )
+        return self._settle([d["_id"] for d in docs])
+
+    def finish_pending(self) -> None:
+        """Complete the posts an interrupted run left likes_pending."""
+        while True:
+            ids = [d["_id"] for d in self.repo.archived_posts.find({"likes_pending": True}, {"_id": 1}).limit(self.batch_size)]
+            if not ids:
+                return
+            self._settle(ids)
+
+    def _settle(self, post_ids: List[ObjectId]) -> int:
+        """Drop the copies of posts that are still hot, move the likes of the others. :return: posts moved"""
+        still_hot = {d["_id"] for d in self.repo.posts.find({"_id": {"$in": post_ids}}, {"_id": 1})}
+        if still_hot:
+            self.repo.archived_posts.delete_many({"_id": {"$in": list(still_hot)}, "likes_pending": True})
+        moved = [oid for oid in post_ids if oid not in still_hot]
+        if moved:
+            self._move_likes(moved)
+        return len(moved)
+
+    def _move_likes(self, post_ids: List[ObjectId]) -> None:
+        while True:
+            likes = list(self.repo.likes.find({"post_id": {"$in": post_ids}}).limit(self.batch_size))
+            if not likes:
+                break
+            try:
+                self.repo.archived_likes.bulk_write(
+                    [UpdateOne({"post_id": l["post_id"], "user_id": l["user_id"]}, {"$setOnInsert": l}, upsert=True)
+                     for l in likes],
+                    ordered=False,
+                )
+            except errors.BulkWriteError as e:
+                # concurrent upserts of the same like, the archive has it either way
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+            self.repo.likes.delete_many({"_id": {"$in": [l["_id"] for l in likes]}})
+
+        counts: Dict[ObjectId, int] = {
+            d["_id"]: int(d["count"])
+            for d in self.repo.archived_likes.aggregate([
+                {"$match": {"post_id": {"$in": post_ids}}},
+                {"$group": {"_id": "$post_id", "count": {"$sum": 1}}},
+            ])
+        }
+        self.repo.archived_posts.bulk_write(
+            [UpdateOne({"_id": oid}, {"$set": {"likes": counts.get(oid, 0)}, "$unset": {"likes_pending": ""}})
+             for oid in post_ids],
+            ordered=False,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move old posts and their likes into the archive collections.")
+    parser.add_argument("--max-age-days", type=float, default=365.0)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds between batches")
+    parser.add_argument("--max-batches", type=int, default=None, help="stop after this many batches")
+    args = parser.parse_args()
+
+    from src.resources import get_registry
+
+    configure_logging()
+    archiver = PostArchiver(
+        MongoPostsRepository(get_registry().mongo_db()),
+        max_age=timedelta(days=args.max_age_days),
+        batch_size=args.batch_size,
+        pause=args.pause,
+    )
+    archiver.archive(max_batches=args.max_batches)
+
+
+if __name__ == "__main__":
+    main()
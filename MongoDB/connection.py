@@ -1,20 +1,72 @@
-import os
-from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient, monitoring
+from src.config import get_settings
+from src.instrumentation import get_logger, instrumentation
 
+logger = get_logger(__name__)
+
+
+class CommandTimer(monitoring.CommandListener):
+    """
+    Command listener that reports the latency, errors and returned documents of
+    every MongoDB command to instrumentation, keyed "<command> <collection>".
+    """
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        if not instrumentation.enabled:
+            return
+        target = event.command.get("collection") if event.command_name == "getMore" else event.command.get(event.command_name)
+        name = f"{event.command_name} {target}" if isinstance(target, str) else event.command_name
+        self._pending[(event.connection_id, event.request_id)] = name
+
+    def succeeded(self, event):
+        name = self._pending.pop((event.connection_id, event.request_id), None)
+        if name is None:
+            return
+        reply = event.reply
+        cursor = reply.get("cursor")
+        if cursor is not None:
+            rows = len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+        else:
+            rows = reply.get("n")
+        instrumentation.record("mongo", name, event.duration_micros / 1e6, rows=rows)
+
+    def failed(self, event):
+        name = self._pending.pop((event.connection_id, event.request_id), None)
+        if name is None:
+            return
+        instrumentation.record("mongo", name, event.duration_micros / 1e6, error=True)
 
-def get_mongo_client():
 
-    # Load environment file
-    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'), override=True)
+def _with_listener(pool_options):
+    listeners = list(pool_options.pop("event_listeners", []))
+    listeners.append(CommandTimer())
+    return {**pool_options, "event_listeners": listeners}
 
-    # Gather variables (no defaults)
-    MONGO_HOST = os.getenv("MONGO_HOST")
-    MONGO_PORT = os.getenv("MONGO_PORT")
-    MONGO_USER = os.getenv("MONGO_INITDB_ROOT_USERNAME")
-    MONGO_PASSWORD = os.getenv("MONGO_INITDB_ROOT_PASSWORD")
 
-    mongo_uri = f"mongodb://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_HOST}:{MONGO_PORT}/admin"
-    print(f"Connecting to {mongo_uri}")
-    client = MongoClient(mongo_uri)
-    return client
\ No newline at end of file
+def _mongo_uri():
+    settings = get_settings()
+    logger.debug("Connecting to MongoDB at %s:%s", settings.mongo_host, settings.mongo_port)
+    return settings.mongo_uri
+
+
+def create_mongo_client(**pool_options):
+    """
+    Create a new MongoClient. pool_options are passed through to MongoClient
+    (maxPoolSize, minPoolSize, maxIdleTimeMS, ...).
+    Use get_mongo_client() to share the pooled client of this process instead.
+    """
+    return MongoClient(_mongo_uri(), **_with_listener(pool_options))
+
+
+def create_async_mongo_client(**pool_options):
+    """Create a new AsyncMongoClient for asyncio code, same options as create_mongo_client."""
+    return AsyncMongoClient(_mongo_uri(), **_with_listener(pool_options))
+
+
+def get_mongo_client():
+    """The pooled MongoClient shared by this process."""
+    from src.resources import get_registry
+    return get_registry().mongo_client()
@@ -10,6 +10,9 @@ from pymongo.errors import BulkWriteError
 
 from MongoDB.connection import get_mongo_client
 from MongoDB.mongo_repo import MongoPostsRepository
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
 
 DB_NAME = "appdb"
 POSTS_COLL = "posts"
@@ -53,7 +56,7 @@ def initialize_likes():
 
     existing_like_count = repo.likes.estimated_document_count()
     if existing_like_count > 0:
-        print(f"Database already has {existing_like_count} likes, skipping seeding.")
+        logger.info("Database already has %s likes, skipping seeding.", existing_like_count)
         return
 
     # Stream post ids to avoid loading everything in memory
@@ -81,12 +84,12 @@ def initialize_likes():
                 created_for_post += 1
                 total_created += 1
 
-    print(f"Prepared ~{total_planned} likes, actually created {total_created}. Duplicates were skipped by add_like.")
+    logger.info("Prepared ~%s likes, actually created %s. Duplicates were skipped by add_like.", total_planned, total_created)
 
     # Safety pass to ensure counters match reality if any drift occurred
     # This is optional since add_like already increments posts.likes.
     sync_like_counters(db)
-    print("Like counters synced to posts.likes.")
+    logger.info("Like counters synced to posts.likes.")
 
 def sync_like_counters(db):
     """
@@ -118,7 +121,7 @@ def initialize_posts_col():
     # Skip import if posts already exist
     db_initialized = repo.db_initialized()
     if db_initialized :
-        print(f"Database already initialized — skipping import.")
+        logger.info("Database already initialized — skipping import.")
         return
 
     # Load JSON
@@ -126,7 +129,7 @@ def initialize_posts_col():
         data = json.load(f)
 
 
-    print(f"Loading {len(data)} posts from {FILE_PATH}...")
+    logger.info("Loading %s posts from %s...", len(data), FILE_PATH)
     inserted_count = 0
 
     for post in data:
@@ -139,6 +142,6 @@ def initialize_posts_col():
             )
             inserted_count += 1
         except Exception as e:
-            print(f"Skipping post '{post.get('title', 'unknown')}' — error: {e}")
+            logger.warning("Skipping post '%s' — error: %s", post.get('title', 'unknown'), e)
 
-    print(f"Inserted {inserted_count} posts into '{DB_NAME}.{POSTS_COLL}'")
\ No newline at end of file
+    logger.info("Inserted %s posts into '%s.%s'", inserted_count, DB_NAME, POSTS_COLL)
\ No newline at end of file
@@ -1,14 +1,18 @@
 # repositories/mongo_posts.py
 from __future__ import annotations
-from typing import List, Optional, Dict, Any
+import heapq
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timezone
 
 from pymongo.database import Database
 from pymongo.collection import Collection
+from pymongo.cursor import Cursor
 from pymongo import ASCENDING, DESCENDING, ReturnDocument, errors
 from bson import ObjectId
 
+from MongoDB.view_counter import ViewCounter
+
 UserId = int
 
 @dataclass(frozen=True)
@@ -43,16 +47,40 @@ class MongoPostsRepository:
     Collections
       - posts: one document per post
       - post_likes: one document per (post_id, user_id)
+      - post_views: one HyperLogLog sketch of distinct viewers per post (see ViewCounter)
+      - posts_archive, post_likes_archive: posts older than the archive cutoff and
+        their likes, moved there by MongoDB/archive.py so the indexes of posts and
+        post_likes only cover recent data and stay in memory
 
     Field types
       - posts.user_id: int  (matches SQL users.id)
       - post_likes.user_id: int
+
+    Id lookups, likes, edits, deletes and profile pages fall back to the archive
+    when a post is not in posts. News feeds and the like aggregations only read
+    the hot collections.
+
+    The filters and updates of the writes (owner_query, edit_update, like_upsert,
+    TIERS) and the hot reads (posts_cursor, affinity_pipeline) are static so
+    AsyncTopJodelBackend runs the same queries on its async collections and
+    src/plan_guardrails.py explains exactly these queries.
     """
 
+    # (posts, likes) collection names, hot tier first
+    TIERS = (("posts", "post_likes"), ("posts_archive", "post_likes_archive"))
+    NEWEST_FIRST = [("created_at", DESCENDING)]
+    # MongoDB merges the index ranges of an $in in sort order (SORT_MERGE) only up to
+    # 200 values, beyond that it sorts every matching post in memory
+    FEED_CHUNK = 200
+
     def __init__(self, db: Database):
         self.db: Database = db
-        self.posts: Collection = self.db["posts"]
-        self.likes: Collection = self.db["post_likes"]
+        (posts, likes), (archived_posts, archived_likes) = self.TIERS
+        self.posts: Collection = self.db[posts]
+        self.likes: Collection = self.db[likes]
+        self.archived_posts: Collection = self.db[archived_posts]
+        self.archived_likes: Collection = self.db[archived_likes]
+        self.view_counter = ViewCounter(self.db)
         self._ensure_indexes()
 
     def _ensure_indexes(self) -> None:
@@ -63,6 +91,11 @@ class MongoPostsRepository:
         # likes
         self.likes.create_index([("post_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
         self.likes.create_index([("post_id", ASCENDING)])
+        self.likes.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        # archive: only id lookups and deep profile pages read it
+        self.archived_posts.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        self.archived_posts.create_index([("likes_pending", ASCENDING)], partialFilterExpression={"likes_pending": True})
+        self.archived_likes.create_index([("post_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
 
         # Schema validation - user_id must be int
         try:
@@ -98,6 +131,101 @@ class MongoPostsRepository:
         except Exception as e:
             raise PostNotFound("invalid post id") from e
 
+    @staticmethod
+    def owner_query(oid: ObjectId, user_id: Optional[UserId]) -> Dict[str, Any]:
+        """Filter on the post, and on its owner unless user_id is None."""
+        query: Dict[str, Any] = {"_id": oid}
+        if user_id is not None:
+            query["user_id"] = int(user_id)
+        return query
+
+    @staticmethod
+    def edit_update(title: Optional[str] = None, text: Optional[str] = None,
+                    topics: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """The update of an edit, None when no field is given."""
+        to_set: Dict[str, Any] = {}
+        if title is not None:
+            to_set["title"] = title
+        if text is not None:
+            to_set["text"] = text
+        if topics is not None:
+            to_set["topics"] = list(dict.fromkeys(topics))
+        if not to_set:
+            return None
+        return {"$set": {**to_set, "updated_at": datetime.now(timezone.utc)}}
+
+    @staticmethod
+    def like_upsert(oid: ObjectId, user_id: UserId) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """(filter, update) of the idempotent like upsert, one document per (post_id, user_id)."""
+        return (
+            {"post_id": oid, "user_id": int(user_id)},
+            {"$setOnInsert": {"post_id": oid, "user_id": int(user_id), "created_at": datetime.now(timezone.utc)}},
+        )
+
+    @staticmethod
+    def likes_query(oid: ObjectId) -> Dict[str, Any]:
+        """Filter on the likes of a post."""
+        return {"post_id": oid}
+
+    @staticmethod
+    def user_posts_query(user_ids: List[UserId]) -> Dict[str, Any]:
+        """Filter on the posts of one or several users."""
+        ids = [int(u) for u in user_ids]
+        return {"user_id": ids[0]} if len(ids) == 1 else {"user_id": {"$in": ids}}
+
+    @staticmethod
+    def posts_cursor(posts: Collection, user_ids: List[UserId], limit: int, skip: int = 0) -> Cursor:
+        """Posts of user_ids in posts or posts_archive, newest first, through the (user_id, created_at) index."""
+        return posts.find(MongoPostsRepository.user_posts_query(user_ids)).sort(
+            MongoPostsRepository.NEWEST_FIRST).skip(skip).limit(limit)
+
+    @staticmethod
+    def feed_chunks(user_ids: List[UserId]) -> List[List[UserId]]:
+        """user_ids split into $in lists MongoDB still merges in created_at order."""
+        ids = [int(u) for u in user_ids]
+        chunk = MongoPostsRepository.FEED_CHUNK
+        return [ids[i:i + chunk] for i in range(0, len(ids), chunk)]
+
+    @staticmethod
+    def merge_newest(pages: List[List[Dict[str, Any]]], limit: int, skip: int = 0) -> List[Dict[str, Any]]:
+        """Merge newest-first pages of post documents, then skip and limit."""
+        merged = heapq.merge(*pages, key=lambda d: d["created_at"], reverse=True)
+        return [d for i, d in enumerate(merged) if i >= skip][:limit]
+
+    @staticmethod
+    def affinity_pipeline(user_id: UserId, recent: int = 500) -> List[Dict[str, Any]]:
+        """Author and topic of the `recent` latest posts user_id liked, see like_affinity."""
+        return [
+            {"$match": {"user_id": int(user_id)}},
+            {"$sort": {"created_at": DESCENDING}},
+            {"$limit": int(recent)},
+            {"$lookup": {"from": "posts", "localField": "post_id", "foreignField": "_id", "as": "post"}},
+            {"$unwind": "$post"},
+            {"$project": {"_id": 0, "author": "$post.user_id", "topics": "$post.topics"}},
+        ]
+
+    def _find_post(self, oid: ObjectId, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """The post document from posts, or from posts_archive once it was archived."""
+        query = self.owner_query(oid, None)
+        doc = self.posts.find_one(query, projection)
+        if doc is None:
+            doc = self.archived_posts.find_one(query, projection)
+        return doc
+
+    def _missing(self, oid: ObjectId, user_id: Optional[UserId]) -> Exception:
+        """The error for a write on oid that matched no post."""
+        if user_id is not None and self._find_post(oid, {"_id": 1}):
+            return NotOwner("user is not the owner of the post")
+        return PostNotFound("post not found")
+
+    def _update_post(self, oid: ObjectId, user_id: Optional[UserId], update: Dict[str, Any]) -> Post:
+        query = self.owner_query(oid, user_id)
+        for posts in (self.posts, self.archived_posts):
+            doc = posts.find_one_and_update(query, update, return_document=ReturnDocument.AFTER)
+            if doc:
+                return Post.from_doc(doc)
+        raise self._missing(oid, user_id)
+
     # CRUD
     def create_post(self, user_id: UserId, title: str, text: str, topics: Optional[List[str]] = None) -> str:
         now = datetime.now(timezone.utc)
@@ -115,19 +243,18 @@ class MongoPostsRepository:
 
     def delete_post(self, post_id: str, user_id: Optional[UserId] = None) -> bool:
         oid = self._oid(post_id)
-        query: Dict[str, Any] = {"_id": oid}
-        if user_id is not None:
-            query["user_id"] = int(user_id)
+        query = self.owner_query(oid, user_id)
 
-        res = self.posts.delete_one(query)
-        if res.deleted_count == 0:
-            if user_id is not None:
-                exists = self.posts.find_one({"_id": oid}, {"_id": 1, "user_id": 1})
-                if exists:
-                    raise NotOwner("user is not the owner of the post")
-            raise PostNotFound("post not found")
+        # both tiers: a post being archived can be in both for a moment
+        deleted = 0
+        for posts, likes in ((self.posts, self.likes), (self.archived_posts, self.archived_likes)):
+            if posts.delete_one(query).deleted_count:
+                likes.delete_many(self.likes_query(oid))
+                deleted += 1
+        if not deleted:
+            raise self._missing(oid, user_id)
 
-        self.likes.delete_many({"post_id": oid})
+        self.view_counter.discard(oid)
         return True
 
     def edit_post(
@@ -139,57 +266,46 @@ class MongoPostsRepository:
         text: Optional[str] = None,
     ) -> Post:
         oid = self._oid(post_id)
-        to_set: Dict[str, Any] = {}
-        if title is not None:
-            to_set["title"] = title
-        if text is not None:
-            to_set["text"] = text
-        if not to_set:
-            doc = self.posts.find_one({"_id": oid})
+        update = self.edit_update(title=title, text=text)
+        if update is None:
+            doc = self._find_post(oid)
             if not doc:
                 raise PostNotFound("post not found")
             return Post.from_doc(doc)
 
-        query: Dict[str, Any] = {"_id": oid}
-        if user_id is not None:
-            query["user_id"] = int(user_id)
-
-        doc = self.posts.find_one_and_update(
-            query,
-            {"$set": {**to_set, "updated_at": datetime.now(timezone.utc)}},
-            return_document=ReturnDocument.AFTER,
-        )
-        if not doc:
-            if user_id is not None:
-                exists = self.posts.find_one({"_id": oid}, {"_id": 1, "user_id": 1})
-                if exists:
-                    raise NotOwner("user is not the owner of the post")
-            raise PostNotFound("post not found")
-        return Post.from_doc(doc)
+        return self._update_post(oid, user_id, update)
 
     def get_posts_by_user(self, user_id: UserId, limit: int = 20, skip: int = 0) -> List[Post]:
-        cursor = self.posts.find({"user_id": int(user_id)}).sort("created_at", DESCENDING).skip(skip).limit(limit)
-        return [Post.from_doc(d) for d in cursor]
+        """
+        Posts of a user, newest first. Archived posts are older than every hot
+        post, so pages past the user's hot posts continue in posts_archive.
+        """
+        docs = list(self.posts_cursor(self.posts, [user_id], limit, skip))
+        if len(docs) < limit:
+            hot_total = (skip + len(docs) if docs or not skip
+                         else self.posts.count_documents(self.user_posts_query([user_id])))
+            seen = {d["_id"] for d in docs}     # a post being archived can be in both for a moment
+            archived = self.posts_cursor(self.archived_posts, [user_id], limit - len(docs), max(0, skip - hot_total))
+            docs.extend(d for d in archived if d["_id"] not in seen)
+        return [Post.from_doc(d) for d in docs]
+
+    def get_posts_by_users(self, user_ids: List[UserId], limit: int = 20, skip: int = 0) -> List[Post]:
+        """
+        Latest posts of several users merged into one list, newest first.
+        Every FEED_CHUNK users are read with one query that the (user_id, created_at)
+        index serves as a merge of per-user ranges, and the newest skip + limit
+        posts of each chunk are merged here.
+        """
+        chunks = self.feed_chunks(user_ids)
+        if len(chunks) <= 1:
+            return [Post.from_doc(d) for d in self.posts_cursor(self.posts, user_ids, limit, skip)] if chunks else []
+        pages = [list(self.posts_cursor(self.posts, chunk, skip + limit)) for chunk in chunks]
+        return [Post.from_doc(d) for d in self.merge_newest(pages, limit, skip)]
 
     # Topics
     def update_topics(self, post_id: str, user_id: Optional[UserId], topics: List[str]) -> Post:
         oid = self._oid(post_id)
-        query: Dict[str, Any] = {"_id": oid}
-        if user_id is not None:
-            query["user_id"] = int(user_id)
-
-        doc = self.posts.find_one_and_update(
-            query,
-            {"$set": {"topics": list(dict.fromkeys(topics)), "updated_at": datetime.now(timezone.utc)}},
-            return_document=ReturnDocument.AFTER,
-        )
-        if not doc:
-            if user_id is not None:
-                exists = self.posts.find_one({"_id": oid}, {"_id": 1, "user_id": 1})
-                if exists:
-                    raise NotOwner("user is not the owner of the post")
-            raise PostNotFound("post not found")
-        return Post.from_doc(doc)
+        return self._update_post(oid, user_id, self.edit_update(topics=topics))
 
     # Likes
     def add_like(self, post_id: str, user_id: UserId) -> bool:
@@ -201,47 +317,116 @@ class MongoPostsRepository:
         """
         oid = self._oid(post_id)
         try:
-            res = self.likes.update_one(
-                {"post_id": oid, "user_id": int(user_id)},
-                {"$setOnInsert": {
-                    "post_id": oid,
-                    "user_id": int(user_id),
-                    "created_at": datetime.now(timezone.utc)
-                }},
-                upsert=True,
-            )
+            res = self.likes.update_one(*self.like_upsert(oid, user_id), upsert=True)
         except errors.DuplicateKeyError:
             return False
 
         created = res.upserted_id is not None
-        if created:
-            self.posts.update_one({"_id": oid}, {"$inc": {"likes": 1}})
+        if created and not self.posts.update_one({"_id": oid}, {"$inc": {"likes": 1}}).matched_count:
+            return self._add_archived_like(oid, int(user_id))
         return created
 
+    def _add_archived_like(self, oid: ObjectId, user_id: UserId) -> bool:
+        """add_like on a post that is not in posts: move the new like next to the archived post."""
+        if self.archived_posts.find_one({"_id": oid}, {"_id": 1}) is None:
+            return True     # unknown post, keep the like as before
+        like = self.likes.find_one_and_delete({"post_id": oid, "user_id": user_id})
+        if like is None:
+            return False
+        try:
+            res = self.archived_likes.update_one(
+                {"post_id": oid, "user_id": user_id}, {"$setOnInsert": like}, upsert=True,
+            )
+        except errors.DuplicateKeyError:
+            return False
+        if res.upserted_id is None:
+            return False
+        self.archived_posts.update_one({"_id": oid}, {"$inc": {"likes": 1}})
+        return True
+
     def get_like_count(self, post_id: str) -> int:
         oid = self._oid(post_id)
-        doc = self.posts.find_one({"_id": oid}, {"likes": 1})
+        posts, likes = self.posts, self.likes
+        doc = posts.find_one({"_id": oid}, {"likes": 1})
+        if doc is None:
+            archived = self.archived_posts.find_one({"_id": oid}, {"likes": 1})
+            if archived is not None:
+                doc, posts, likes = archived, self.archived_posts, self.archived_likes
         if doc and "likes" in doc:
             return int(doc.get("likes", 0))
-        cnt = self.likes.count_documents({"post_id": oid})
-        self.posts.update_one({"_id": oid}, {"$set": {"likes": int(cnt)}})
+        cnt = likes.count_documents(self.likes_query(oid))
+        posts.update_one({"_id": oid}, {"$set": {"likes": int(cnt)}})
         return int(cnt)
 
+    def liked_topics_by_user(self) -> Iterator[Tuple[UserId, str, int]]:
+        """
+        Count, per user, how many liked posts carry each topic.
+        :return: iterator of (user_id, topic, count)
+        """
+        cursor = self.likes.aggregate([
+            {"$lookup": {
+                "from": "posts",
+                "localField": "post_id",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"_id": 0, "topics": 1}}],
+                "as": "post",
+            }},
+            {"$unwind": "$post"},
+            {"$unwind": "$post.topics"},
+            {"$group": {"_id": {"user_id": "$user_id", "topic": "$post.topics"}, "count": {"$sum": 1}}},
+        ], allowDiskUse=True)
+        for doc in cursor:
+            yield int(doc["_id"]["user_id"]), doc["_id"]["topic"], int(doc["count"])
+
+    def like_affinity(self, user_id: UserId, recent: int = 500) -> Tuple[Dict[UserId, int], Dict[str, int]]:
+        """
+        How often user_id liked each author and each topic, over its `recent` latest likes.
+        :return: ({author_id: likes}, {topic: likes})
+        """
+        cursor = self.likes.aggregate(self.affinity_pipeline(user_id, recent))
+        authors: Dict[UserId, int] = {}
+        topics: Dict[str, int] = {}
+        for doc in cursor:
+            authors[int(doc["author"])] = authors.get(int(doc["author"]), 0) + 1
+            for topic in doc.get("topics") or []:
+                topics[topic] = topics.get(topic, 0) + 1
+        return authors, topics
+
+    # Views
+    def record_views(self, post_ids: List[str], viewer_id: UserId) -> None:
+        """
+        Count viewer_id as a viewer of the posts. Views are kept in per-post
+        HyperLogLog sketches and written to post_views periodically (see ViewCounter).
+        """
+        self.view_counter.record_views([self._oid(p) for p in post_ids], int(viewer_id))
+
+    def get_view_count(self, post_id: str) -> int:
+        """Estimated number of distinct viewers of a post (about 1.6% standard error)."""
+        return self.view_counter.get_view_count(self._oid(post_id))
+
+    def flush_views(self) -> int:
+        """Write pending view sketches now. :return: number of posts written"""
+        return self.view_counter.flush()
+
+    def stop_views(self) -> int:
+        """Stop the background view flusher and write pending sketches. :return: number of posts written"""
+        return self.view_counter.stop()
+
     def get_post_by_id(self, post_id: str) -> Post:
         """
         Fetch a single post by its Mongo ObjectId string.
         Raises PostNotFound if not found.
         """
         oid = self._oid(post_id)
-        doc = self.posts.find_one({"_id": oid})
+        doc = self._find_post(oid)
         if not doc:
             raise PostNotFound(f"post {post_id} not found")
         return Post.from_doc(doc)
 
     def db_initialized(self) -> bool:
         """
-        Check if the posts collection has any documents.
+        Check if the posts collection (or its archive) has any documents.
         :return: True if there is at least one post, False otherwise.
         """
-        count = self.posts.estimated_document_count()
+        count = self.posts.estimated_document_count() or self.archived_posts.estimated_document_count()
         return count > 0
\ No newline at end of file
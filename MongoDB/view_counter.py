@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import Binary, ObjectId
+from pymongo import UpdateOne, errors
+from pymongo.database import Database
+
+from MongoDB.hyperloglog import HyperLogLog, hash64
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+
+class ViewCounter:
+    """
+    Approximate unique viewers per post.
+
+    record_views() only updates in-memory HyperLogLog sketches of the posts. A
+    daemon thread, started by the first record_views(), merges the pending
+    sketches into the stored ones in the `post_views` collection every
+    flush_interval seconds (or on an explicit flush()):
+      - post_views: {_id: <post ObjectId>, hll: <binary sketch>, version: <int>, updated_at}
+
+    A flush reads the stored sketches of all pending posts with one find and
+    writes them back with one unordered bulk write. Merging is a register-wise
+    max, so flushes from several processes combine correctly. Every write is an
+    upsert conditioned on the version it read: when another process wrote the
+    post in between, the upsert collides with the existing _id and only those
+    posts are read and merged again.
+    """
+
+    MAX_RETRIES = 5
+
+    def __init__(self, db: Database, p: int = 12, flush_interval: float = 10.0):
+        self.views = db["post_views"]
+        self.p = p
+        self.flush_interval = flush_interval
+        self._pending: Dict[ObjectId, HyperLogLog] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record_views(self, post_ids: Iterable[Any], viewer_id: Any) -> None:
+        """Count viewer_id as a viewer of every post in post_ids."""
+        h = hash64(viewer_id)
+        with self._lock:
+            for post_id in post_ids:
+                oid = post_id if isinstance(post_id, ObjectId) else ObjectId(str(post_id))
+                sketch = self._pending.get(oid)
+                if sketch is None:
+                    sketch = self._pending[oid] = HyperLogLog(self.p)
+                sketch.add_hash(h)
+        if self._thread is None:
+            self.start()
+
+    def get_view_count(self, post_id: Any) -> int:
+        """Estimated number of distinct viewers, including views not flushed yet."""
+        oid = post_id if isinstance(post_id, ObjectId) else ObjectId(str(post_id))
+        doc = self.views.find_one({"_id": oid}, {"hll": 1})
+        sketch = HyperLogLog.from_bytes(doc["hll"]) if doc else HyperLogLog(self.p)
+        with self._lock:
+            pending = self._pending.get(oid)
+            if pending is not None:
+                sketch.merge(pending)
+        return sketch.count()
+
+    def flush(self) -> int:
+        """Merge all pending sketches into post_views. :return: number of posts written"""
+        if not self._flush_lock.acquire(blocking=False):
+            return 0    # another thread is flushing
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            written = 0
+            for _ in range(self.MAX_RETRIES):
+                if not pending:
+                    break
+                try:
+                    conflicts = self._merge_into_store(pending)
+                except errors.PyMongoError as e:
+                    logger.warning("⚠️ Could not flush views of %s posts: %s", len(pending), e)
+                    break
+                written += len(pending) - len(conflicts)
+                pending = {oid: pending[oid] for oid in conflicts}
+            if pending:
+                # keep what could not be written for the next flush
+                with self._lock:
+                    for oid, sketch in pending.items():
+                        current = self._pending.get(oid)
+                        self._pending[oid] = sketch if current is None else current.merge(sketch)
+            if written:
+                logger.debug("Flushed view sketches of %s posts", written)
+            return written
+        finally:
+            self._flush_lock.release()
+
+    # Background flusher
+    def start(self) -> None:
+        """Flush every flush_interval seconds in a daemon thread."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="view-counter", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> int:
+        """Stop the flusher and write what is still pending. :return: number of posts written"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.flush()
+
+    def run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("⚠️ View flush failed: %s", e)
+
+    def discard(self, post_id: Any) -> None:
+        """Forget the views of a deleted post."""
+        oid = post_id if isinstance(post_id, ObjectId) else ObjectId(str(post_id))
+        with self._lock:
+            self._pending.pop(oid, None)
+        self.views.delete_one({"_id": oid})
+
+    def _merge_into_store(self, pending: Dict[ObjectId, HyperLogLog]) -> List[ObjectId]:
+        """One read-merge-write round for all pending posts. :return: posts written concurrently, to retry"""
+        oids = list(pending)
+        stored: Dict[ObjectId, Dict[str, Any]] = {
+            doc["_id"]: doc for doc in self.views.find({"_id": {"$in": oids}}, {"hll": 1, "version": 1})
+        }
+        now = datetime.now(timezone.utc)
+        requests = []
+        for oid in oids:
+            doc = stored.get(oid)
+            merged = pending[oid] if doc is None else HyperLogLog.from_bytes(doc["hll"]).merge(pending[oid])
+            # a missing post is inserted with version 1; a version written in between makes the upsert hit the _id
+            requests.append(UpdateOne(
+                {"_id": oid, "version": 0 if doc is None else doc["version"]},
+                {"$set": {"hll": Binary(merged.to_bytes()), "updated_at": now}, "$inc": {"version": 1}},
+                upsert=True,
+            ))
+        try:
+            self.views.bulk_write(requests, ordered=False)
+        except errors.BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in write_errors):
+                raise
+            return [oids[err["index"]] for err in write_errors]
+        return []
@@ -1,18 +1,32 @@
-import os
-from dotenv import load_dotenv
-from neo4j import GraphDatabase
+from src.config import get_settings
 
 
-def get_neo4j_driver():
+def _neo4j_settings():
+    settings = get_settings()
+    return settings.neo4j_uri, settings.neo4j_auth
+
+
+def create_neo4j_driver(**pool_options):
+    """
+    Create a new Neo4j driver. pool_options are passed through to GraphDatabase.driver
+    (max_connection_pool_size, connection_acquisition_timeout, ...).
+    Use get_neo4j_driver() to share the pooled driver of this process instead.
+    """
+    from neo4j import GraphDatabase
 
-    # Load environment file
-    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'), override=True)
+    uri, auth = _neo4j_settings()
+    return GraphDatabase.driver(uri, auth=auth, **pool_options)
 
-    # Gather variables (no defaults)
-    APP_NEO4J_URI_HTTP = os.getenv("APP_NEO4J_URI_HTTP")
-    APP_NEO4J_USER = os.getenv("APP_NEO4J_USER")
-    APP_NEO4J_PASSWORD = os.getenv("APP_NEO4J_PASSWORD")
 
-    driver = GraphDatabase.driver(APP_NEO4J_URI_HTTP, auth=(APP_NEO4J_USER, APP_NEO4J_PASSWORD))
+def create_async_neo4j_driver(**pool_options):
+    """Create a new async Neo4j driver for asyncio code, same options as create_neo4j_driver."""
+    from neo4j import AsyncGraphDatabase
 
-    return driver
\ No newline at end of file
+    uri, auth = _neo4j_settings()
+    return AsyncGraphDatabase.driver(uri, auth=auth, **pool_options)
+
+
+def get_neo4j_driver():
+    """The pooled Neo4j driver shared by this process."""
+    from src.resources import get_registry
+    return get_registry().neo4j_driver()
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from NeoDB.neo4j_repo import Neo4jRepository
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+UserId = int
+
+
+@dataclass(frozen=True)
+class _CSR:
+    """
+    Immutable compressed sparse row adjacency of the follow graph.
+
+    user_ids[i] is the userId of row i. The followees of row i are
+    user_ids[fwd_indices[fwd_indptr[i]:fwd_indptr[i + 1]]], the followers
+    are the same slice taken from rev_indptr / rev_indices. Every slice
+    is sorted, so membership tests are binary searches.
+    """
+    user_ids: np.ndarray      # int64, sorted, unique
+    fwd_indptr: np.ndarray    # int64, len(user_ids) + 1
+    fwd_indices: np.ndarray   # int32, row indices of followees
+    rev_indptr: np.ndarray    # int64, len(user_ids) + 1
+    rev_indices: np.ndarray   # int32, row indices of followers
+
+    @staticmethod
+    def empty() -> "_CSR":
+        return _CSR.build(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    @staticmethod
+    def build(user_ids: np.ndarray, src: np.ndarray, dst: np.ndarray) -> "_CSR":
+        """
+        Build both directions from parallel arrays of follower / followee userIds.
+        Edges whose endpoints are missing from user_ids are added as nodes.
+        """
+        user_ids = np.unique(np.concatenate([user_ids, src, dst]).astype(np.int64))
+        n = len(user_ids)
+        src_idx = np.searchsorted(user_ids, src).astype(np.int64)
+        dst_idx = np.searchsorted(user_ids, dst).astype(np.int64)
+
+        # drop duplicate edges so degrees match the graph
+        if len(src_idx):
+            keys = np.unique(src_idx * n + dst_idx)
+            src_idx, dst_idx = keys // n, keys % n
+
+        fwd_indptr, fwd_indices = _CSR._rows(n, src_idx, dst_idx)
+        rev_indptr, rev_indices = _CSR._rows(n, dst_idx, src_idx)
+        return _CSR(user_ids, fwd_indptr, fwd_indices, rev_indptr, rev_indices)
+
+    @staticmethod
+    def _rows(n: int, row: np.ndarray, col: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        order = np.lexsort((col, row))
+        indices = col[order].astype(np.int32)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row, minlength=n), out=indptr[1:])
+        return indptr, indices
+
+    def row(self, user_id: UserId) -> int:
+        i = int(np.searchsorted(self.user_ids, user_id))
+        if i < len(self.user_ids) and self.user_ids[i] == user_id:
+            return i
+        return -1
+
+    def out_rows(self, i: int) -> np.ndarray:
+        return self.fwd_indices[self.fwd_indptr[i]:self.fwd_indptr[i + 1]]
+
+    def in_rows(self, i: int) -> np.ndarray:
+        return self.rev_indices[self.rev_indptr[i]:self.rev_indptr[i + 1]]
+
+    def has_edge(self, follower: UserId, followee: UserId) -> bool:
+        i, j = self.row(follower), self.row(followee)
+        if i < 0 or j < 0:
+            return False
+        out = self.out_rows(i)
+        k = int(np.searchsorted(out, j))
+        return k < len(out) and out[k] == j
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All edges as (follower userIds, followee userIds)."""
+        src = np.repeat(np.arange(len(self.user_ids)), np.diff(self.fwd_indptr))
+        return self.user_ids[src], self.user_ids[self.fwd_indices]
+
+
+class FollowGraph:
+    """
+    In-process snapshot of (:User)-[:FOLLOWS]->(:User), keyed by userId.
+
+    The snapshot is loaded once from Neo4j into CSR arrays (see _CSR). Follows
+    and unfollows made through the backend are applied to a small overlay of
+    added / removed edges, which is folded into fresh arrays once it grows past
+    compact_threshold. reconcile() reloads from Neo4j to pick up writes made by
+    other processes; start_reconciler() does that every reconcile_interval seconds.
+
+    Reads never hit Neo4j once the snapshot is loaded.
+    """
+
+    NODES_QUERY = "MATCH (u:User) WHERE u.userId IS NOT NULL RETURN u.userId AS id"
+    EDGES_QUERY = """
+        MATCH (a:User)-[:FOLLOWS]->(b:User)
+        WHERE a.userId IS NOT NULL AND b.userId IS NOT NULL
+        RETURN a.userId AS src, b.userId AS dst
+    """
+
+    def __init__(self, neo_repo: Neo4jRepository, reconcile_interval: float = 300.0, compact_threshold: int = 10_000):
+        self.neo_repo = neo_repo
+        self.reconcile_interval = reconcile_interval
+        self.compact_threshold = compact_threshold
+
+        self._csr: _CSR = _CSR.empty()
+        self._loaded_at: Optional[float] = None
+
+        # overlay on top of the CSR arrays
+        self._added_out: Dict[UserId, Set[UserId]] = {}
+        self._added_in: Dict[UserId, Set[UserId]] = {}
+        self._removed_out: Dict[UserId, Set[UserId]] = {}
+        self._removed_in: Dict[UserId, Set[UserId]] = {}
+        self._overlay_size = 0
+
+        # edits made while a reload is in flight, replayed onto the new snapshot
+        self._replay: Optional[List[Tuple[bool, UserId, UserId]]] = None
+
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._reconciler: Optional[threading.Thread] = None
+
+    # Loading
+    def load(self) -> None:
+        """(Re)load the whole follow graph from Neo4j."""
+        with self._lock:
+            self._replay = []
+        try:
+            nodes = self.neo_repo.run_cypher(self.NODES_QUERY)
+            edges = self.neo_repo.run_cypher(self.EDGES_QUERY)
+            user_ids = np.fromiter((r["id"] for r in nodes), dtype=np.int64, count=len(nodes))
+            src = np.fromiter((r["src"] for r in edges), dtype=np.int64, count=len(edges))
+            dst = np.fromiter((r["dst"] for r in edges), dtype=np.int64, count=len(edges))
+            csr = _CSR.build(user_ids, src, dst)
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+
+        with self._lock:
+            replay, self._replay = self._replay, None
+            self._csr = csr
+            self._clear_overlay()
+            for added, follower, followee in replay:
+                self._apply(added, follower, followee)
+            self._loaded_at = time.monotonic()
+
+    def reconcile(self) -> None:
+        """Replace the snapshot with the current state of Neo4j."""
+        self.load()
+
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.reconcile_interval
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded_at is None:
+            with self._lock:
+                if self._loaded_at is None:
+                    self.load()
+
+    def start_reconciler(self) -> None:
+        """Reconcile with Neo4j in a daemon thread every reconcile_interval seconds."""
+        if self._reconciler is not None and self._reconciler.is_alive():
+            return
+        self._stop.clear()
+        self._reconciler = threading.Thread(target=self._reconcile_loop, name="follow-graph-reconciler", daemon=True)
+        self._reconciler.start()
+
+    def stop_reconciler(self) -> None:
+        self._stop.set()
+        if self._reconciler is not None:
+            self._reconciler.join()
+            self._reconciler = None
+
+    def _reconcile_loop(self) -> None:
+        while not self._stop.wait(self.reconcile_interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.warning("⚠️ Follow graph reconcile failed: %s", e)
+
+    # Incremental updates
+    def add_edge(self, follower: UserId, followee: UserId) -> None:
+        """Record a FOLLOWS edge that was written to Neo4j."""
+        self._ensure_loaded()
+        with self._lock:
+            self._apply(True, int(follower), int(followee))
+
+    def remove_edge(self, follower: UserId, followee: UserId) -> None:
+        """Record a FOLLOWS edge that was deleted from Neo4j."""
+        self._ensure_loaded()
+        with self._lock:
+            self._apply(False, int(follower), int(followee))
+
+    def _apply(self, added: bool, follower: UserId, followee: UserId) -> None:
+        if self._replay is not None:
+            self._replay.append((added, follower, followee))
+
+        in_base = self._csr.has_edge(follower, followee)
+        if added:
+            if in_base:
+                self._discard(self._removed_out, self._removed_in, follower, followee)
+            else:
+                self._insert(self._added_out, self._added_in, follower, followee)
+        else:
+            if in_base:
+                self._insert(self._removed_out, self._removed_in, follower, followee)
+            else:
+                self._discard(self._added_out, self._added_in, follower, followee)
+
+        if self._overlay_size >= self.compact_threshold:
+            self._compact()
+
+    def _insert(self, out: Dict[UserId, Set[UserId]], inc: Dict[UserId, Set[UserId]], a: UserId, b: UserId) -> None:
+        targets = out.setdefault(a, set())
+        if b not in targets:
+            targets.add(b)
+            inc.setdefault(b, set()).add(a)
+            self._overlay_size += 1
+
+    def _discard(self, out: Dict[UserId, Set[UserId]], inc: Dict[UserId, Set[UserId]], a: UserId, b: UserId) -> None:
+        targets = out.get(a)
+        if targets and b in targets:
+            targets.discard(b)
+            inc[b].discard(a)
+            self._overlay_size -= 1
+
+    def _clear_overlay(self) -> None:
+        self._added_out, self._added_in = {}, {}
+        self._removed_out, self._removed_in = {}, {}
+        self._overlay_size = 0
+
+    def _compact(self) -> None:
+        """Fold the overlay into new CSR arrays."""
+        src, dst = self._csr.edges()
+        if self._removed_out:
+            n = max(len(self._csr.user_ids), 1)
+            removed = np.array(
+                [(self._csr.row(a) * n + self._csr.row(b)) for a, bs in self._removed_out.items() for b in bs],
+                dtype=np.int64,
+            )
+            keys = np.searchsorted(self._csr.user_ids, src) * n + np.searchsorted(self._csr.user_ids, dst)
+            keep = ~np.isin(keys, removed)
+            src, dst = src[keep], dst[keep]
+        added = [(a, b) for a, bs in self._added_out.items() for b in bs]
+        if added:
+            extra = np.array(added, dtype=np.int64)
+            src = np.concatenate([src, extra[:, 0]])
+            dst = np.concatenate([dst, extra[:, 1]])
+        self._csr = _CSR.build(self._csr.user_ids, src, dst)
+        self._clear_overlay()
+
+    # Lookups
+    def followees(self, user_id: UserId) -> np.ndarray:
+        """Sorted userIds that user_id follows."""
+        self._ensure_loaded()
+        user_id = int(user_id)
+        with self._lock:
+            csr = self._csr
+            i = csr.row(user_id)
+            base = csr.user_ids[csr.out_rows(i)] if i >= 0 else np.empty(0, dtype=np.int64)
+            return self._with_overlay(base, self._added_out.get(user_id), self._removed_out.get(user_id))
+
+    def followers(self, user_id: UserId) -> np.ndarray:
+        """Sorted userIds that follow user_id."""
+        self._ensure_loaded()
+        user_id = int(user_id)
+        with self._lock:
+            csr = self._csr
+            i = csr.row(user_id)
+            base = csr.user_ids[csr.in_rows(i)] if i >= 0 else np.empty(0, dtype=np.int64)
+            return self._with_overlay(base, self._added_in.get(user_id), self._removed_in.get(user_id))
+
+    def is_following(self, follower: UserId, followee: UserId) -> bool:
+        self._ensure_loaded()
+        follower, followee = int(follower), int(followee)
+        with self._lock:
+            if followee in self._added_out.get(follower, ()):
+                return True
+            if followee in self._removed_out.get(follower, ()):
+                return False
+            return self._csr.has_edge(follower, followee)
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Current graph as (user_ids, indptr, indices) of the forward CSR,
+        with any pending overlay folded in first.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if self._overlay_size:
+                self._compact()
+            csr = self._csr
+        return csr.user_ids, csr.fwd_indptr, csr.fwd_indices
+
+    @staticmethod
+    def _with_overlay(base: np.ndarray, added: Optional[Iterable[UserId]], removed: Optional[Iterable[UserId]]) -> np.ndarray:
+        if removed:
+            base = base[~np.isin(base, np.fromiter(removed, dtype=np.int64))]
+        if added:
+            base = np.union1d(base, np.fromiter(added, dtype=np.int64))
+        return base
@@ -1,10 +1,102 @@
-from neo4j import Driver
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List
+
+from src.instrumentation import cypher_operation_name, get_logger, instrumentation
+
+if TYPE_CHECKING:
+    from neo4j import Driver
+
+logger = get_logger(__name__)
+
+
+class UserNotFound(Exception): ...
 
 
 class Neo4jRepository:
+    """
+    Nodes
+      - (:User {userId}) with a uniqueness constraint on userId (matches SQL users.id)
+        and a range index on followers (most followed users, see create_indexes())
+
+    Relationships
+      - (:User)-[:FOLLOWS {created_at}]->(:User)
+
+    Counters
+      - User.followers / User.following are maintained in the same transaction
+        as every follow / unfollow written here. Edges written any other way
+        (bulk seeding) are picked up by reconcile_follow_counts().
+
+    Follow writes match users by the constrained userId, so both endpoints are
+    index seeks and every write is a single round trip.
+    """
+
+    FOLLOW_QUERY = """
+        MATCH (a:User {userId: $follower})
+        MATCH (b:User {userId: $followee})
+        MERGE (a)-[r:FOLLOWS]->(b)
+        ON CREATE SET r.created_at = datetime(),
+                      a.following = coalesce(a.following, 0) + 1,
+                      b.followers = coalesce(b.followers, 0) + 1
+        RETURN b.userId AS followee
+    """
+
+    FOLLOW_MANY_QUERY = """
+        MATCH (a:User {userId: $follower})
+        UNWIND $followees AS followee_id
+        MATCH (b:User {userId: followee_id})
+        WHERE b <> a
+        MERGE (a)-[r:FOLLOWS]->(b)
+        ON CREATE SET r.created_at = datetime(),
+                      a.following = coalesce(a.following, 0) + 1,
+                      b.followers = coalesce(b.followers, 0) + 1
+        RETURN b.userId AS followee
+    """
+
+    UNFOLLOW_QUERY = """
+        MATCH (a:User {userId: $follower})-[r:FOLLOWS]->(b:User {userId: $followee})
+        DELETE r
+        SET a.following = CASE WHEN coalesce(a.following, 0) > 0 THEN a.following - 1 ELSE 0 END,
+            b.followers = CASE WHEN coalesce(b.followers, 0) > 0 THEN b.followers - 1 ELSE 0 END
+    """
+
+    FOLLOW_COUNTS_QUERY = """
+        UNWIND $user_ids AS user_id
+        MATCH (u:User {userId: user_id})
+        RETURN u.userId AS user_id,
+               coalesce(u.followers, 0) AS followers,
+               coalesce(u.following, 0) AS following
+    """
+
+    SCHEMA_QUERIES = (
+        "CREATE CONSTRAINT IF NOT EXISTS FOR (u:User) REQUIRE u.userId IS UNIQUE",
+        "CREATE RANGE INDEX user_followers IF NOT EXISTS FOR (u:User) ON (u.followers)",
+    )
+
+    RECONCILE_COUNTS_QUERY = """
+        MATCH (u:User)
+        CALL {
+            WITH u
+            WITH u,
+                 COUNT { (u)<-[:FOLLOWS]-(:User) } AS followers,
+                 COUNT { (u)-[:FOLLOWS]->(:User) } AS following
+            WHERE u.followers IS NULL OR u.following IS NULL
+               OR u.followers <> followers OR u.following <> following
+            SET u.followers = followers, u.following = following
+            RETURN count(*) AS fixed
+        } IN TRANSACTIONS OF $batch_size ROWS
+        RETURN sum(fixed) AS fixed
+    """
+
     def __init__(self, driver: Driver):
         self.driver = driver
 
+    def create_indexes(self) -> None:
+        """Create the userId constraint and the followers index if they do not exist."""
+        for query in self.SCHEMA_QUERIES:
+            self.run_cypher(query)
+
     def run_cypher(self, query, params=None):
         """
         Execute a Cypher query against the Neo4j database.
@@ -12,5 +104,91 @@ class Neo4jRepository:
         :param params:
         :return: results of the query
         """
-        with self.driver.session() as session:
-            return list(session.run(query, params or {}))
\ No newline at end of file
+        start = time.perf_counter()
+        try:
+            with self.driver.session() as session:
+                records = list(session.run(query, params or {}))
+        except Exception:
+            instrumentation.record("neo4j", cypher_operation_name(query), time.perf_counter() - start, error=True)
+            raise
+        instrumentation.record("neo4j", cypher_operation_name(query), time.perf_counter() - start, rows=len(records))
+        return records
+
+    def run_write(self, query, params=None):
+        """
+        Execute a Cypher write query in a managed (retried) write transaction.
+        :param query:
+        :param params:
+        :return: (records, summary counters)
+        """
+        def work(tx):
+            result = tx.run(query, params or {})
+            records = list(result)
+            return records, result.consume().counters
+
+        start = time.perf_counter()
+        try:
+            with self.driver.session() as session:
+                records, counters = session.execute_write(work)
+        except Exception:
+            instrumentation.record("neo4j", cypher_operation_name(query), time.perf_counter() - start, error=True)
+            raise
+        instrumentation.record("neo4j", cypher_operation_name(query), time.perf_counter() - start, rows=len(records))
+        return records, counters
+
+    # Follows
+    def follow(self, follower_id: int, followee_id: int) -> bool:
+        """
+        Create (follower)-[:FOLLOWS]->(followee) if it does not exist yet.
+        Raises UserNotFound if either user has no node.
+        :return: true if the relationship was created, false if it already existed
+        """
+        records, counters = self.run_write(self.FOLLOW_QUERY, {"follower": int(follower_id), "followee": int(followee_id)})
+        if not records:
+            raise UserNotFound(f"user {follower_id} or {followee_id} not found")
+        return counters.relationships_created > 0
+
+    def follow_many(self, follower_id: int, followee_ids: Iterable[int]) -> List[int]:
+        """
+        Follow several users in one round trip. Unknown ids and the follower itself are skipped.
+        :return: ids of the users that are now followed
+        """
+        followee_ids = list(dict.fromkeys(int(i) for i in followee_ids))
+        if not followee_ids:
+            return []
+        records, _ = self.run_write(self.FOLLOW_MANY_QUERY, {"follower": int(follower_id), "followees": followee_ids})
+        return [r["followee"] for r in records]
+
+    def unfollow(self, follower_id: int, followee_id: int) -> bool:
+        """
+        Delete (follower)-[:FOLLOWS]->(followee).
+        :return: true if a relationship was deleted
+        """
+        _, counters = self.run_write(self.UNFOLLOW_QUERY, {"follower": int(follower_id), "followee": int(followee_id)})
+        return counters.relationships_deleted > 0
+
+    # Follow counters
+    def get_follow_counts(self, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        """
+        Read the maintained follower / following counters of several users in one query.
+        Users without a node are reported with zero counts.
+        :return: {user_id: {"followers": <int>, "following": <int>}, ...}
+        """
+        user_ids = list(dict.fromkeys(int(i) for i in user_ids))
+        counts = {user_id: {"followers": 0, "following": 0} for user_id in user_ids}
+        if not user_ids:
+            return counts
+        for r in self.run_cypher(self.FOLLOW_COUNTS_QUERY, {"user_ids": user_ids}):
+            counts[r["user_id"]] = {"followers": r["followers"], "following": r["following"]}
+        return counts
+
+    def reconcile_follow_counts(self, batch_size: int = 10_000) -> int:
+        """
+        Recount FOLLOWS degrees and fix the counters of users that drifted.
+        Runs in batches of batch_size users per transaction.
+        :return: number of users whose counters were corrected
+        """
+        rows = self.run_cypher(self.RECONCILE_COUNTS_QUERY, {"batch_size": int(batch_size)})
+        fixed = rows[0]["fixed"] if rows and rows[0]["fixed"] is not None else 0
+        logger.info("✅ Reconciled follow counters (%s users corrected)", fixed)
+        return fixed
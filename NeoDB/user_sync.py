@@ -0,0 +1,145 @@
+"""
+Incremental SQL -> Neo4j sync of :User nodes from the user outbox (SQL/outbox.py).
+
+Each batch of outbox events is reduced to the set of affected users. Their
+current state is read from PostgreSQL and applied to the graph: existing users
+are MERGEd with their current name, users that no longer exist are deleted
+together with their FOLLOWS edges. Applying the current state instead of
+replaying each event makes every batch idempotent and independent of commit
+order, so a crash between the Neo4j write and the checkpoint only repeats work.
+
+Run as a worker process:
+    python -m NeoDB.user_sync --interval 1.0
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+from typing import Optional
+
+from NeoDB.neo4j_repo import Neo4jRepository
+from SQL.outbox import fetch_user_changes, get_checkpoint, retrieve_user_names, save_checkpoint
+from src.instrumentation import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+
+class UserSyncWorker:
+    UPSERT_QUERY = """
+        UNWIND $users AS u
+        MERGE (user:User {userId: u.id})
+        SET user.username = u.name
+    """
+
+    # keep the counters of the remaining users right (see Neo4jRepository.UNFOLLOW_QUERY)
+    DELETE_QUERY = """
+        UNWIND $user_ids AS user_id
+        MATCH (u:User {userId: user_id})
+        OPTIONAL MATCH (u)-[:FOLLOWS]->(b:User)
+        SET b.followers = CASE WHEN coalesce(b.followers, 0) > 0 THEN b.followers - 1 ELSE 0 END
+        WITH DISTINCT u
+        OPTIONAL MATCH (a:User)-[:FOLLOWS]->(u)
+        SET a.following = CASE WHEN coalesce(a.following, 0) > 0 THEN a.following - 1 ELSE 0 END
+        WITH DISTINCT u
+        DETACH DELETE u
+    """
+
+    def __init__(
+        self,
+        neo_repo: Neo4jRepository,
+        consumer: str = "neo4j_users",
+        batch_size: int = 1000,
+        interval: float = 1.0,
+        prune: bool = True,
+    ):
+        """
+        :param consumer: checkpoint name in outbox_checkpoints
+        :param interval: seconds between polls while the outbox is drained
+        :param prune: delete processed events (only if this is the outbox's only consumer)
+        """
+        self.neo_repo = neo_repo
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.interval = interval
+        self.prune = prune
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync_batch(self) -> int:
+        """Apply the next batch of events. :return: number of events processed"""
+        events = fetch_user_changes(get_checkpoint(self.consumer), self.batch_size)
+        if not events:
+            return 0
+
+        user_ids = sorted({e["user_id"] for e in events})
+        names = retrieve_user_names(user_ids)
+        upserts = [{"id": user_id, "name": name} for user_id, name in names.items()]
+        deletes = [user_id for user_id in user_ids if user_id not in names]
+
+        if upserts:
+            self.neo_repo.run_write(self.UPSERT_QUERY, {"users": upserts})
+        if deletes:
+            self.neo_repo.run_write(self.DELETE_QUERY, {"user_ids": deletes})
+
+        last = events[-1]
+        save_checkpoint(self.consumer, (last["txid"], last["id"]), prune=self.prune)
+        logger.info("✅ Synced %s user event(s): %s upserted, %s deleted", len(events), len(upserts), len(deletes))
+        return len(events)
+
+    def sync(self) -> int:
+        """Drain the outbox. :return: number of events processed"""
+        total = 0
+        while True:
+            processed = self.sync_batch()
+            total += processed
+            if processed < self.batch_size:
+                return total
+
+    # Background worker
+    def start(self) -> None:
+        """Drain the outbox in a daemon thread, polling every interval seconds."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="user-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self) -> None:
+        """Poll until stop() is called; errors are logged and retried on the next poll."""
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning("⚠️ User sync failed: %s", e)
+            self._stop.wait(self.interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sync SQL users to Neo4j from the user outbox.")
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--once", action="store_true", help="drain the outbox once and exit")
+    args = parser.parse_args()
+
+    from NeoDB.connection import get_neo4j_driver
+
+    configure_logging()
+    worker = UserSyncWorker(Neo4jRepository(get_neo4j_driver()), batch_size=args.batch_size, interval=args.interval)
+    if args.once:
+        worker.sync()
+        return
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ import psycopg2
 from SQL.connection import connect_to_sql_database
 from SQL.sql_error import TokenError
 
+# src/plan_guardrails.py checks the plans of these
+VALIDATE_TOKEN_QUERY = "SELECT user_id FROM api_tokens WHERE user_id = %s AND token = %s AND expires_at > %s"
+REVOKE_TOKEN_QUERY = "DELETE FROM api_tokens WHERE token = %s"
+
 def generate_token(length=64):
     return secrets.token_hex(length)
 
@@ -32,9 +36,7 @@ def validate_token(user_id, token):
     try:
         with connect_to_sql_database() as conn:
             with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT user_id FROM api_tokens WHERE user_id = %s AND token = %s AND expires_at > %s
-                """, (user_id, token, now_utc))
+                cur.execute(VALIDATE_TOKEN_QUERY, (user_id, token, now_utc))
                 row = cur.fetchone()
 
                 if row:
@@ -49,7 +51,7 @@ def revoke_token(token):
     try:
         with connect_to_sql_database() as conn:
             with conn.cursor() as cur:
-                cur.execute("DELETE FROM api_tokens WHERE token = %s", (token,))
+                cur.execute(REVOKE_TOKEN_QUERY, (token,))
                 deleted = cur.rowcount
                 conn.commit()
 
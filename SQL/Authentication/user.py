@@ -2,9 +2,14 @@ from SQL.connection import connect_to_sql_database
 import psycopg2
 import bcrypt
 from SQL.Authentication.api_token import issue_token, revoke_token, validate_token
+from SQL.outbox import DELETED, REGISTERED, record_user_change
+from SQL.query_builder import execute, update_statement
 from SQL.sql_error import AuthenticationError, RegistrationError, UserError, TokenError
 from SQL.utils import clean_input, validate_username, validate_email, validate_password, validate_first_name, validate_last_name
 from datetime import datetime, UTC
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
 
 
 def register_user(username, email, password, first_name, last_name):
@@ -38,16 +43,17 @@ def register_user(username, email, password, first_name, last_name):
                             INSERT INTO profile (user_id, username, first_name, last_name)
                             VALUES (%s, %s, %s, %s);
                             """, (user_id, username, first_name, last_name))
+                record_user_change(cur, user_id, REGISTERED)
 
                 conn.commit()
-                print(f"✅ User successfully registered (id={user_id})")
+                logger.info("✅ User successfully registered (id=%s)", user_id)
                 return user_id
     except psycopg2.Error as e:
             raise RegistrationError(f"Database error: {e}") from e
     except ValueError as e:
         raise RegistrationError(e) from e
     except Exception as e:
-        print(f"❌ Registration failed: {e}")
+        logger.error("❌ Registration failed: %s", e)
         raise
 
 def check_password(email, password):
@@ -78,7 +84,7 @@ def check_password(email, password):
     except AuthenticationError as e:
         raise e
     except Exception as e:
-        print(f"❌ Password validation failed: {e}")
+        logger.error("❌ Password validation failed: %s", e)
         raise
 
 def login_user(email, password):
@@ -88,20 +94,14 @@ def login_user(email, password):
 
     user_id = check_password(email, password)
 
+    # issue_token takes its own pooled connection, do not hold one here
     try:
-        with connect_to_sql_database() as conn:
-            with conn.cursor() as cur:
-                token = issue_token(user_id)
-                print(f"✅ User logged in successfully (user_id={user_id})")
-                return {"user_id": user_id, "token": token}
+        token = issue_token(user_id)
+    except TokenError as e:
+        raise AuthenticationError("Failed to issue token") from e
 
-    except psycopg2.Error as e:
-        raise AuthenticationError("Database error") from e
-    except AuthenticationError as e:
-        raise e
-    except Exception as e:
-        print(f"❌ Login failed: {e}")
-        raise
+    logger.info("✅ User logged in successfully (user_id=%s)", user_id)
+    return {"user_id": user_id, "token": token}
 
 def logout_user(token):
 
@@ -110,9 +110,9 @@ def logout_user(token):
     try:
         revoked = revoke_token(token)
         if revoked:
-            print(f"✅ User logged out successfully")
+            logger.info("✅ User logged out successfully")
         else:
-            print("⚠️ No active session found for this token.")
+            logger.warning("⚠️ No active session found for this token.")
     except TokenError as e:
         raise AuthenticationError("Failed to logout user") from e
 
@@ -157,40 +157,32 @@ def change_credentials(user_id, token, old_email, old_password, new_email=None,
         raise UserError("❌ Failed to change credentials: Invalid token or old credentials")
 
     try:
-        fields = []
-        values = []
+        values = {}
 
         if new_password:
             new_password = clean_input(new_password)
             validate_password(new_password)
             password_hash = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt())
-            password_hash_str = password_hash.decode("utf-8")
-            fields.append("password_hash = %s")
-            values.append(password_hash_str)
+            values["password_hash"] = password_hash.decode("utf-8")
 
         if new_email:
             new_email = clean_input(new_email)
             validate_email(new_email)
-            fields.append("email = %s")
-            values.append(new_email)
-
-        date = datetime.now(UTC)
-        fields.append("updated_at = %s")
-        values.append(date)
-
-        values.append(user_id)
+            values["email"] = new_email
 
-        if len(fields) == 1:
-            print("⚠️ Nothing to update.")
+        if not values:
+            logger.warning("⚠️ Nothing to update.")
             return False
 
-        query = f" UPDATE users SET {', '.join(fields)} WHERE id = %s;"
+        values["updated_at"] = datetime.now(UTC)
+        statement = update_statement("users", values.keys())
+        values["id"] = user_id
 
         with connect_to_sql_database() as conn:
             with conn.cursor() as cur:
-                cur.execute(query, tuple(values))
+                execute(cur, statement, values)
                 conn.commit()
-                print(f"✅ User credentials successfully changed (id={user_id})")
+                logger.info("✅ User credentials successfully changed (id=%s)", user_id)
 
         return True
     except psycopg2.Error as e:
@@ -212,8 +204,9 @@ def delete_user(user_id, token, email, password):
         with connect_to_sql_database() as conn:
             with conn.cursor() as cur:
                 cur.execute("DELETE FROM users WHERE id = %s;", (user_id,))
+                record_user_change(cur, user_id, DELETED)
                 conn.commit()
-                print(f"✅ User successfully deleted (id={user_id})")
+                logger.info("✅ User successfully deleted (id=%s)", user_id)
                 return True
 
     except psycopg2.Error as e:
@@ -250,11 +243,11 @@ def retrieve_all_users():
                 rows = cur.fetchall()
 
                 users = [{"id": row[0], "name": row[1]} for row in rows]
-                print(f"✅ Retrieved {len(users)} users")
+                logger.info("✅ Retrieved %s users", len(users))
                 return users
 
     except psycopg2.Error as e:
         raise UserError("❌ Failed to fetch users: Database error") from e
     except Exception as e:
-        print(f"❌ Failed to fetch users: {e}")
+        logger.error("❌ Failed to fetch users: %s", e)
         raise
\ No newline at end of file
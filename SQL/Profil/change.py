@@ -3,13 +3,18 @@ import psycopg2
 from SQL.Authentication.api_token import validate_token
 from SQL.sql_error import ProfileError
 from SQL.connection import connect_to_sql_database
+from SQL.outbox import PROFILE_CHANGED, record_user_change
+from SQL.query_builder import execute, update_statement
 from SQL.utils import clean_input
 from datetime import datetime, UTC
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
 
 def change_profile(token, user_id, id, new_profile_data):
 
     if len(new_profile_data) == 0:
-        print("⚠️ Nothing to update.")
+        logger.warning("⚠️ Nothing to update.")
         return False
 
     user_id = clean_input(user_id)
@@ -20,29 +25,21 @@ def change_profile(token, user_id, id, new_profile_data):
     try:
         with connect_to_sql_database() as conn:
             with conn.cursor() as cur:
-                base_query = "UPDATE profile"
-                conditions = []
-                values = []
-
+                values = {}
                 for key, value in new_profile_data.items():
                     if key == "id" or key == "user_id" or key == "updated_at":
                         continue
-                    conditions.append(f"{key} = %s")
-                    values.append(clean_input(value))
-
-                conditions.append(f"updated_at = %s")
-                values.append(datetime.now(UTC))
-
-                where_clause = " WHERE id = %s"
-                values.append(clean_input(id))
-
-                if conditions:
-                    set_clause = " SET " + f", ".join(conditions)
-                    final_query = base_query + set_clause + where_clause
-
-                cur.execute(final_query, tuple(values))
+                    values[key] = clean_input(value)
+                values["updated_at"] = datetime.now(UTC)
+                values["id"] = clean_input(id)
+
+                # one prepared statement per set of changed columns, unknown columns raise QueryError
+                statement = update_statement("profile", [key for key in values if key != "id"], returning="user_id")
+                execute(cur, statement, values)
+                for (changed_user_id,) in cur.fetchall():
+                    record_user_change(cur, changed_user_id, PROFILE_CHANGED)
                 conn.commit()
-                print(f"✅ Profile successfully changed (id={id})")
+                logger.info("✅ Profile successfully changed (id=%s)", id)
 
         return True
     except psycopg2.Error as e:
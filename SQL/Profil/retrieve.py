@@ -2,7 +2,17 @@ import psycopg2
 
 from SQL.sql_error import ProfileError
 from SQL.connection import connect_to_sql_database
+from SQL.query_builder import execute, select_statement
 from SQL.utils import clean_input
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+# the lookups by key, src/plan_guardrails.py checks their plans
+PROFILE_BY_ID_QUERY = "SELECT * FROM profile WHERE id = %s;"
+PROFILES_BY_USER_ID_QUERY = "SELECT * FROM profile WHERE user_id = %s;"
+PROFILES_BY_USER_IDS_QUERY = "SELECT * FROM profile WHERE user_id = ANY(%s) ORDER BY id;"
+PROFILE_BY_USERNAME_QUERY = "SELECT * FROM profile WHERE username = %s;"
 
 def retrieve_profile_by_id(profile_id):
 
@@ -11,12 +21,12 @@ def retrieve_profile_by_id(profile_id):
     try:
         with connect_to_sql_database() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT * FROM profile WHERE id = %s;", (profile_id,))
+                cur.execute(PROFILE_BY_ID_QUERY, (profile_id,))
 
                 profile = cur.fetchone()
 
                 if not profile:
-                    print(f"⚠️ Profile not found for profile_id {profile_id}")
+                    logger.warning("⚠️ Profile not found for profile_id %s", profile_id)
                     return None
 
                 return output_profile(profile)
@@ -32,12 +42,12 @@ def retrieve_profiles_by_user_id(user_id):
     try:
         with connect_to_sql_database() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT * FROM profile WHERE user_id = %s;", (user_id,))
+                cur.execute(PROFILES_BY_USER_ID_QUERY, (user_id,))
 
                 profiles = cur.fetchall()
 
                 if not profiles:
-                    print(f"⚠️ Profile not found for profile_id {user_id}")
+                    logger.warning("⚠️ Profile not found for profile_id %s", user_id)
                     return None
 
                 return [output_profile(profile) for profile in profiles]
@@ -46,6 +56,51 @@ def retrieve_profiles_by_user_id(user_id):
     except Exception as e:
         raise ProfileError(f"An unexpected error occurred: {e}") from e
 
+def retrieve_profiles_by_user_ids(user_ids):
+    """
+    Fetch the profiles of several users in one query.
+    If a user has more than one profile, the oldest one is returned.
+    :return: {user_id: profile, ...} for every user that has a profile
+    """
+
+    user_ids = [int(clean_input(user_id)) for user_id in user_ids]
+    if not user_ids:
+        return {}
+
+    try:
+        with connect_to_sql_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute(PROFILES_BY_USER_IDS_QUERY, (user_ids,))
+
+                profiles = {}
+                for profile in cur.fetchall():
+                    profiles.setdefault(profile[1], output_profile(profile))
+
+                return profiles
+    except psycopg2.Error as e:
+        raise ProfileError(f"Database error occurred: {e.pgerror}") from e
+    except Exception as e:
+        raise ProfileError(f"An unexpected error occurred: {e}") from e
+
+def iter_profile_chunks(chunk_size=5000):
+    """
+    Stream the oldest profile of every user through a server-side cursor.
+    :return: iterator of lists of up to chunk_size profiles (see output_profile)
+    """
+    try:
+        with connect_to_sql_database() as conn:
+            # named cursor: rows stay on the server and arrive chunk_size at a time
+            with conn.cursor(name="iter_profile_chunks") as cur:
+                cur.itersize = chunk_size
+                cur.execute("SELECT DISTINCT ON (user_id) * FROM profile ORDER BY user_id, id;")
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    yield [output_profile(row) for row in rows]
+    except psycopg2.Error as e:
+        raise ProfileError(f"Database error occurred: {e.pgerror}") from e
+
 def retrieve_profile_by_username(username):
 
     username = clean_input(username)
@@ -53,12 +108,12 @@ def retrieve_profile_by_username(username):
     try:
         with connect_to_sql_database() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT * FROM profile WHERE username = %s;", (username,))
+                cur.execute(PROFILE_BY_USERNAME_QUERY, (username,))
 
                 profile = cur.fetchone()
 
                 if not profile:
-                    print(f"⚠️ Profile not found for username {username}")
+                    logger.warning("⚠️ Profile not found for username %s", username)
                     return None
 
                 return output_profile(profile)
@@ -67,30 +122,21 @@ def retrieve_profile_by_username(username):
     except Exception as e:
         raise ProfileError(f"An unexpected error occurred: {e}") from e
 
+def profile_ids_statement(operation, columns):
+    # operation is AND or OR, columns must be profile columns (QueryError otherwise)
+    return select_statement("profile", ["id"], columns, operation)
+
 def retrieve_profile_ids(operation, query_criteria):
     try:
         with connect_to_sql_database() as conn:
             with conn.cursor() as cur:
-                base_query = "SELECT id FROM profile"
-                conditions = []
-                values = []
-
-                for key, value in query_criteria.items():
-                    conditions.append(f"{key} = %s")
-                    values.append(clean_input(value))
-
-                if conditions:
-                    where_clause = " WHERE " + f" {operation} ".join(conditions)
-                    final_query = base_query + where_clause
-                else:
-                    final_query = base_query
-
-                cur.execute(final_query, tuple(values))
+                statement = profile_ids_statement(operation, query_criteria.keys())
+                execute(cur, statement, {key: clean_input(value) for key, value in query_criteria.items()})
 
                 profile_ids = cur.fetchall()
 
                 if not profile_ids:
-                    print("⚠️ No profiles found matching the criteria")
+                    logger.warning("⚠️ No profiles found matching the criteria")
                     return []
 
                 return profile_ids
@@ -1,27 +1,123 @@
-import os
-from dotenv import load_dotenv
+import threading
+import time
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from src.config import get_settings
+from src.instrumentation import instrumentation, sql_operation_name
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor that reports the latency, errors and row count of every statement to instrumentation."""
+
+    def execute(self, query, vars=None):
+        if not instrumentation.enabled:
+            return super().execute(query, vars)
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            instrumentation.record("postgres", sql_operation_name(query), time.perf_counter() - start, error=True)
+            raise
+        instrumentation.record("postgres", sql_operation_name(query), time.perf_counter() - start, rows=self.rowcount)
+        return result
+
+    def executemany(self, query, vars_list):
+        if not instrumentation.enabled:
+            return super().executemany(query, vars_list)
+        start = time.perf_counter()
+        try:
+            result = super().executemany(query, vars_list)
+        except Exception:
+            instrumentation.record("postgres", sql_operation_name(query), time.perf_counter() - start, error=True)
+            raise
+        instrumentation.record("postgres", sql_operation_name(query), time.perf_counter() - start, rows=self.rowcount)
+        return result
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """
+    Connection handed out by SQLConnectionPool. Leaving its `with` block commits
+    (or rolls back) as usual and then returns the connection to the pool.
+    """
+    pool = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # names of the statements PREPAREd in this session, see SQL/query_builder.py
+        self.prepared_statements = set()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            if self.pool is not None:
+                self.pool.putconn(self)
+
+
+class SQLConnectionPool:
+    """
+    Thread-safe pool of PooledConnection. getconn() blocks (up to timeout seconds)
+    while all maxconn connections are checked out instead of failing immediately.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=30.0, **connect_kwargs):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            minconn, maxconn, connection_factory=PooledConnection, **connect_kwargs
+        )
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError("connection pool exhausted")
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        conn.pool = self
+        return conn
+
+    def putconn(self, conn):
+        if conn.pool is not self:
+            return
+        conn.pool = None
+        try:
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+def _connect_kwargs():
+    return get_settings().postgres_kwargs
+
+
+def create_sql_pool(minconn=1, maxconn=10, timeout=30.0):
+    """Create a new connection pool. Use the shared one from the resource registry instead."""
+    return SQLConnectionPool(minconn, maxconn, timeout=timeout, cursor_factory=InstrumentedCursor, **_connect_kwargs())
+
+
+
+async def create_async_sql_pool(min_size=1, max_size=10):
+    """Create an asyncpg pool for asyncio code."""
+    import asyncpg
+
+    kwargs = _connect_kwargs()
+    return await asyncpg.create_pool(
+        host=kwargs["host"], port=kwargs["port"], user=kwargs["user"],
+        password=kwargs["password"], database=kwargs["dbname"],
+        min_size=min_size, max_size=max_size,
+    )
+
 
 def connect_to_sql_database():
-    # Load environment file
-    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'), override=True)
-
-    # Gather variables (no defaults)
-    PGHOST = os.getenv("PGHOST")
-    PGPORT = os.getenv("PGPORT")
-    PGUSER = os.getenv("POSTGRES_USER")
-    PGPASSWORD = os.getenv("POSTGRES_PASSWORD")
-    PGDATABASE = os.getenv("POSTGRES_DB")
-
-
-    # Collect into a dict for nice reporting
-    env_vars = {
-        "PGHOST": PGHOST,
-        "PGPORT": PGPORT,
-        "POSTGRES_USER": PGUSER,
-        "POSTGRES_PASSWORD": PGPASSWORD,
-        "POSTGRES_DB": PGDATABASE,
-    }
-
-    conn = psycopg2.connect(host="localhost", port=PGPORT, user=PGUSER, password=PGPASSWORD, dbname=PGDATABASE)
-    return conn
+    """
+    Borrow a connection from the process-wide pool. Use it as a context manager:
+    the connection goes back to the pool when the `with` block ends.
+    """
+    from src.resources import get_registry
+    return get_registry().sql_connection()
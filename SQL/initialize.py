@@ -1,5 +1,8 @@
 from .connection import connect_to_sql_database
 import psycopg2
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
 
 class CreationError(Exception):
     PREFIX = "❌ Creation of Table failed: "
@@ -34,6 +37,12 @@ def create_tables():
                     );
                 """)
 
+                # profile lookups by user (retrieve_profiles_by_user_id(s), feed hydration)
+                cur.execute("CREATE INDEX IF NOT EXISTS profile_user_id_idx ON profile(user_id);")
+                # follow_user looks users up by first OR last name (retrieve_profile_ids), one index per column
+                cur.execute("CREATE INDEX IF NOT EXISTS profile_first_name_idx ON profile(first_name);")
+                cur.execute("CREATE INDEX IF NOT EXISTS profile_last_name_idx ON profile(last_name);")
+
                 cur.execute("""
                     CREATE TABLE IF NOT EXISTS api_tokens (
                         token TEXT PRIMARY KEY,
@@ -42,13 +51,36 @@ def create_tables():
                     );
                 """)
 
+                # Transactional outbox of user changes, see SQL/outbox.py. No foreign key:
+                # delete events must outlive the user row.
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS user_outbox (
+                        id BIGSERIAL PRIMARY KEY,
+                        txid BIGINT NOT NULL DEFAULT txid_current(),
+                        user_id INTEGER NOT NULL,
+                        event VARCHAR(20) NOT NULL,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                    );
+                """)
+                cur.execute("CREATE INDEX IF NOT EXISTS user_outbox_txid_id_idx ON user_outbox(txid, id);")
+
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS outbox_checkpoints (
+                        consumer VARCHAR(50) PRIMARY KEY,
+                        last_txid BIGINT NOT NULL,
+                        last_id BIGINT NOT NULL,
+                        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                    );
+                """)
+
                 conn.commit()
-                print("✅ 'users' table created successfully.")
-                print("✅ 'profile' table created successfully.")
-                print("✅ 'api_tokens' table created successfully.")
+                logger.info("✅ 'users' table created successfully.")
+                logger.info("✅ 'profile' table created successfully.")
+                logger.info("✅ 'api_tokens' table created successfully.")
+                logger.info("✅ 'user_outbox' and 'outbox_checkpoints' tables created successfully.")
 
     except psycopg2.Error as e:
             raise CreationError("Database error") from e
     except Exception as e:
-        print(f"❌ Creation of Table failed: {e}")
+        logger.error("❌ Creation of Table failed: %s", e)
         raise
\ No newline at end of file
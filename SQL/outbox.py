@@ -0,0 +1,137 @@
+"""
+Transactional outbox of user changes.
+
+record_user_change() is called with the cursor of the transaction that changes
+a user or profile, so the outbox row commits (or rolls back) together with the
+change. Consumers such as NeoDB.user_sync read the rows in batches and keep
+their position in outbox_checkpoints.
+
+Rows carry the id of the transaction that wrote them. fetch_user_changes() only
+returns rows of transactions older than every transaction still running, so a
+row can never appear behind a checkpoint that was already saved, even when
+transactions commit out of order.
+
+Pruning keeps the events of the last RETENTION_SECONDS, so in-process readers
+that follow the outbox from outbox_head() without a checkpoint of their own
+(src/user_search.py) do not lose events to another consumer's prune.
+"""
+import psycopg2
+
+from SQL.connection import connect_to_sql_database
+from SQL.sql_error import OutboxError
+
+# user_outbox.event values
+REGISTERED = "registered"
+PROFILE_CHANGED = "profile_changed"
+DELETED = "deleted"
+
+RETENTION_SECONDS = 600
+
+
+def record_user_change(cur, user_id, event):
+    """Append an event for user_id within the caller's transaction (does not commit)."""
+    cur.execute("INSERT INTO user_outbox (user_id, event) VALUES (%s, %s);", (user_id, event))
+
+
+def get_checkpoint(consumer):
+    """(txid, id) of the last event consumer has processed, (0, 0) if it never ran."""
+    try:
+        with connect_to_sql_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT last_txid, last_id FROM outbox_checkpoints WHERE consumer = %s;", (consumer,))
+                row = cur.fetchone()
+                return (row[0], row[1]) if row else (0, 0)
+    except psycopg2.Error as e:
+        raise OutboxError(f"Failed to read checkpoint of {consumer}") from e
+
+
+def outbox_head():
+    """(txid, id) of the newest event fetch_user_changes() can return now, (0, 0) if there is none."""
+    try:
+        with connect_to_sql_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT txid, id FROM user_outbox
+                    WHERE txid < txid_snapshot_xmin(txid_current_snapshot())
+                    ORDER BY txid DESC, id DESC
+                    LIMIT 1;
+                """)
+                row = cur.fetchone()
+                return (row[0], row[1]) if row else (0, 0)
+    except psycopg2.Error as e:
+        raise OutboxError("Failed to read the outbox head") from e
+
+
+def fetch_user_changes(checkpoint, limit=1000):
+    """
+    Next events after checkpoint in (txid, id) order.
+    :return: [{"txid", "id", "user_id", "event"}, ...]
+    """
+    last_txid, last_id = checkpoint
+    try:
+        with connect_to_sql_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT txid, id, user_id, event FROM user_outbox
+                    WHERE (txid, id) > (%s, %s)
+                      AND txid < txid_snapshot_xmin(txid_current_snapshot())
+                    ORDER BY txid, id
+                    LIMIT %s;
+                """, (last_txid, last_id, limit))
+                return [{"txid": r[0], "id": r[1], "user_id": r[2], "event": r[3]} for r in cur.fetchall()]
+    except psycopg2.Error as e:
+        raise OutboxError("Failed to fetch user changes") from e
+
+
+def save_checkpoint(consumer, checkpoint, prune=True, retention=RETENTION_SECONDS):
+    """
+    Store the position of consumer. With prune, events up to it that are older than
+    retention seconds are deleted in the same transaction (only valid while consumer
+    is the outbox's only reader with a checkpoint).
+    """
+    last_txid, last_id = checkpoint
+    try:
+        with connect_to_sql_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO outbox_checkpoints (consumer, last_txid, last_id, updated_at)
+                    VALUES (%s, %s, %s, NOW())
+                    ON CONFLICT (consumer) DO UPDATE
+                    SET last_txid = EXCLUDED.last_txid, last_id = EXCLUDED.last_id, updated_at = NOW();
+                """, (consumer, last_txid, last_id))
+                if prune:
+                    cur.execute("""
+                        DELETE FROM user_outbox
+                        WHERE (txid, id) <= (%s, %s) AND created_at < NOW() - %s * INTERVAL '1 second';
+                    """, (last_txid, last_id, retention))
+                conn.commit()
+    except psycopg2.Error as e:
+        raise OutboxError(f"Failed to save checkpoint of {consumer}") from e
+
+
+def retrieve_user_names(user_ids):
+    """
+    Current graph name of each user that still exists, with the rule of
+    retrieve_all_users ("first_name last_name", else username).
+    :return: {user_id: name}
+    """
+    if not user_ids:
+        return {}
+    try:
+        with connect_to_sql_database() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT DISTINCT ON (u.id)
+                        u.id,
+                        COALESCE(
+                            NULLIF(TRIM(COALESCE(p.first_name, '') || ' ' || COALESCE(p.last_name, '')), ''),
+                            p.username
+                        ) AS name
+                    FROM users u
+                    LEFT JOIN profile p ON p.user_id = u.id
+                    WHERE u.id = ANY(%s)
+                    ORDER BY u.id, p.id;
+                """, (list(user_ids),))
+                return {row[0]: row[1] for row in cur.fetchall()}
+    except psycopg2.Error as e:
+        raise OutboxError("Failed to fetch user names") from e
@@ -0,0 +1,181 @@
+"""
+Whitelisted builder for the dynamic statements of the SQL layer, run as
+server-side prepared statements.
+
+Callers pass column names as data (e.g. the keys of a profile update). Every
+name is checked against the columns the table allows for that use, and the
+statement text only depends on the set of columns, in whitelist order, never on
+the order or spelling of the caller's keys. So each column set maps to one
+canonical statement, named after a hash of its text.
+
+execute() PREPAREs a statement once per connection (the server parses and
+plans it then) and afterwards only sends EXECUTE with the values. Pooled
+connections keep the names of their prepared statements, and the statements
+live as long as the database session. statement_stats() counts prepares and
+executions per statement; server_statements() shows the server's view,
+including how often it planned a generic or a custom plan.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import psycopg2
+import psycopg2.errors
+
+from SQL.sql_error import QueryError
+from src.instrumentation import register_sql_operation
+
+# table -> use -> allowed columns, in the order they appear in statements
+COLUMNS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "profile": {
+        "set": ("username", "first_name", "last_name", "updated_at"),
+        "where": ("id", "user_id", "username", "first_name", "last_name"),
+        "select": ("id", "user_id", "username", "first_name", "last_name", "updated_at"),
+    },
+    "users": {
+        "set": ("email", "password_hash", "updated_at"),
+        "where": ("id",),
+        "select": ("id", "email", "created_at", "updated_at"),
+    },
+}
+OPERATIONS = ("AND", "OR")
+
+
+@dataclass(frozen=True)
+class Statement:
+    name: str                   # prepared statement name
+    text: str                   # statement with $1..$n placeholders
+    params: Tuple[str, ...]     # column of each placeholder, in order
+    operation: str              # instrumentation name, e.g. "UPDATE profile"
+
+    @property
+    def execute_text(self) -> str:
+        if not self.params:
+            return f"EXECUTE {self.name}"
+        return f"EXECUTE {self.name} ({', '.join(['%s'] * len(self.params))})"
+
+
+def _canonical(table: str, use: str, columns: Iterable[str]) -> Tuple[str, ...]:
+    """The columns in whitelist order. Raises QueryError for any column outside the whitelist."""
+    allowed = COLUMNS.get(table, {}).get(use)
+    if allowed is None:
+        raise QueryError(f"unknown table {table!r}")
+    columns = set(columns)
+    unknown = sorted(columns - set(allowed))
+    if unknown:
+        raise QueryError(f"column(s) {', '.join(map(repr, unknown))} not allowed in {use} of {table}")
+    return tuple(c for c in allowed if c in columns)
+
+
+def _statement(text: str, params: Tuple[str, ...], operation: str) -> Statement:
+    name = "tj_" + hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+    statement = Statement(name=name, text=text, params=params, operation=operation)
+    register_sql_operation(statement.execute_text, operation)
+    return statement
+
+
+def update_statement(table: str, columns: Iterable[str], key: str = "id", returning: Optional[str] = None) -> Statement:
+    """UPDATE table SET <columns> WHERE key = ... [RETURNING returning]"""
+    return _update_statement(
+        table, _canonical(table, "set", columns), _canonical(table, "where", [key])[0],
+        None if returning is None else _canonical(table, "select", [returning])[0],
+    )
+
+
+@lru_cache(maxsize=1024)
+def _update_statement(table: str, columns: Tuple[str, ...], key: str, returning: Optional[str]) -> Statement:
+    if not columns:
+        raise QueryError("nothing to update")
+    assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(columns, start=1))
+    text = f"UPDATE {table} SET {assignments} WHERE {key} = ${len(columns) + 1}"
+    if returning is not None:
+        text += f" RETURNING {returning}"
+    return _statement(text, columns + (key,), f"UPDATE {table}")
+
+
+def select_statement(table: str, select: Sequence[str], columns: Iterable[str], operation: str = "AND") -> Statement:
+    """SELECT <select> FROM table [WHERE column = ... AND|OR ...]"""
+    operation = str(operation).strip().upper()
+    if operation not in OPERATIONS:
+        raise QueryError(f"operation must be one of {OPERATIONS}, got {operation!r}")
+    select = tuple(select)
+    if not select:
+        raise QueryError("nothing to select")
+    _canonical(table, "select", select)     # validates, the select list keeps the caller's order
+    return _select_statement(table, select, _canonical(table, "where", columns), operation)
+
+
+@lru_cache(maxsize=1024)
+def _select_statement(table: str, select: Tuple[str, ...], columns: Tuple[str, ...], operation: str) -> Statement:
+    text = f"SELECT {', '.join(select)} FROM {table}"
+    if columns:
+        text += " WHERE " + f" {operation} ".join(f"{column} = ${i}" for i, column in enumerate(columns, start=1))
+    return _statement(text, columns, f"SELECT {table}")
+
+
+# Execution
+_stats: Dict[str, Dict[str, Any]] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(statement: Statement, counter: str) -> None:
+    with _stats_lock:
+        entry = _stats.get(statement.name)
+        if entry is None:
+            entry = _stats[statement.name] = {"statement": statement.text, "prepares": 0, "executions": 0}
+        entry[counter] += 1
+
+
+def execute(cur, statement: Statement, values: Mapping[str, Any]) -> None:
+    """
+    Run statement with values (column -> value) on cur, PREPAREd first if its
+    connection has not prepared it yet. Connections that do not track their
+    prepared statements (not from the pool) run the statement unprepared.
+    """
+    params = tuple(values[column] for column in statement.params)
+    prepared = getattr(cur.connection, "prepared_statements", None)
+    if prepared is None:
+        cur.execute(unprepared_text(statement), params)
+        _count(statement, "executions")
+        return
+
+    if statement.name not in prepared:
+        cur.execute(f"PREPARE {statement.name} AS {statement.text}")
+        prepared.add(statement.name)
+        _count(statement, "prepares")
+    try:
+        cur.execute(statement.execute_text, params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        # the session lost its prepared statements (e.g. DISCARD ALL); prepare again next time
+        prepared.discard(statement.name)
+        raise
+    _count(statement, "executions")
+
+
+@lru_cache(maxsize=1024)
+def unprepared_text(statement: Statement) -> str:
+    """The statement with %s placeholders, to run it unprepared or EXPLAIN it."""
+    text = statement.text
+    for i in range(len(statement.params), 0, -1):
+        text = text.replace(f"${i}", "%s")
+    return text
+
+
+def statement_stats() -> List[Dict[str, Any]]:
+    """Prepares and executions per statement in this process, most executed first."""
+    with _stats_lock:
+        entries = [{"name": name, **entry} for name, entry in _stats.items()]
+    return sorted(entries, key=lambda e: e["executions"], reverse=True)
+
+
+def server_statements(cur) -> List[Dict[str, Any]]:
+    """The prepared statements of cur's session with the server's plan counts (PostgreSQL 14+)."""
+    cur.execute("SELECT name, statement, generic_plans, custom_plans FROM pg_prepared_statements ORDER BY name;")
+    return [
+        {"name": name, "statement": statement, "generic_plans": generic, "custom_plans": custom}
+        for name, statement, generic, custom in cur.fetchall()
+    ]
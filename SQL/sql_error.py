@@ -21,4 +21,16 @@ class ProfileError(Exception):
     PREFIX = "❌ Profile error: "
 
     def __init__(self, message):
-        super().__init__(self.PREFIX + str(message))
\ No newline at end of file
+        super().__init__(self.PREFIX + str(message))
+
+class OutboxError(Exception):
+    PREFIX = "❌ Outbox error: "
+
+    def __init__(self, message):
+        super().__init__(self.PREFIX + str(message))
+
+class QueryError(Exception):
+    PREFIX = "❌ Query error: "
+
+    def __init__(self, message):
+        super().__init__(self.PREFIX + str(message))
@@ -0,0 +1,110 @@
+"""
+Per-request cost of the ranked feed (src/feed_ranking.py), no databases needed.
+
+For each candidate set size, synthetic followee posts and a viewer affinity are
+generated once and served from memory. Per request the whole FeedRanker.rank()
+call is timed (conversion of the Post objects to column arrays, scoring and
+top-k, i.e. everything but the MongoDB read), and separately score_candidates +
+top_k alone on columns built once.
+
+Two gates: --budget-ms on the rank() p99 at FeedRanker's default candidate count
+(the conversion dominates it), and --score-budget-ms on the scoring p99 at every
+size, which has to stay well under a millisecond.
+
+Usage
+    python -m benchmarks.feed_ranking --candidates 500 2000 5000 --requests 2000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import numpy as np
+
+from MongoDB.mongo_repo import Post
+from src.feed_ranking import (
+    DEFAULT_CANDIDATES, Affinity, Candidates, FeedRanker, RankingWeights, score_candidates, top_k,
+)
+
+TOPICS = [f"topic{i}" for i in range(200)]
+
+
+def synthetic_posts(n: int, authors: int, rng: np.random.Generator) -> List[Post]:
+    now = datetime.now(timezone.utc)
+    ages = rng.exponential(36.0, n)
+    likes = np.minimum(5000, (rng.pareto(2.0, n) + 1.0) * 5).astype(int)
+    posts = []
+    for i in range(n):
+        created = now - timedelta(hours=float(ages[i]))
+        topics = [TOPICS[t] for t in rng.choice(len(TOPICS), size=int(rng.integers(0, 4)), replace=False)]
+        posts.append(Post(
+            id=f"{i:024x}", user_id=int(rng.integers(1, authors + 1)), title="t", text="x",
+            topics=topics, likes=int(likes[i]), created_at=created, updated_at=created,
+        ))
+    return posts
+
+
+class StaticPosts:
+    """Stands in for MongoPostsRepository in FeedRanker: the same posts and affinity for every request."""
+
+    def __init__(self, posts: List[Post], affinity: Affinity):
+        self.posts = posts
+        self.affinity = affinity
+
+    def get_posts_by_users(self, user_ids, limit: int = 10) -> List[Post]:
+        return self.posts[:limit]
+
+    def like_affinity(self, user_id) -> Affinity:
+        return self.affinity
+
+
+def percentiles_ms(fn, requests: int) -> np.ndarray:
+    timings = np.empty(requests)
+    for r in range(requests):
+        start = time.perf_counter()
+        fn()
+        timings[r] = time.perf_counter() - start
+    return np.percentile(timings * 1000, [50, 99])
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ranked feed scoring.")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[500, 2000, 5000])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=2.0,
+                        help=f"fail if the rank() p99 at {DEFAULT_CANDIDATES} candidates exceeds this")
+    parser.add_argument("--score-budget-ms", type=float, default=0.75,
+                        help="fail if the scoring p99 at any size exceeds this")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    weights = RankingWeights()
+    failed = False
+    print(f"{'candidates':>10} {'rank p50 ms':>12} {'rank p99 ms':>12} {'score p50 ms':>13} {'score p99 ms':>13}")
+    for n in args.candidates:
+        posts = synthetic_posts(n, authors=300, rng=rng)
+        affinity = (
+            {int(a): int(c) for a, c in zip(rng.integers(1, 301, 80), rng.integers(1, 20, 80))},
+            {TOPICS[t]: int(rng.integers(1, 30)) for t in rng.choice(len(TOPICS), 40, replace=False)},
+        )
+        ranker = FeedRanker(StaticPosts(posts, affinity), weights, candidates=n)
+        rank_p50, rank_p99 = percentiles_ms(lambda: ranker.rank(1, [1], limit=args.k), args.requests)
+
+        candidates = Candidates.from_posts(posts)
+        score_p50, score_p99 = percentiles_ms(
+            lambda: top_k(score_candidates(candidates, affinity, weights, time.time()), args.k), args.requests,
+        )
+        over = score_p99 > args.score_budget_ms or (n == DEFAULT_CANDIDATES and rank_p99 > args.budget_ms)
+        failed |= over
+        print(f"{n:>10} {rank_p50:>12.3f} {rank_p99:>12.3f} {score_p50:>13.4f} {score_p99:>13.4f}"
+              + ("  over budget" if over else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+Operation = Callable[[int], Any]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    concurrency: int
+    iterations: int
+    errors: int
+    seconds: float
+    throughput: float   # operations per second
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def run_benchmark(name: str, operation: Operation, iterations: int = 1000, concurrency: int = 1, warmup: int = 20) -> BenchmarkResult:
+    """
+    Call operation(i) for i in range(iterations) from `concurrency` threads and
+    measure the latency of every call. warmup calls are made first and not measured.
+    """
+    for i in range(min(warmup, iterations)):
+        operation(-1 - i)
+
+    latencies = np.zeros(iterations, dtype=np.float64)
+    errors = [0]
+    lock = threading.Lock()
+
+    def call(i: int) -> None:
+        start = time.perf_counter()
+        try:
+            operation(i)
+        except Exception:
+            with lock:
+                errors[0] += 1
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(iterations):
+            call(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(call, range(iterations)))
+    seconds = time.perf_counter() - start
+
+    ms = latencies * 1000
+    return BenchmarkResult(
+        name=name,
+        concurrency=concurrency,
+        iterations=iterations,
+        errors=errors[0],
+        seconds=seconds,
+        throughput=iterations / seconds if seconds else 0.0,
+        mean_ms=float(ms.mean()),
+        p50_ms=float(np.percentile(ms, 50)),
+        p95_ms=float(np.percentile(ms, 95)),
+        p99_ms=float(np.percentile(ms, 99)),
+        max_ms=float(ms.max()),
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: List[BenchmarkResult], directory: str, config: Dict[str, Any]) -> str:
+    """Write results to <directory>/<commit>-<timestamp>.json and return the path."""
+    os.makedirs(directory, exist_ok=True)
+    commit = _git_commit()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(directory, f"{commit or 'nocommit'}-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": stamp,
+            "config": config,
+            "results": [asdict(r) for r in results],
+        }, f, indent=2)
+    return path
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """{"<name>@<concurrency>": result dict} of a saved run."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {f"{r['name']}@{r['concurrency']}": r for r in data["results"]}
+
+
+def compare(baseline_path: str, current_path: str, tolerance: float = 0.10) -> List[str]:
+    """
+    Compare two saved runs. A benchmark regresses when its p95 latency grew or its
+    throughput dropped by more than tolerance.
+    :return: one line per regression
+    """
+    baseline, current = load_results(baseline_path), load_results(current_path)
+    regressions = []
+    for key, now in sorted(current.items()):
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {before['p95_ms']:.3f} ms -> {now['p95_ms']:.3f} ms")
+        if before["throughput"] and now["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {before['throughput']:.1f}/s -> {now['throughput']:.1f}/s")
+    return regressions
+
+
+def format_table(results: List[BenchmarkResult]) -> str:
+    lines = [f"{'benchmark':28} {'conc':>5} {'ops/s':>10} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'err':>5}"]
+    for r in results:
+        lines.append(
+            f"{r.name:28} {r.concurrency:>5} {r.throughput:>10.1f} {r.p50_ms:>9.3f} {r.p95_ms:>9.3f} {r.p99_ms:>9.3f} {r.errors:>5}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,73 @@
+"""
+Import-time budget of the modules that CLI tools and workers start from.
+
+Each module is imported in a fresh interpreter (median of --runs runs) and must
+stay below its budget and must not pull in the drivers of stores it does not
+use. Exits 1 when a budget is exceeded or a forbidden module was imported.
+
+Usage
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 9 --scale 2.0    # slower machines
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# module -> (budget in ms, packages it must not import)
+BUDGETS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "src.config": (50, ("dotenv", "psycopg2", "pymongo", "neo4j")),
+    "src.instrumentation": (50, ("psycopg2", "pymongo", "neo4j")),
+    "src.resources": (60, ("psycopg2", "pymongo", "neo4j")),
+    "SQL.Profil.retrieve": (150, ("pymongo", "neo4j", "numpy")),
+    "SQL.Authentication.user": (150, ("pymongo", "neo4j", "numpy")),
+    "MongoDB.mongo_repo": (250, ("psycopg2", "neo4j")),
+    "NeoDB.neo4j_repo": (60, ("neo4j", "psycopg2", "pymongo")),
+    "NeoDB.follow_graph": (150, ("neo4j", "psycopg2", "pymongo", "scipy")),
+    "src.topjodel_backend": (400, ("neo4j", "scipy", "pyarrow")),
+    "src.analytics_export": (60, ("pyarrow", "psycopg2", "pymongo", "neo4j")),
+}
+
+_PROBE = "import sys, time, json; t = time.perf_counter(); import {module}; " \
+         "print(json.dumps([time.perf_counter() - t, sorted(sys.modules)]))"
+
+
+def measure(module: str, runs: int = 5) -> Tuple[float, List[str]]:
+    """Median import time of module in ms and the modules it loaded."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings, loaded = [], []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module)],
+            capture_output=True, text=True, check=True, cwd=root,
+        ).stdout
+        seconds, loaded = json.loads(out.splitlines()[-1])
+        timings.append(seconds * 1000)
+    return statistics.median(timings), loaded
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the entry modules.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    print(f"{'module':28} {'ms':>8} {'budget':>8}  forbidden imports")
+    for module, (budget, forbidden) in BUDGETS.items():
+        ms, loaded = measure(module, args.runs)
+        leaked = sorted(p for p in forbidden if p in loaded)
+        over = ms > budget * args.scale
+        failures += over or bool(leaked)
+        flag = "FAIL" if over or leaked else "ok"
+        print(f"{module:28} {ms:>8.1f} {budget * args.scale:>8.0f}  {', '.join(leaked) or '-'}  {flag}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
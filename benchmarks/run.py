@@ -0,0 +1,167 @@
+"""
+Benchmarks of the core user journeys.
+
+Targets
+  - containers: the docker compose databases. Seeds them with src.datagen unless
+    --no-generate is given. All journeys are available.
+  - inprocess: mongomock and an in-memory follow graph, no containers needed.
+    Only the journeys that do not touch PostgreSQL are available.
+
+Every journey is run at each --concurrency level; results are printed, saved as
+JSON under --results and optionally compared with a previous run (--compare).
+
+Usage
+    python -m benchmarks.run --target inprocess --users 2000 --posts 20000
+    python -m benchmarks.run --target containers --users 100000 --posts 1000000 --concurrency 1 8 32
+    python -m benchmarks.run --target inprocess --compare benchmarks/results/<previous>.json
+"""
+from __future__ import annotations
+
+import argparse
+import secrets
+import sys
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.harness import compare, format_table, run_benchmark, save_results
+from src.datagen import PASSWORD, GenConfig, generate, generate_follows, generate_posts, generate_users
+from src.instrumentation import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+Journeys = Dict[str, Callable[[int], Any]]
+
+
+def inprocess_journeys(cfg: GenConfig, sample: int = 1000) -> Journeys:
+    from benchmarks.standins import InMemoryNeo4jRepository, mongomock_posts_repository
+    from src.topjodel_backend import TopJodelBackend
+
+    posts_repo = mongomock_posts_repository()
+    for chunk in cfg.chunks(cfg.posts):
+        posts, likes = generate_posts(cfg, chunk)
+        posts_repo.posts.insert_many(posts)
+        if likes:
+            posts_repo.likes.insert_many(likes)
+
+    user_ids = [u["id"] for chunk in cfg.chunks(cfg.users) for u in generate_users(cfg, chunk)]
+    follows = [f for chunk in cfg.chunks(cfg.users) for f in generate_follows(cfg, chunk)]
+    backend = TopJodelBackend(mongo_repo=posts_repo, neo_repo=InMemoryNeo4jRepository(user_ids, follows))
+    backend.follow_graph.load()
+
+    return _mongo_and_graph_journeys(backend, np.asarray(user_ids), sample, cfg.seed)
+
+
+def containers_journeys(cfg: GenConfig, sample: int = 1000) -> Journeys:
+    from SQL.Authentication.api_token import issue_token, validate_token
+    from SQL.Authentication.user import login_user, register_user
+    from SQL.connection import connect_to_sql_database
+    from src.topjodel_backend import TopJodelBackend
+
+    backend = TopJodelBackend()
+    backend.follow_graph.load()
+
+    with connect_to_sql_database() as conn:
+        with conn.cursor() as cur:
+            # only users of src.datagen, they all share its PASSWORD
+            cur.execute(
+                "SELECT u.id, u.email, p.first_name, p.last_name FROM users u JOIN profile p ON p.user_id = u.id "
+                "WHERE u.email LIKE 'gen%%@example.ch' ORDER BY random() LIMIT %s;", (sample,)
+            )
+            rows = cur.fetchall()
+    if not rows:
+        raise SystemExit("no generated users in PostgreSQL, run without --no-generate first")
+
+    user_ids = np.asarray([r[0] for r in rows])
+    emails = [r[1] for r in rows]
+    names = [(r[2], r[3]) for r in rows]
+    tokens = [issue_token(int(u)) for u in user_ids[:min(len(user_ids), 200)]]
+    run_id = secrets.token_hex(4)
+
+    journeys = _mongo_and_graph_journeys(backend, user_ids, sample, cfg.seed)
+    journeys.update({
+        "register_user": lambda i: register_user(
+            f"bench{run_id}{i + 100}".replace("-", "n"), f"bench{run_id}{i + 100}@example.ch", "Bench1234", "Bench", "User"
+        ),
+        "login_user": lambda i: login_user(emails[i % len(emails)], PASSWORD),
+        "validate_token": lambda i: validate_token(int(user_ids[i % len(tokens)]), tokens[i % len(tokens)]),
+        "follow_user": lambda i: backend.follow_user(
+            int(user_ids[i % len(user_ids)]), *names[(i * 7 + 1) % len(names)]
+        ),
+    })
+    return journeys
+
+
+def _mongo_and_graph_journeys(backend, user_ids: np.ndarray, sample: int, seed: int) -> Journeys:
+    rng = np.random.default_rng(seed)
+    users = rng.choice(user_ids, size=min(sample, len(user_ids)), replace=False).astype(int).tolist()
+    post_ids = [str(d["_id"]) for d in backend.mongo_repo.posts.find({}, {"_id": 1}).limit(sample)]
+
+    def pick(i: int) -> int:
+        return users[i % len(users)]
+
+    def news_feed_cold(i: int):
+        backend.feed_cache.invalidate(pick(i))
+        return backend.get_news_feed(pick(i), limit=10)
+
+    return {
+        "create_post": lambda i: backend.create_post(pick(i), "Benchmark", "benchmark post", ["bench"]),
+        "add_like": lambda i: backend.mongo_repo.add_like(post_ids[i % len(post_ids)], pick(i * 31 + 7)),
+        "get_posts_by_user": lambda i: backend.mongo_repo.get_posts_by_user(pick(i), limit=20),
+        "get_news_feed": lambda i: backend.get_news_feed(pick(i), limit=10),
+        "get_news_feed_cold": news_feed_cold,
+        "get_news_feed_ranked": lambda i: backend.get_news_feed(pick(i), limit=10, ranked=True),
+        "follow": lambda i: backend.follow(pick(i), pick(i * 13 + 5)) if pick(i) != pick(i * 13 + 5) else False,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the TopJodel user journeys.")
+    parser.add_argument("--target", choices=["inprocess", "containers"], default="inprocess")
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--posts", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-generate", action="store_true", help="containers: benchmark the data already loaded")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--journeys", nargs="+", help="only run these journeys")
+    parser.add_argument("--results", default="benchmarks/results", help="directory for JSON results")
+    parser.add_argument("--compare", help="saved JSON run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    cfg = GenConfig(users=args.users, posts=args.posts, seed=args.seed)
+    if args.target == "inprocess":
+        journeys = inprocess_journeys(cfg)
+    else:
+        if not args.no_generate:
+            generate(cfg)
+        journeys = containers_journeys(cfg)
+
+    selected = args.journeys or list(journeys)
+    missing = [name for name in selected if name not in journeys]
+    if missing:
+        parser.error(f"journeys not available on target {args.target}: {', '.join(missing)}")
+
+    results = []
+    for name in selected:
+        for concurrency in args.concurrency:
+            result = run_benchmark(name, journeys[name], args.iterations, concurrency)
+            logger.info("%s @%s: %.1f ops/s, p95 %.3f ms", name, concurrency, result.throughput, result.p95_ms)
+            results.append(result)
+
+    print(format_table(results))
+    path = save_results(results, args.results, {**vars(args), "dataset": {"users": cfg.users, "posts": cfg.posts}})
+    print(f"Results saved to {path}")
+
+    if args.compare:
+        regressions = compare(args.compare, path, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
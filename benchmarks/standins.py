@@ -0,0 +1,93 @@
+"""In-process stand-ins for MongoDB and Neo4j, used by the benchmarks when no containers run."""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+from MongoDB.mongo_repo import MongoPostsRepository
+from NeoDB.follow_graph import FollowGraph
+from NeoDB.neo4j_repo import Neo4jRepository, UserNotFound
+
+
+def mongomock_posts_repository(db_name: str = "appdb") -> MongoPostsRepository:
+    """MongoPostsRepository over a mongomock database."""
+    import mongomock
+
+    return _MockPostsRepository(mongomock.MongoClient()[db_name])
+
+
+class _MockPostsRepository(MongoPostsRepository):
+    def _ensure_indexes(self) -> None:
+        # mongomock does not implement collMod, the schema validator is skipped. It also
+        # checks unique indexes with a scan per insert, so (post_id, user_id) is not unique
+        # here; add_like stays idempotent through its upsert.
+        self.posts.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        self.posts.create_index([("topics", ASCENDING)])
+        self.posts.create_index([("created_at", DESCENDING)])
+        self.likes.create_index([("post_id", ASCENDING), ("user_id", ASCENDING)])
+        self.likes.create_index([("post_id", ASCENDING)])
+        self.likes.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        self.archived_posts.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        self.archived_likes.create_index([("post_id", ASCENDING), ("user_id", ASCENDING)])
+
+
+class InMemoryNeo4jRepository(Neo4jRepository):
+    """
+    Neo4jRepository holding the follow graph in Python sets. Answers the follow
+    writes, follow counters and the snapshot queries of FollowGraph; any other
+    Cypher raises NotImplementedError.
+    """
+
+    def __init__(self, user_ids: Iterable[int], follows: Iterable[Tuple[int, int]]):
+        super().__init__(driver=None)
+        self.users: Set[int] = set(int(u) for u in user_ids)
+        self.following: Dict[int, Set[int]] = {}
+        self.followers: Dict[int, Set[int]] = {}
+        self._lock = threading.Lock()
+        for a, b in follows:
+            self._add(int(a), int(b))
+
+    def _add(self, a: int, b: int) -> bool:
+        targets = self.following.setdefault(a, set())
+        if b in targets:
+            return False
+        targets.add(b)
+        self.followers.setdefault(b, set()).add(a)
+        return True
+
+    def run_cypher(self, query, params=None):
+        if query == FollowGraph.NODES_QUERY:
+            return [{"id": u} for u in self.users]
+        if query == FollowGraph.EDGES_QUERY:
+            return [{"src": a, "dst": b} for a, bs in self.following.items() for b in bs]
+        raise NotImplementedError("in-memory graph only answers follow-graph snapshot queries")
+
+    def follow(self, follower_id: int, followee_id: int) -> bool:
+        if follower_id not in self.users or followee_id not in self.users:
+            raise UserNotFound(f"user {follower_id} or {followee_id} not found")
+        with self._lock:
+            return self._add(int(follower_id), int(followee_id))
+
+    def follow_many(self, follower_id: int, followee_ids: Iterable[int]) -> List[int]:
+        followed = [int(b) for b in followee_ids if int(b) in self.users and int(b) != int(follower_id)]
+        with self._lock:
+            for b in followed:
+                self._add(int(follower_id), b)
+        return followed
+
+    def unfollow(self, follower_id: int, followee_id: int) -> bool:
+        with self._lock:
+            targets = self.following.get(int(follower_id), set())
+            if int(followee_id) not in targets:
+                return False
+            targets.discard(int(followee_id))
+            self.followers[int(followee_id)].discard(int(follower_id))
+            return True
+
+    def get_follow_counts(self, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        return {
+            int(u): {"followers": len(self.followers.get(int(u), ())), "following": len(self.following.get(int(u), ()))}
+            for u in user_ids
+        }
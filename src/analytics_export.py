@@ -0,0 +1,354 @@
+"""
+Streaming columnar export of the three stores for analytics.
+
+Tables
+  - users:    PostgreSQL users (id, created_at, updated_at; no email or password hash)
+  - profiles: PostgreSQL profile
+  - posts:    MongoDB posts and posts_archive (metadata only, no post text)
+  - likes:    MongoDB post_likes and post_likes_archive
+  - follows:  Neo4j FOLLOWS edges
+
+Every store is read by its own worker thread, in batches: PostgreSQL through a
+server-side (named) cursor in a read-only REPEATABLE READ transaction, MongoDB
+through projected cursors that prefer secondaries, Neo4j through a streamed read
+session. Rows are written as they arrive in chunks of chunk_rows rows (one
+Parquet row group or Arrow record batch each), so memory stays bounded by the
+chunk size whatever the table size.
+
+Output layout
+    <out>/<table>/full-<run>.parquet     full export
+    <out>/<table>/incr-<run>.parquet     rows changed since the previous run
+    <out>/watermarks.json                newest updated_at / created_at exported per table
+
+An incremental run only reads rows whose watermark column is at least the
+stored watermark minus `overlap`, which covers rows committed late with an
+earlier timestamp; the overlap means a row can appear in two files, readers keep
+the newest version per key. Deletions (users, posts, unfollows) and follow edges
+without created_at (created before it was recorded) only show up in full exports.
+Posts are selected by updated_at, which only edits change: like counts and the
+archived flag of a post that was liked or archived since the last run stay
+stale in incremental files until the next full export.
+
+Usage
+    python -m src.analytics_export --out export/
+    python -m src.analytics_export --out export/ --incremental --format arrow
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.instrumentation import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+Row = Tuple[Any, ...]
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # pymongo returns naive datetimes in UTC
+    if value is None or value.tzinfo:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    name: str
+    store: str                              # tables of one store share a worker
+    columns: Tuple[Tuple[str, str], ...]    # (column, type), types see _arrow_schema
+    watermark: str                          # timestamp column that incremental runs filter on
+    read: Callable[["AnalyticsExporter", Optional[datetime]], Iterator[Row]]
+
+
+# Readers: yield rows in column order, only rows with watermark >= since when since is set
+def _sql_rows(exporter: "AnalyticsExporter", query: str, since: Optional[datetime], cursor_name: str) -> Iterator[Row]:
+    with exporter.resources.sql_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;")
+        # named cursor: rows stay on the server and arrive itersize at a time
+        with conn.cursor(name=cursor_name) as cur:
+            cur.itersize = exporter.batch_size
+            cur.execute(query, {"since": since} if since is not None else None)
+            yield from cur
+
+
+def _read_users(exporter: "AnalyticsExporter", since: Optional[datetime]) -> Iterator[Row]:
+    query = "SELECT id, created_at, updated_at FROM users"
+    if since is not None:
+        query += " WHERE updated_at >= %(since)s"
+    return _sql_rows(exporter, query, since, "export_users")
+
+
+def _read_profiles(exporter: "AnalyticsExporter", since: Optional[datetime]) -> Iterator[Row]:
+    query = "SELECT id, user_id, username, first_name, last_name, updated_at FROM profile"
+    if since is not None:
+        query += " WHERE updated_at >= %(since)s"
+    return _sql_rows(exporter, query, since, "export_profiles")
+
+
+def _read_posts(exporter: "AnalyticsExporter", since: Optional[datetime]) -> Iterator[Row]:
+    db = exporter.mongo_db()
+    query = {} if since is None else {"updated_at": {"$gte": since}}
+    projection = {"user_id": 1, "title": 1, "topics": 1, "likes": 1, "created_at": 1, "updated_at": 1}
+    for collection, archived in (("posts", False), ("posts_archive", True)):
+        for d in db[collection].find(query, projection, batch_size=exporter.batch_size):
+            yield (str(d["_id"]), int(d["user_id"]), d.get("title"), d.get("topics") or [], int(d.get("likes", 0)),
+                   archived, d["created_at"], d.get("updated_at", d["created_at"]))
+
+
+def _read_likes(exporter: "AnalyticsExporter", since: Optional[datetime]) -> Iterator[Row]:
+    from bson import ObjectId
+
+    db = exporter.mongo_db()
+    # likes have no updated_at and no created_at index: their ObjectId embeds the creation time
+    query = {} if since is None else {"_id": {"$gte": ObjectId.from_datetime(since)}}
+    projection = {"_id": 0, "post_id": 1, "user_id": 1, "created_at": 1}
+    for collection in ("post_likes", "post_likes_archive"):
+        for d in db[collection].find(query, projection, batch_size=exporter.batch_size):
+            yield str(d["post_id"]), int(d["user_id"]), d["created_at"]
+
+
+def _read_follows(exporter: "AnalyticsExporter", since: Optional[datetime]) -> Iterator[Row]:
+    query = """
+        MATCH (a:User)-[r:FOLLOWS]->(b:User)
+        WHERE $since IS NULL OR r.created_at >= $since
+        RETURN a.userId AS follower_id, b.userId AS followee_id, r.created_at.epochMillis AS created_at
+    """
+    with exporter.resources.neo4j_driver().session(default_access_mode="READ", fetch_size=exporter.batch_size) as session:
+        for record in session.run(query, {"since": since}):
+            millis = record["created_at"]
+            created = None if millis is None else datetime.fromtimestamp(millis / 1000, timezone.utc)
+            yield int(record["follower_id"]), int(record["followee_id"]), created
+
+
+TABLES: Dict[str, ExportTable] = {t.name: t for t in (
+    ExportTable("users", "postgres", (("id", "int64"), ("created_at", "timestamp"), ("updated_at", "timestamp")),
+                "updated_at", _read_users),
+    ExportTable("profiles", "postgres", (
+        ("id", "int64"), ("user_id", "int64"), ("username", "string"), ("first_name", "string"),
+        ("last_name", "string"), ("updated_at", "timestamp"),
+    ), "updated_at", _read_profiles),
+    ExportTable("posts", "mongodb", (
+        ("id", "string"), ("user_id", "int64"), ("title", "string"), ("topics", "list<string>"),
+        ("likes", "int64"), ("archived", "bool"), ("created_at", "timestamp"), ("updated_at", "timestamp"),
+    ), "updated_at", _read_posts),
+    ExportTable("likes", "mongodb", (("post_id", "string"), ("user_id", "int64"), ("created_at", "timestamp")),
+                "created_at", _read_likes),
+    ExportTable("follows", "neo4j", (("follower_id", "int64"), ("followee_id", "int64"), ("created_at", "timestamp")),
+                "created_at", _read_follows),
+)}
+
+
+def _arrow_schema(table: ExportTable):
+    import pyarrow as pa
+
+    types = {
+        "int64": pa.int64(),
+        "string": pa.string(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "list<string>": pa.list_(pa.string()),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in table.columns])
+
+
+def _chunks(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+class AnalyticsExporter:
+    FORMATS = ("parquet", "arrow")
+
+    def __init__(
+        self,
+        out_dir: str,
+        fmt: str = "parquet",
+        chunk_rows: int = 50_000,
+        batch_size: int = 5_000,
+        overlap: timedelta = timedelta(minutes=5),
+        resources=None,
+    ):
+        """
+        :param fmt: "parquet" (zstd compressed) or "arrow" (Arrow IPC file)
+        :param chunk_rows: rows per row group / record batch, bounds the memory per table
+        :param batch_size: rows fetched per round trip from the stores
+        :param overlap: how far incremental runs re-read before the stored watermark
+        :param resources: ResourceRegistry to borrow clients from, the process-wide one by default
+        """
+        if fmt not in self.FORMATS:
+            raise ValueError(f"format must be one of {self.FORMATS}")
+        if resources is None:
+            from src.resources import get_registry
+            resources = get_registry()
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.chunk_rows = chunk_rows
+        self.batch_size = batch_size
+        self.overlap = overlap
+        self.resources = resources
+
+    def mongo_db(self):
+        """The export database handle: reads go to a secondary when the deployment has one."""
+        from pymongo import ReadPreference
+
+        return self.resources.mongo_client().get_database(
+            self.resources.mongo_db_name, read_preference=ReadPreference.SECONDARY_PREFERRED,
+        )
+
+    # Watermarks
+    @property
+    def watermarks_path(self) -> str:
+        return os.path.join(self.out_dir, "watermarks.json")
+
+    def load_watermarks(self) -> Dict[str, datetime]:
+        if not os.path.exists(self.watermarks_path):
+            return {}
+        with open(self.watermarks_path, "r", encoding="utf-8") as f:
+            return {name: datetime.fromisoformat(value) for name, value in json.load(f).items()}
+
+    def save_watermarks(self, watermarks: Dict[str, datetime]) -> None:
+        tmp = self.watermarks_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({name: value.isoformat() for name, value in sorted(watermarks.items())}, f, indent=2)
+        os.replace(tmp, self.watermarks_path)
+
+    # Export
+    def export(self, tables: Optional[Sequence[str]] = None, incremental: bool = False) -> Dict[str, int]:
+        """
+        Export tables (all by default), one worker per store.
+        Watermarks of the tables that finished are saved even when another table failed.
+        :return: rows written per table
+        """
+        selected = [TABLES[name] for name in (tables or TABLES)]
+        os.makedirs(self.out_dir, exist_ok=True)
+        watermarks = self.load_watermarks()
+        run = ("incr-" if incremental else "full-") + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+        by_store: Dict[str, List[ExportTable]] = {}
+        for table in selected:
+            by_store.setdefault(table.store, []).append(table)
+
+        rows: Dict[str, int] = {}
+        errors: List[Exception] = []
+        with ThreadPoolExecutor(max_workers=len(by_store), thread_name_prefix="export") as pool:
+            futures = [
+                pool.submit(self._export_store, store_tables, watermarks if incremental else {}, run)
+                for store_tables in by_store.values()
+            ]
+            for future in futures:
+                results, error = future.result()
+                if error is not None:
+                    errors.append(error)
+                for name, (count, high) in results.items():
+                    rows[name] = count
+                    if high is not None and (name not in watermarks or high > watermarks[name]):
+                        watermarks[name] = high
+
+        self.save_watermarks(watermarks)
+        if errors:
+            raise errors[0]
+        return rows
+
+    def _export_store(
+        self, tables: List[ExportTable], watermarks: Dict[str, datetime], run: str,
+    ) -> Tuple[Dict[str, Tuple[int, Optional[datetime]]], Optional[Exception]]:
+        """Export the tables of one store in order. :return: (results of the finished tables, error)"""
+        results: Dict[str, Tuple[int, Optional[datetime]]] = {}
+        for table in tables:
+            since = watermarks.get(table.name)
+            if since is not None:
+                since -= self.overlap
+            try:
+                results[table.name] = self.export_table(table, since, run)
+            except Exception as e:
+                logger.error("❌ Export of %s failed: %s", table.name, e)
+                return results, e
+        return results, None
+
+    def export_table(self, table: ExportTable, since: Optional[datetime], run: str) -> Tuple[int, Optional[datetime]]:
+        """
+        Stream the rows of table into <out>/<table>/<run>.<ext>; nothing is written when no row changed.
+        :return: (rows written, highest watermark column value)
+        """
+        import pyarrow as pa
+
+        directory = os.path.join(self.out_dir, table.name)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{run}.{self.fmt}")
+        tmp = path + ".tmp"
+
+        schema = _arrow_schema(table)
+        watermark = [name for name, _ in table.columns].index(table.watermark)
+        count, high = 0, None
+        writer = None
+        try:
+            for chunk in _chunks(table.read(self, since), self.chunk_rows):
+                columns = list(zip(*chunk))
+                batch = pa.RecordBatch.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema,
+                )
+                if writer is None:
+                    writer = self._open_writer(tmp, schema)
+                writer.write_batch(batch)
+                count += len(chunk)
+                newest = max((_utc(v) for v in columns[watermark] if v is not None), default=None)
+                if newest is not None and (high is None or newest > high):
+                    high = newest
+            if writer is not None:
+                writer.close()
+                writer = None
+                os.replace(tmp, path)
+        finally:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        logger.info("✅ Exported %s row(s) of %s%s", count, table.name, f" since {since.isoformat()}" if since else "")
+        return count, high
+
+    def _open_writer(self, path: str, schema):
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(path, schema, compression="zstd")
+        import pyarrow as pa
+        return pa.ipc.new_file(path, schema)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export users, profiles, posts, likes and follows as columnar files.")
+    parser.add_argument("--out", default="export", help="output directory")
+    parser.add_argument("--format", choices=AnalyticsExporter.FORMATS, default="parquet")
+    parser.add_argument("--incremental", action="store_true", help="only rows changed since the last run")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES), default=None)
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--overlap-minutes", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    exporter = AnalyticsExporter(
+        args.out, fmt=args.format, chunk_rows=args.chunk_rows, batch_size=args.batch_size,
+        overlap=timedelta(minutes=args.overlap_minutes),
+    )
+    try:
+        rows = exporter.export(args.tables, incremental=args.incremental)
+    except Exception as e:
+        logger.error("❌ Export failed: %s", e)
+        return 1
+    logger.info("✅ Export finished: %s", ", ".join(f"{name} {count}" for name, count in rows.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
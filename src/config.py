@@ -0,0 +1,125 @@
+"""
+Connection settings of the three stores, loaded once per process.
+
+Values come from the repository's .env file; environment variables of the same
+name take precedence, so containers and CI can override single values without
+editing the file. Every connection helper reads get_settings() instead of
+re-reading .env on each call.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+
+ENV_FILE = os.path.join(os.path.dirname(__file__), "..", ".env")
+
+
+class ConfigError(Exception):
+    PREFIX = "❌ Invalid configuration: "
+
+    def __init__(self, message):
+        # store the prefixed message
+        super().__init__(self.PREFIX + str(message))
+
+
+@dataclass(frozen=True)
+class Settings:
+    postgres_port: int
+    postgres_user: str
+    postgres_password: str
+    postgres_db: str
+    mongo_host: str
+    mongo_port: int
+    mongo_user: str
+    mongo_password: str
+    neo4j_uri: str
+    neo4j_user: str
+    neo4j_password: str
+    postgres_host: str = "localhost"    # PGHOST in .env is the compose service name
+
+    @property
+    def postgres_kwargs(self) -> Dict[str, object]:
+        return {
+            "host": self.postgres_host, "port": self.postgres_port, "user": self.postgres_user,
+            "password": self.postgres_password, "dbname": self.postgres_db,
+        }
+
+    @property
+    def mongo_uri(self) -> str:
+        return f"mongodb://{self.mongo_user}:{self.mongo_password}@{self.mongo_host}:{self.mongo_port}/admin"
+
+    @property
+    def neo4j_auth(self) -> tuple:
+        return self.neo4j_user, self.neo4j_password
+
+
+# Settings field -> variable name
+_VARIABLES = {
+    "postgres_port": "PGPORT",
+    "postgres_user": "POSTGRES_USER",
+    "postgres_password": "POSTGRES_PASSWORD",
+    "postgres_db": "POSTGRES_DB",
+    "mongo_host": "MONGO_HOST",
+    "mongo_port": "MONGO_PORT",
+    "mongo_user": "MONGO_INITDB_ROOT_USERNAME",
+    "mongo_password": "MONGO_INITDB_ROOT_PASSWORD",
+    "neo4j_uri": "APP_NEO4J_URI_HTTP",
+    "neo4j_user": "APP_NEO4J_USER",
+    "neo4j_password": "APP_NEO4J_PASSWORD",
+}
+_PORTS = ("postgres_port", "mongo_port")
+
+
+def load_settings(env_file: Optional[str] = ENV_FILE, environ: Optional[Mapping[str, str]] = None) -> Settings:
+    """
+    Read and validate the settings. Raises ConfigError naming every missing or invalid variable.
+    :param env_file: .env file to read, None to use the environment only
+    :param environ: overrides of the file, os.environ by default
+    """
+    values: Dict[str, Optional[str]] = {}
+    if env_file and os.path.exists(env_file):
+        from dotenv import dotenv_values
+        values.update(dotenv_values(env_file))
+    values.update(os.environ if environ is None else environ)
+
+    fields: Dict[str, object] = {}
+    problems = []
+    for field, variable in _VARIABLES.items():
+        value = (values.get(variable) or "").strip()
+        if not value:
+            problems.append(f"{variable} is not set")
+            continue
+        if field in _PORTS:
+            if not value.isdigit() or not 0 < int(value) < 65536:
+                problems.append(f"{variable} is not a port number: {value!r}")
+                continue
+            fields[field] = int(value)
+        else:
+            fields[field] = value
+    if problems:
+        raise ConfigError("; ".join(problems))
+    return Settings(**fields)
+
+
+_settings: Optional[Settings] = None
+_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """The settings of this process, loaded on first use."""
+    global _settings
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                _settings = load_settings()
+    return _settings
+
+
+def reload_settings() -> Settings:
+    """Re-read .env and the environment. Only clients created afterwards see the new values."""
+    global _settings
+    with _lock:
+        _settings = load_settings()
+    return _settings
@@ -0,0 +1,468 @@
+"""
+Deterministic synthetic dataset for capacity testing.
+
+Generates N users (SQL users + profile, Neo4j :User nodes), M posts with
+heavy-tailed like counts (MongoDB posts + post_likes) and power-law follows
+(Neo4j FOLLOWS). Popularity follows a Zipf law over a seeded permutation of the
+users, so a few users write, receive likes and get followed far more than the rest.
+
+Every chunk is generated from (seed, kind, chunk number) only, so chunks can be
+produced by parallel workers in any order and the same seed always yields the
+same dataset.
+
+Usage
+    python -m src.datagen --users 100000 --posts 2000000 --workers 8
+    python -m src.datagen --users 1000000 --posts 50000000 --out data/gen   # write JSONL chunks only
+    python -m src.datagen --load data/gen --workers 8                       # load JSONL chunks into the databases
+
+Chunk files keep the ids they were generated with. --load shifts all user ids
+past the highest id already in the database when they would collide with it,
+and derives new post ObjectIds from the shift. Post ObjectIds depend on seed
+and id_offset, so seeding an already populated database adds new posts.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import bcrypt
+import numpy as np
+from bson import ObjectId
+
+from src.instrumentation import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+FIRST_NAMES = [
+    "Max", "Lena", "Sofia", "Luca", "Noah", "Mia", "Emma", "Liam", "Oliver", "Anna",
+    "Elias", "Sara", "Jonas", "Lea", "Paul", "Laura", "David", "Nora", "Samuel", "Clara",
+    "Marco", "Maya", "Philipp", "Julia", "Felix", "Hannah", "Adrian", "Zoe", "Oscar", "Lina",
+]
+LAST_NAMES = [
+    "Muller", "Schmidt", "Meier", "Keller", "Weber", "Schneider", "Fischer", "Hofmann", "Zimmermann", "Bach",
+    "Brunner", "Graf", "Baumann", "Rossi", "Buhler", "Moser", "Wagner", "Huber", "Berger", "Schmid",
+    "Dupont", "Laurent", "Gonzalez", "Garcia", "Lopez", "Romano", "Ricci", "Costa", "Bruno", "Perez",
+]
+TOPICS = [
+    "news", "sports", "music", "tech", "food", "travel", "movies", "science", "art", "politics",
+    "gaming", "fashion", "health", "books", "finance", "nature", "cars", "pets", "photography", "humor",
+]
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip"
+).split()
+
+PASSWORD = "Test1234"
+
+# stream ids of np.random.default_rng([seed, kind, chunk])
+_USERS, _POSTS, _FOLLOWS, _POPULARITY = 1, 2, 3, 4
+
+
+@dataclass(frozen=True)
+class GenConfig:
+    users: int = 10_000
+    posts: int = 200_000
+    seed: int = 42
+    id_offset: int = 0              # generated user ids are id_offset + 1 .. id_offset + users
+    avg_likes: float = 10.0         # mean likes per post
+    max_likes: int = 5_000
+    avg_follows: float = 30.0       # mean followees per user
+    max_follows: int = 5_000
+    alpha: float = 1.1              # Zipf exponent of user popularity
+    days: int = 365                 # posts are spread over the last `days` days
+    chunk_size: int = 50_000
+    now: float = 1_760_000_000.0    # fixed epoch seconds so timestamps are reproducible
+
+    def chunks(self, total: int) -> List[int]:
+        return list(range((total + self.chunk_size - 1) // self.chunk_size))
+
+
+# Generation
+def _rng(cfg: GenConfig, kind: int, chunk: int) -> np.random.Generator:
+    return np.random.default_rng([cfg.seed, kind, chunk])
+
+
+def _popularity(cfg: GenConfig) -> Tuple[np.ndarray, np.ndarray]:
+    """(user ids ordered by popularity rank, cumulative Zipf distribution over ranks)."""
+    ranked = cfg.id_offset + 1 + _rng(cfg, _POPULARITY, 0).permutation(cfg.users)
+    weights = 1.0 / np.arange(1, cfg.users + 1, dtype=np.float64) ** cfg.alpha
+    cdf = np.cumsum(weights)
+    return ranked.astype(np.int64), cdf / cdf[-1]
+
+
+def _sample_users(rng: np.random.Generator, ranked: np.ndarray, cdf: np.ndarray, size: int) -> np.ndarray:
+    return ranked[np.minimum(np.searchsorted(cdf, rng.random(size)), len(ranked) - 1)]
+
+
+def _heavy_tailed(rng: np.random.Generator, size: int, mean: float, cap: int) -> np.ndarray:
+    """Pareto(alpha=2) counts with the given mean, capped, like MongoDB.initialize._heavy_tailed_like_count."""
+    return np.minimum(cap, ((rng.pareto(2.0, size) + 1.0) * (mean / 2.0)).astype(np.int64))
+
+
+def _object_id(created: int, *key: int) -> ObjectId:
+    """Deterministic ObjectId: creation time, then 8 bytes hashed from key (seed, id_offset, post index)."""
+    digest = hashlib.blake2b(struct.pack(f">{len(key)}Q", *key), digest_size=8).digest()
+    return ObjectId(struct.pack(">I", created) + digest)
+
+
+def _shift_object_id(oid: ObjectId, shift: int) -> ObjectId:
+    """The ObjectId of a loaded post whose user ids were moved up by shift, same creation time."""
+    if not shift:
+        return oid
+    return _object_id(int.from_bytes(oid.binary[:4], "big"), int.from_bytes(oid.binary[4:], "big"), shift)
+
+
+def generate_users(cfg: GenConfig, chunk: int) -> List[Dict[str, Any]]:
+    start = chunk * cfg.chunk_size
+    ids = np.arange(start, min(start + cfg.chunk_size, cfg.users)) + cfg.id_offset + 1
+    rng = _rng(cfg, _USERS, chunk)
+    first = rng.integers(0, len(FIRST_NAMES), len(ids))
+    last = rng.integers(0, len(LAST_NAMES), len(ids))
+    return [_user(int(user_id), FIRST_NAMES[f], LAST_NAMES[l]) for user_id, f, l in zip(ids, first, last)]
+
+
+def _user(user_id: int, first_name: str, last_name: str) -> Dict[str, Any]:
+    return {
+        "id": user_id,
+        "username": f"gen{user_id:08d}",
+        "email": f"gen{user_id:08d}@example.ch",
+        "first_name": first_name,
+        "last_name": last_name,
+    }
+
+
+def generate_posts(cfg: GenConfig, chunk: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Posts of one chunk and the likes they received."""
+    start = chunk * cfg.chunk_size
+    n = min(cfg.chunk_size, cfg.posts - start)
+    rng = _rng(cfg, _POSTS, chunk)
+    ranked, cdf = _popularity(cfg)
+
+    authors = _sample_users(rng, ranked, cdf, n)
+    created = (cfg.now - rng.random(n) * cfg.days * 86_400).astype(np.int64)
+    topic_counts = rng.integers(0, 4, n)
+    topic_ids = np.minimum(rng.zipf(1.5, topic_counts.sum()) - 1, len(TOPICS) - 1)
+    word_ids = rng.integers(0, len(WORDS), (n, 12))
+
+    # likes: heavy-tailed count per post, likers drawn by popularity, duplicates dropped
+    like_counts = _heavy_tailed(rng, n, cfg.avg_likes, min(cfg.max_likes, cfg.users))
+    like_posts = np.repeat(np.arange(n), like_counts)
+    likers = _sample_users(rng, ranked, cdf, len(like_posts))
+    pairs = np.unique(like_posts * (cfg.id_offset + cfg.users + 1) + likers)
+    like_posts, likers = pairs // (cfg.id_offset + cfg.users + 1), pairs % (cfg.id_offset + cfg.users + 1)
+    like_counts = np.bincount(like_posts, minlength=n)
+    like_delay = rng.random(len(like_posts)) * 7 * 86_400
+
+    posts, topic_pos = [], 0
+    oids = []
+    for i in range(n):
+        created_at = datetime.fromtimestamp(int(created[i]), timezone.utc)
+        oid = _object_id(int(created[i]), cfg.seed, cfg.id_offset, start + i)
+        oids.append(oid)
+        topics = list(dict.fromkeys(TOPICS[t] for t in topic_ids[topic_pos:topic_pos + topic_counts[i]]))
+        topic_pos += topic_counts[i]
+        posts.append({
+            "_id": oid,
+            "user_id": int(authors[i]),
+            "title": f"Post {start + i}",
+            "text": " ".join(WORDS[w] for w in word_ids[i]),
+            "topics": topics,
+            "likes": int(like_counts[i]),
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+
+    likes = [
+        {
+            "post_id": oids[p],
+            "user_id": int(u),
+            "created_at": datetime.fromtimestamp(min(cfg.now, created[p] + d), timezone.utc),
+        }
+        for p, u, d in zip(like_posts, likers, like_delay)
+    ]
+    return posts, likes
+
+
+def generate_follows(cfg: GenConfig, chunk: int) -> List[Tuple[int, int]]:
+    """FOLLOWS edges of the users in one chunk, followees drawn by popularity."""
+    start = chunk * cfg.chunk_size
+    followers = np.arange(start, min(start + cfg.chunk_size, cfg.users)) + cfg.id_offset + 1
+    rng = _rng(cfg, _FOLLOWS, chunk)
+    ranked, cdf = _popularity(cfg)
+
+    degrees = _heavy_tailed(rng, len(followers), cfg.avg_follows, min(cfg.max_follows, cfg.users - 1))
+    src = np.repeat(followers, degrees)
+    dst = _sample_users(rng, ranked, cdf, len(src))
+    keep = src != dst
+    pairs = np.unique(src[keep] * (cfg.id_offset + cfg.users + 1) + dst[keep])
+    return [(int(a), int(b)) for a, b in zip(pairs // (cfg.id_offset + cfg.users + 1), pairs % (cfg.id_offset + cfg.users + 1))]
+
+
+# Files
+def _write_jsonl(path: str, rows: Iterable[Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=_encode))
+            f.write("\n")
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"cannot encode {type(value)}")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if "$oid" in obj:
+        return ObjectId(obj["$oid"])
+    if "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def _read_jsonl(path: str) -> List[Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line, object_hook=_decode) for line in f if line.strip()]
+
+
+# Database writers (run inside worker processes, each with its own pooled clients)
+_password_hash: Optional[str] = None
+
+
+def _hash() -> str:
+    global _password_hash
+    if _password_hash is None:
+        # one bcrypt hash shared by all generated users, hashing per user would dominate the run
+        _password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return _password_hash
+
+
+def write_users(users: List[Dict[str, Any]]) -> int:
+    from SQL.connection import connect_to_sql_database
+    from src.resources import get_registry
+
+    password_hash = _hash()
+    users_csv, profiles_csv = io.StringIO(), io.StringIO()
+    for u in users:
+        users_csv.write(f"{u['id']}\t{u['email']}\t{password_hash}\n")
+        profiles_csv.write(f"{u['id']}\t{u['username']}\t{u['first_name']}\t{u['last_name']}\n")
+    users_csv.seek(0)
+    profiles_csv.seek(0)
+
+    with connect_to_sql_database() as conn:
+        with conn.cursor() as cur:
+            cur.copy_expert("COPY users (id, email, password_hash) FROM STDIN", users_csv)
+            cur.copy_expert("COPY profile (user_id, username, first_name, last_name) FROM STDIN", profiles_csv)
+
+    with get_registry().neo4j_driver().session() as session:
+        session.run(
+            """
+            UNWIND $users AS u
+            MERGE (user:User {userId: u.id})
+            SET user.username = u.name
+            """,
+            {"users": [{"id": u["id"], "name": f"{u['first_name']} {u['last_name']}"} for u in users]},
+        ).consume()
+    return len(users)
+
+
+def write_posts(posts: List[Dict[str, Any]], likes: List[Dict[str, Any]]) -> int:
+    from src.resources import get_registry
+
+    db = get_registry().mongo_db()
+    if posts:
+        db["posts"].insert_many(posts, ordered=False)
+    if likes:
+        db["post_likes"].insert_many(likes, ordered=False)
+    return len(posts)
+
+
+def write_follows(follows: List[Tuple[int, int]], batch_size: int = 10_000) -> int:
+    from src.resources import get_registry
+
+    with get_registry().neo4j_driver().session() as session:
+        for i in range(0, len(follows), batch_size):
+            session.run(
+                """
+                UNWIND $follows AS f
+                MATCH (a:User {userId: f[0]})
+                MATCH (b:User {userId: f[1]})
+                MERGE (a)-[r:FOLLOWS]->(b)
+                ON CREATE SET r.created_at = datetime()
+                """,
+                {"follows": [list(f) for f in follows[i:i + batch_size]]},
+            ).consume()
+    return len(follows)
+
+
+# Tasks, one chunk each
+def _users_task(cfg: GenConfig, chunk: int, out: Optional[str]) -> int:
+    users = generate_users(cfg, chunk)
+    if out:
+        _write_jsonl(os.path.join(out, f"users_{chunk:05d}.jsonl"), users)
+        return len(users)
+    return write_users(users)
+
+
+def _posts_task(cfg: GenConfig, chunk: int, out: Optional[str]) -> int:
+    posts, likes = generate_posts(cfg, chunk)
+    if out:
+        _write_jsonl(os.path.join(out, f"posts_{chunk:05d}.jsonl"), posts)
+        _write_jsonl(os.path.join(out, f"likes_{chunk:05d}.jsonl"), likes)
+        return len(posts)
+    return write_posts(posts, likes)
+
+
+def _follows_task(cfg: GenConfig, chunk: int, out: Optional[str]) -> int:
+    follows = generate_follows(cfg, chunk)
+    if out:
+        _write_jsonl(os.path.join(out, f"follows_{chunk:05d}.jsonl"), follows)
+        return len(follows)
+    return write_follows(follows)
+
+
+def _load_task(kind: str, path: str, shift: int) -> int:
+    """Load one chunk file with every user id moved up by shift and the post ids derived from it."""
+    if kind == "users":
+        return write_users([_user(u["id"] + shift, u["first_name"], u["last_name"]) for u in _read_jsonl(path)])
+    if kind == "posts":
+        posts = _read_jsonl(path)
+        likes = _read_jsonl(path.replace("posts_", "likes_"))
+        for row in posts + likes:
+            row["user_id"] += shift
+        for post in posts:
+            post["_id"] = _shift_object_id(post["_id"], shift)
+        for like in likes:
+            like["post_id"] = _shift_object_id(like["post_id"], shift)
+        return write_posts(posts, likes)
+    return write_follows([(a + shift, b + shift) for a, b in _read_jsonl(path)])
+
+
+# Driver
+def _prepare_databases() -> int:
+    """Create tables, indexes and the Neo4j schema. Returns the highest existing user id."""
+    from MongoDB.mongo_repo import MongoPostsRepository
+    from NeoDB.neo4j_repo import Neo4jRepository
+    from SQL.connection import connect_to_sql_database
+    from SQL.initialize import create_tables
+    from src.resources import get_registry
+
+    create_tables()
+    MongoPostsRepository(get_registry().mongo_db())
+    Neo4jRepository(get_registry().neo4j_driver()).create_indexes()
+    with connect_to_sql_database() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM users;")
+            return int(cur.fetchone()[0])
+
+
+def _finish_databases() -> None:
+    """Advance the users id sequence past the explicit ids and recount follow counters."""
+    from NeoDB.neo4j_repo import Neo4jRepository
+    from SQL.connection import connect_to_sql_database
+    from src.resources import get_registry
+
+    with connect_to_sql_database() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT MAX(id) FROM users));")
+    Neo4jRepository(get_registry().neo4j_driver()).reconcile_follow_counts()
+
+
+def _run(pool: ProcessPoolExecutor, name: str, fn, tasks: List[Tuple]) -> int:
+    total = 0
+    for done, count in enumerate(pool.map(fn, *zip(*tasks)) if tasks else [], start=1):
+        total += count
+        logger.info("%s: %s/%s chunks, %s rows", name, done, len(tasks), total)
+    return total
+
+
+def generate(cfg: GenConfig, workers: int = os.cpu_count() or 1, out: Optional[str] = None) -> Dict[str, int]:
+    """
+    Generate the dataset into the databases, or into JSONL chunk files under out.
+    Users are written first, then posts / likes and follows, which reference them.
+    """
+    if out:
+        os.makedirs(out, exist_ok=True)
+        with open(os.path.join(out, "config.json"), "w", encoding="utf-8") as f:
+            json.dump(asdict(cfg), f, indent=2)
+    elif cfg.id_offset == 0:
+        cfg = GenConfig(**{**asdict(cfg), "id_offset": _prepare_databases()})
+    else:
+        _prepare_databases()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        result = {
+            "users": _run(pool, "users", _users_task, [(cfg, c, out) for c in cfg.chunks(cfg.users)]),
+            "posts": _run(pool, "posts", _posts_task, [(cfg, c, out) for c in cfg.chunks(cfg.posts)]),
+            "follows": _run(pool, "follows", _follows_task, [(cfg, c, out) for c in cfg.chunks(cfg.users)]),
+        }
+    if not out:
+        _finish_databases()
+    return result
+
+
+def load(directory: str, workers: int = os.cpu_count() or 1) -> Dict[str, int]:
+    """
+    Write JSONL chunks produced with out=... into the databases. The chunks are
+    rebased past the highest existing user id if their ids (id_offset of
+    config.json) would collide with it.
+    """
+    id_offset = 0
+    config_path = os.path.join(directory, "config.json")
+    if os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            id_offset = int(json.load(f).get("id_offset", 0))
+    shift = max(0, _prepare_databases() - id_offset)
+    if shift:
+        logger.info("Shifting generated user ids by %s past the existing users", shift)
+
+    result = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for kind in ("users", "posts", "follows"):
+            paths = sorted(glob.glob(os.path.join(directory, f"{kind}_*.jsonl")))
+            result[kind] = _run(pool, kind, _load_task, [(kind, p, shift) for p in paths])
+    _finish_databases()
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic TopJodel dataset.")
+    parser.add_argument("--users", type=int, default=GenConfig.users)
+    parser.add_argument("--posts", type=int, default=GenConfig.posts)
+    parser.add_argument("--seed", type=int, default=GenConfig.seed)
+    parser.add_argument("--id-offset", type=int, default=0, help="first generated user id - 1 (default: after the highest existing id)")
+    parser.add_argument("--avg-likes", type=float, default=GenConfig.avg_likes)
+    parser.add_argument("--avg-follows", type=float, default=GenConfig.avg_follows)
+    parser.add_argument("--alpha", type=float, default=GenConfig.alpha, help="Zipf exponent of user popularity")
+    parser.add_argument("--chunk-size", type=int, default=GenConfig.chunk_size)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", help="write JSONL chunks to this directory instead of the databases")
+    parser.add_argument("--load", help="load JSONL chunks from this directory into the databases")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.load:
+        result = load(args.load, args.workers)
+    else:
+        cfg = GenConfig(
+            users=args.users, posts=args.posts, seed=args.seed, id_offset=args.id_offset,
+            avg_likes=args.avg_likes, avg_follows=args.avg_follows, alpha=args.alpha,
+            chunk_size=args.chunk_size,
+        )
+        result = generate(cfg, args.workers, args.out)
+    logger.info("✅ Generated %s", result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+UserId = int
+
+
+class _Flight:
+    """A feed computation in progress that concurrent callers wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[List[Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class FeedCache:
+    """
+    Per-user cache of the first first_k feed entries.
+
+    - Entries expire ttl seconds after they were computed.
+    - invalidate() drops a user's entry immediately; the backend calls it for all
+      followers of an author on create_post / delete_post and for the user itself
+      when its follow set changes.
+    - invalidate_post() / patch_post() drop or rewrite every cached page that
+      contains a post (entries are matched by their `id`), for changes made by
+      other processes (see src/invalidation_bus.py).
+    - Single flight: when several requests miss on the same user at once, only
+      one recomputes the feed, the others wait for and share its result.
+    - At most max_users entries are kept, least recently used are evicted first.
+
+    stats() reports hits, misses, coalesced waits and the hit rate.
+    """
+
+    def __init__(self, ttl: float = 30.0, first_k: int = 50, max_users: int = 100_000):
+        self.ttl = ttl
+        self.first_k = first_k
+        self.max_users = max_users
+
+        self._entries: "OrderedDict[UserId, Tuple[float, List[Any]]]" = OrderedDict()
+        self._flights: Dict[UserId, _Flight] = {}
+        # bumped by invalidate() while a computation is in flight, so its result is not stored
+        self._generations: Dict[UserId, int] = {}
+        # post id -> users whose cached page contains it
+        self._by_post: Dict[str, Set[UserId]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, user_id: UserId, compute: Callable[[], List[Any]]) -> List[Any]:
+        """
+        Return the cached first page of user_id, computing it with compute() on a miss.
+        compute must return at most first_k feed entries.
+        """
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._flights.get(user_id)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._flights[user_id] = _Flight()
+                generation = self._generations.get(user_id, 0)
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            result = list(compute())
+            flight.result = result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(user_id, None)
+                unchanged = self._generations.pop(user_id, 0) == generation
+                if flight.error is None and unchanged:
+                    self._store(user_id, result)
+            flight.done.set()
+        return result
+
+    def invalidate(self, user_id: UserId) -> None:
+        self.invalidate_many([user_id])
+
+    def invalidate_many(self, user_ids: Iterable[UserId]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                user_id = int(user_id)
+                if user_id in self._flights:
+                    self._generations[user_id] = self._generations.get(user_id, 0) + 1
+                if self._remove(user_id) is not None:
+                    self.invalidations += 1
+
+    def invalidate_post(self, post_id: str) -> None:
+        """Drop every cached page that contains post_id."""
+        with self._lock:
+            users = list(self._by_post.get(str(post_id), ()))
+            self._invalidate_flights()
+        self.invalidate_many(users)
+
+    def patch_post(self, post_id: str, patch: Callable[[Any], Any]) -> int:
+        """
+        Replace the entry of post_id in every cached page by patch(entry), keeping the pages cached.
+        :return: number of pages patched
+        """
+        post_id = str(post_id)
+        with self._lock:
+            self._invalidate_flights()
+            users = list(self._by_post.get(post_id, ()))
+            for user_id in users:
+                expires, entries = self._entries[user_id]
+                self._entries[user_id] = (
+                    expires, [patch(e) if str(getattr(e, "id", None)) == post_id else e for e in entries],
+                )
+            return len(users)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._invalidate_flights()
+            self._entries.clear()
+            self._by_post.clear()
+
+    # Entries and the post index, called with the lock held
+    def _store(self, user_id: UserId, entries: List[Any]) -> None:
+        self._remove(user_id)
+        self._entries[user_id] = (time.monotonic() + self.ttl, entries)
+        for entry in entries:
+            post_id = getattr(entry, "id", None)
+            if post_id is not None:
+                self._by_post.setdefault(str(post_id), set()).add(user_id)
+        while len(self._entries) > self.max_users:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, user_id: UserId) -> Optional[Tuple[float, List[Any]]]:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            for e in entry[1]:
+                post_id = getattr(e, "id", None)
+                users = self._by_post.get(str(post_id)) if post_id is not None else None
+                if users is not None:
+                    users.discard(user_id)
+                    if not users:
+                        del self._by_post[str(post_id)]
+        return entry
+
+    def _invalidate_flights(self) -> None:
+        # computations in flight may have read the post before the change, do not store them
+        for user_id in self._flights:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from MongoDB.mongo_repo import MongoPostsRepository, Post
+
+UserId = int
+Affinity = Tuple[Dict[UserId, int], Dict[str, int]]
+
+DEFAULT_CANDIDATES = 500
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch(value: datetime) -> float:
+    # pymongo returns naive datetimes in UTC
+    return (value - (_EPOCH if value.tzinfo else _NAIVE_EPOCH)).total_seconds()
+
+
+@dataclass(frozen=True)
+class RankingWeights:
+    """
+    score = recency * 2^(-age / half_life)
+          + likes * log1p(likes) / log1p(max likes among the candidates)
+          + author_affinity * share of the viewer's recent likes that went to the author
+          + topic_affinity * mean share of the viewer's recent likes per topic of the post
+    Every term is in [0, 1] before weighting.
+    """
+    recency: float = 1.0
+    likes: float = 0.3
+    author_affinity: float = 0.6
+    topic_affinity: float = 0.4
+    half_life_hours: float = 24.0
+
+
+@dataclass(frozen=True)
+class Candidates:
+    """Column arrays of a candidate set; topics as CSR rows over a per-batch vocabulary."""
+    created_at: np.ndarray      # float64 epoch seconds
+    likes: np.ndarray           # float64
+    authors: np.ndarray         # int64 author user_id per post
+    topic_indptr: np.ndarray    # int64, len(posts) + 1
+    topic_indices: np.ndarray   # int64 into vocabulary
+    vocabulary: List[str]
+
+    @staticmethod
+    def from_posts(posts: Sequence[Post]) -> "Candidates":
+        # one pass over the Post objects, this dominates the cost of a ranked request
+        vocabulary: Dict[str, int] = {}
+        created_at: List[float] = []
+        likes: List[int] = []
+        authors: List[int] = []
+        lengths: List[int] = []
+        indices: List[int] = []
+        for post in posts:
+            created_at.append(_epoch(post.created_at))
+            likes.append(post.likes)
+            authors.append(post.user_id)
+            lengths.append(len(post.topics))
+            for topic in post.topics:
+                indices.append(vocabulary.setdefault(topic, len(vocabulary)))
+        indptr = np.zeros(len(posts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        return Candidates(
+            created_at=np.array(created_at, dtype=np.float64),
+            likes=np.array(likes, dtype=np.float64),
+            authors=np.array(authors, dtype=np.int64),
+            topic_indptr=indptr,
+            topic_indices=np.asarray(indices, dtype=np.int64),
+            vocabulary=list(vocabulary),
+        )
+
+    def __len__(self) -> int:
+        return len(self.created_at)
+
+
+def score_candidates(candidates: Candidates, affinity: Affinity, weights: RankingWeights, now: float) -> np.ndarray:
+    """Score every candidate in one vectorised pass, see RankingWeights."""
+    n = len(candidates)
+    if n == 0:
+        return np.zeros(0)
+
+    age_hours = np.maximum(now - candidates.created_at, 0.0) / 3600.0
+    score = weights.recency * np.exp2(-age_hours / weights.half_life_hours)
+
+    if weights.likes:
+        log_likes = np.log1p(candidates.likes)
+        top = log_likes.max()
+        if top > 0:
+            score += weights.likes * (log_likes / top)
+
+    author_likes, topic_likes = affinity
+    if weights.author_affinity and author_likes:
+        ids = np.fromiter(author_likes.keys(), dtype=np.int64, count=len(author_likes))
+        counts = np.fromiter(author_likes.values(), dtype=np.float64, count=len(author_likes))
+        order = np.argsort(ids)
+        ids, shares = ids[order], counts[order] / counts.sum()
+        pos = np.minimum(np.searchsorted(ids, candidates.authors), len(ids) - 1)
+        score += weights.author_affinity * np.where(ids[pos] == candidates.authors, shares[pos], 0.0)
+
+    if weights.topic_affinity and topic_likes and len(candidates.topic_indices):
+        total = float(sum(topic_likes.values()))
+        vocab_share = np.array([topic_likes.get(t, 0) / total for t in candidates.vocabulary])
+        counts = np.diff(candidates.topic_indptr)
+        rows = np.repeat(np.arange(n), counts)
+        per_post = np.bincount(rows, weights=vocab_share[candidates.topic_indices], minlength=n)
+        score += weights.topic_affinity * per_post / np.maximum(counts, 1)
+
+    return score
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (ties keep candidate order)."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+class FeedRanker:
+    """
+    Ranked feed: the `candidates` newest posts of the followees are scored with
+    score_candidates and returned best first.
+
+    The viewer's like affinity (one aggregation over post_likes) is cached per
+    user for affinity_ttl seconds, at most max_users entries.
+    """
+
+    def __init__(
+        self,
+        posts_repo: MongoPostsRepository,
+        weights: Optional[RankingWeights] = None,
+        candidates: int = DEFAULT_CANDIDATES,
+        affinity_ttl: float = 300.0,
+        max_users: int = 100_000,
+    ):
+        self.posts_repo = posts_repo
+        self.weights = weights or RankingWeights()
+        self.candidates = candidates
+        self.affinity_ttl = affinity_ttl
+        self.max_users = max_users
+        self._affinity: "OrderedDict[UserId, Tuple[float, Affinity]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rank(self, user_id: UserId, followees: List[UserId], limit: int = 10, skip: int = 0,
+             weights: Optional[RankingWeights] = None) -> List[Post]:
+        if not followees:
+            return []
+        posts = self.posts_repo.get_posts_by_users(followees, limit=max(self.candidates, skip + limit))
+        scores = score_candidates(Candidates.from_posts(posts), self.affinity(user_id), weights or self.weights, time.time())
+        return [posts[i] for i in top_k(scores, skip + limit)[skip:]]
+
+    def affinity(self, user_id: UserId) -> Affinity:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._affinity.get(int(user_id))
+            if entry is not None and now - entry[0] < self.affinity_ttl:
+                self._affinity.move_to_end(int(user_id))
+                return entry[1]
+
+        affinity = self.posts_repo.like_affinity(user_id)
+        with self._lock:
+            self._affinity[int(user_id)] = (now, affinity)
+            self._affinity.move_to_end(int(user_id))
+            while len(self._affinity) > self.max_users:
+                self._affinity.popitem(last=False)
+        return affinity
+
+    def invalidate(self, user_id: UserId) -> None:
+        with self._lock:
+            self._affinity.pop(int(user_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._affinity.clear()
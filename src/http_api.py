@@ -0,0 +1,416 @@
+"""
+HTTP API of TopJodel as a plain ASGI application on top of AsyncTopJodelBackend.
+
+Endpoints (JSON in and out, authenticated with `Authorization: Bearer <token>`
+except /login and /health):
+    POST   /login                 {"email", "password"} -> {"user_id", "token"}
+    POST   /logout
+    GET    /feed?limit=10&skip=0  -> {"posts": [...]}
+    POST   /posts                 {"title", "text", "topics"} -> {"id"}
+    GET    /posts/<id>
+    PATCH  /posts/<id>            {"title"?, "text"?, "topics"?}
+    DELETE /posts/<id>
+    POST   /posts/<id>/likes      -> {"created"}
+    POST   /follows               {"user_id"} -> {"created"}
+    DELETE /follows/<user_id>     -> {"removed"}
+    GET    /health
+
+Backpressure: every endpoint group has an EndpointLimiter. At most
+max_concurrency requests of a group run at once, at most max_queue more wait
+(each for up to queue_timeout seconds) and everything beyond that is answered
+immediately with 503 and Retry-After, so overload sheds requests instead of
+piling them up on the connection pools.
+
+Shutdown: on lifespan shutdown new requests get 503, in-flight requests are
+given up to drain_timeout seconds to finish, then the pools are closed.
+create_app() reads drain_timeout from TOPJODEL_DRAIN_TIMEOUT, which main()
+sets from --drain-timeout for every worker.
+
+Errors: requests that fail the endpoint's own validation get 400. Any other
+exception of the backend is a 500, not a client error.
+
+Run with
+    python -m src.http_api --host 0.0.0.0 --port 8000 --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from MongoDB.mongo_repo import NotOwner, PostNotFound
+from NeoDB.neo4j_repo import UserNotFound
+from SQL.sql_error import AuthenticationError, TokenError
+from src.instrumentation import configure_logging, get_logger
+from src.topjodel_async_backend import AsyncTopJodelBackend
+
+logger = get_logger(__name__)
+
+MAX_BODY = 64 * 1024
+
+DRAIN_TIMEOUT_ENV = "TOPJODEL_DRAIN_TIMEOUT"
+
+# endpoint group -> (max_concurrency, max_queue). login is bound by bcrypt in worker threads,
+# logout only deletes a token and must not queue behind it.
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "login": (8, 32),
+    "logout": (64, 256),
+    "feed": (64, 256),
+    "posts": (64, 256),
+    "likes": (64, 256),
+    "follows": (32, 128),
+}
+
+
+class Overloaded(Exception): ...
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class EndpointLimiter:
+    """
+    Concurrency limit with a bounded wait queue.
+    slot() raises Overloaded when the queue is full or the wait exceeds queue_timeout.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("queue full")
+        self.waiting += 1
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self.rejected += 1
+            raise Overloaded("queue wait timed out") from None
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"running": self.running, "waiting": self.waiting, "rejected": self.rejected}
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if is_dataclass(value):
+        return asdict(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+Handler = Callable[..., Awaitable[Tuple[int, Any]]]
+
+
+class TopJodelAPI:
+    """ASGI application, see the module docstring."""
+
+    def __init__(
+        self,
+        backend: Optional[AsyncTopJodelBackend] = None,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        queue_timeout: float = 1.0,
+        drain_timeout: float = 30.0,
+    ):
+        self.backend = backend or AsyncTopJodelBackend()
+        self.limiters = {
+            group: EndpointLimiter(concurrency, queue, queue_timeout)
+            for group, (concurrency, queue) in {**DEFAULT_LIMITS, **(limits or {})}.items()
+        }
+        self.drain_timeout = drain_timeout
+        self.draining = False
+        self.in_flight = 0
+        self._idle: Optional[asyncio.Event] = None
+
+        # (method, path pattern, handler, endpoint group or None, authenticated)
+        self.routes: List[Tuple[str, re.Pattern, Handler, Optional[str], bool]] = [
+            ("GET", re.compile(r"/health"), self.health, None, False),
+            ("POST", re.compile(r"/login"), self.login, "login", False),
+            ("POST", re.compile(r"/logout"), self.logout, "logout", True),
+            ("GET", re.compile(r"/feed"), self.feed, "feed", True),
+            ("POST", re.compile(r"/posts"), self.create_post, "posts", True),
+            ("GET", re.compile(r"/posts/(?P<post_id>[0-9a-f]{24})"), self.get_post, "posts", True),
+            ("PATCH", re.compile(r"/posts/(?P<post_id>[0-9a-f]{24})"), self.edit_post, "posts", True),
+            ("DELETE", re.compile(r"/posts/(?P<post_id>[0-9a-f]{24})"), self.delete_post, "posts", True),
+            ("POST", re.compile(r"/posts/(?P<post_id>[0-9a-f]{24})/likes"), self.like_post, "likes", True),
+            ("POST", re.compile(r"/follows"), self.follow, "follows", True),
+            ("DELETE", re.compile(r"/follows/(?P<target_id>\d+)"), self.unfollow, "follows", True),
+        ]
+
+    # ASGI
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self._idle = asyncio.Event()
+                    self._idle.set()
+                    await self.backend.start()
+                except Exception as e:
+                    logger.error("❌ Startup failed: %s", e)
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                logger.info("✅ TopJodel API started")
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.drain()
+                await self.backend.aclose()
+                logger.info("✅ TopJodel API stopped")
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def drain(self) -> None:
+        """Reject new requests and wait up to drain_timeout seconds for in-flight ones."""
+        self.draining = True
+        if self._idle is None or self.in_flight == 0:
+            return
+        logger.info("Draining %s in-flight request(s)", self.in_flight)
+        try:
+            async with asyncio.timeout(self.drain_timeout):
+                await self._idle.wait()
+        except TimeoutError:
+            logger.warning("⚠️ Drain timed out with %s request(s) in flight", self.in_flight)
+
+    async def _http(self, scope, receive, send) -> None:
+        start = time.perf_counter()
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        headers = {}
+        try:
+            if self.draining:
+                raise HTTPError(503, "shutting down")
+            handler, group, authenticated, params = self._route(method, path)
+
+            self.in_flight += 1
+            if self._idle is not None:
+                self._idle.clear()
+            try:
+                if group is None:
+                    status, payload = await handler(scope=scope, **params)
+                else:
+                    async with self.limiters[group].slot():
+                        body = await self._read_body(receive)
+                        if authenticated:
+                            params["user_id"] = await self.backend.authenticate(self._bearer(scope))
+                        status, payload = await handler(scope=scope, body=body, **params)
+            finally:
+                self.in_flight -= 1
+                if self.in_flight == 0 and self._idle is not None:
+                    self._idle.set()
+        except Overloaded as e:
+            status, payload = 503, {"error": f"overloaded: {e}"}
+            headers["retry-after"] = "1"
+        except HTTPError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (TokenError, AuthenticationError) as e:
+            status, payload = 401, {"error": str(e)}
+        except NotOwner as e:
+            status, payload = 403, {"error": str(e)}
+        except (PostNotFound, UserNotFound) as e:
+            status, payload = 404, {"error": str(e)}
+        except TimeoutError:
+            status, payload = 504, {"error": "store timed out"}
+        except Exception as e:
+            logger.error("❌ %s %s failed: %s", method, path, e)
+            status, payload = 500, {"error": "internal error"}
+
+        if self.draining:
+            headers["connection"] = "close"
+        await self._respond(send, status, payload, headers)
+        logger.debug("%s %s %s %.1f ms", method, path, status, (time.perf_counter() - start) * 1000)
+
+    def _route(self, method: str, path: str):
+        allowed = False
+        for route_method, pattern, handler, group, authenticated in self.routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method == method:
+                return handler, group, authenticated, match.groupdict()
+            allowed = True
+        raise HTTPError(405 if allowed else 404, "method not allowed" if allowed else "not found")
+
+    @staticmethod
+    async def _read_body(receive) -> Dict[str, Any]:
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY:
+                raise HTTPError(413, "request body too large")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        raw = b"".join(chunks)
+        if not raw:
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise HTTPError(400, "body is not valid JSON") from None
+        if not isinstance(body, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        return body
+
+    # Validation, every failure is a 400
+    @staticmethod
+    def _required(body: Dict[str, Any], name: str) -> Any:
+        value = body.get(name)
+        if value is None:
+            raise HTTPError(400, f"missing field {name!r}")
+        return value
+
+    @staticmethod
+    def _int(value: Any, name: str) -> int:
+        if isinstance(value, bool):
+            raise HTTPError(400, f"{name} must be an integer")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"{name} must be an integer") from None
+
+    @staticmethod
+    def _topics(value: Any) -> Optional[List[str]]:
+        if value is None:
+            return None
+        if not isinstance(value, list):
+            raise HTTPError(400, "topics must be a list")
+        return [str(t) for t in value]
+
+    @staticmethod
+    def _bearer(scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token.strip():
+                    return token.strip()
+        raise TokenError("Missing bearer token")
+
+    @staticmethod
+    async def _respond(send, status: int, payload: Any, headers: Dict[str, str]) -> None:
+        body = b"" if payload is None else json.dumps(payload, default=_json_default).encode("utf-8")
+        raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        raw_headers += [(k.encode(), v.encode()) for k, v in headers.items()]
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": body})
+
+    # Endpoints
+    async def health(self, scope) -> Tuple[int, Any]:
+        return 200, {
+            "status": "draining" if self.draining else "ok",
+            "in_flight": self.in_flight,
+            "limits": {group: limiter.stats() for group, limiter in self.limiters.items()},
+        }
+
+    async def login(self, scope, body) -> Tuple[int, Any]:
+        return 200, await self.backend.login(str(self._required(body, "email")), str(self._required(body, "password")))
+
+    async def logout(self, scope, body, user_id) -> Tuple[int, Any]:
+        await self.backend.logout(self._bearer(scope))
+        return 204, None
+
+    async def feed(self, scope, body, user_id) -> Tuple[int, Any]:
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        limit = min(self._int(query.get("limit", ["10"])[0], "limit"), 100)
+        skip = self._int(query.get("skip", ["0"])[0], "skip")
+        if limit < 1 or skip < 0:
+            raise HTTPError(400, "limit must be positive and skip not negative")
+        return 200, {"posts": await self.backend.get_news_feed(user_id, limit=limit, skip=skip)}
+
+    async def create_post(self, scope, body, user_id) -> Tuple[int, Any]:
+        title, text = str(self._required(body, "title")), str(self._required(body, "text"))
+        post_id = await self.backend.create_post(user_id, title, text, self._topics(body.get("topics")) or [])
+        return 201, {"id": post_id}
+
+    async def get_post(self, scope, body, user_id, post_id) -> Tuple[int, Any]:
+        return 200, await self.backend.get_post(post_id)
+
+    async def edit_post(self, scope, body, user_id, post_id) -> Tuple[int, Any]:
+        title, text = body.get("title"), body.get("text")
+        return 200, await self.backend.edit_post(
+            post_id, user_id, title=None if title is None else str(title), text=None if text is None else str(text),
+            topics=self._topics(body.get("topics")),
+        )
+
+    async def delete_post(self, scope, body, user_id, post_id) -> Tuple[int, Any]:
+        await self.backend.delete_post(post_id, user_id)
+        return 204, None
+
+    async def like_post(self, scope, body, user_id, post_id) -> Tuple[int, Any]:
+        return 200, {"created": await self.backend.add_like(post_id, user_id)}
+
+    async def follow(self, scope, body, user_id) -> Tuple[int, Any]:
+        target_id = self._int(self._required(body, "user_id"), "user_id")
+        if target_id == user_id:
+            raise HTTPError(400, "users cannot follow themselves")
+        return 200, {"created": await self.backend.follow(user_id, target_id)}
+
+    async def unfollow(self, scope, body, user_id, target_id) -> Tuple[int, Any]:
+        return 200, {"removed": await self.backend.unfollow(user_id, int(target_id))}
+
+
+def create_app() -> TopJodelAPI:
+    """The application of a server worker, with drain_timeout from TOPJODEL_DRAIN_TIMEOUT if set."""
+    drain_timeout = os.environ.get(DRAIN_TIMEOUT_ENV)
+    return TopJodelAPI(drain_timeout=30.0 if drain_timeout is None else float(drain_timeout))
+
+
+app = create_app()
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the TopJodel HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    configure_logging()
+    # workers build their app with create_app() and inherit the environment
+    os.environ[DRAIN_TIMEOUT_ENV] = str(args.drain_timeout)
+    uvicorn.run(
+        "src.http_api:create_app", factory=True, host=args.host, port=args.port, workers=args.workers,
+        lifespan="on", timeout_graceful_shutdown=int(args.drain_timeout),
+    )
+
+
+if __name__ == "__main__":
+    main()
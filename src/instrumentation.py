@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+LOGGER_NAME = "topjodel"
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger below the "topjodel" root, e.g. get_logger(__name__)."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Print TopJodel log messages to stderr (notebooks, scripts)."""
+    root = logging.getLogger(LOGGER_NAME)
+    if not any(isinstance(h, logging.StreamHandler) and not isinstance(h, logging.NullHandler) for h in root.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram: four buckets per doubling from 1 µs up to
+    about two minutes, so percentiles are accurate to within ~19% at fixed memory.
+    """
+
+    MIN_SECONDS = 1e-6
+    BUCKETS_PER_DOUBLING = 4
+    BUCKETS = 4 * 27
+
+    def __init__(self):
+        self.counts = [0] * (self.BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        if seconds <= self.MIN_SECONDS:
+            i = 0
+        else:
+            i = min(self.BUCKETS, math.ceil(math.log2(seconds / self.MIN_SECONDS) * self.BUCKETS_PER_DOUBLING))
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def upper_bound(self, i: int) -> float:
+        return self.MIN_SECONDS * 2 ** (i / self.BUCKETS_PER_DOUBLING)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound (seconds) of the bucket holding the p-th percentile."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.upper_bound(i), self.max)
+        return self.max
+
+
+class OperationStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.rows = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        h = self.latency
+        return {
+            "count": h.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "mean_ms": h.total / h.count * 1000 if h.count else 0.0,
+            "p50_ms": h.percentile(50) * 1000,
+            "p95_ms": h.percentile(95) * 1000,
+            "p99_ms": h.percentile(99) * 1000,
+            "max_ms": h.max * 1000,
+        }
+
+
+Hook = Callable[[str, str, float, Optional[int], bool], None]
+
+
+class Instrumentation:
+    """
+    Per-operation latency histograms, error counts and rows returned for the
+    three stores. Store clients report every query through record():
+
+      - PostgreSQL: InstrumentedCursor (SQL/connection.py) times every execute
+      - MongoDB: CommandTimer (MongoDB/connection.py), a pymongo command listener
+      - Neo4j: Neo4jRepository.run_cypher / run_write
+
+    Operations are keyed "<store>:<operation>". Extra hooks added with add_hook()
+    receive every measurement (store, operation, seconds, rows, error), e.g. to
+    forward them to a metrics system. When disabled, record() returns immediately
+    and the store clients skip timing altogether.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.hooks: List[Hook] = []
+        self._stats: Dict[Tuple[str, str], OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Hook) -> None:
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Hook) -> None:
+        self.hooks.remove(hook)
+
+    def record(self, store: str, operation: str, seconds: float, rows: Optional[int] = None, error: bool = False) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stats.get((store, operation))
+            if stats is None:
+                stats = self._stats[(store, operation)] = OperationStats()
+            stats.latency.record(seconds)
+            if error:
+                stats.errors += 1
+            if rows is not None and rows > 0:
+                stats.rows += rows
+        for hook in self.hooks:
+            hook(store, operation, seconds, rows, error)
+
+    @contextmanager
+    def timed(self, store: str, operation: str):
+        """Time the body of a `with` block as one operation; errors are counted and re-raised."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.record(store, operation, time.perf_counter() - start, error=True)
+            raise
+        self.record(store, operation, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """{"<store>:<operation>": {count, errors, rows, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}, ...}"""
+        with self._lock:
+            return {f"{store}:{op}": stats.as_dict() for (store, op), stats in sorted(self._stats.items())}
+
+    def export_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def report(self, top: int = 20) -> str:
+        """Text table of the operations with the highest p99."""
+        rows = sorted(self.snapshot().items(), key=lambda kv: kv[1]["p99_ms"], reverse=True)[:top]
+        lines = [f"{'operation':60} {'count':>8} {'err':>5} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8}"]
+        for name, s in rows:
+            lines.append(f"{name[:60]:60} {s['count']:>8} {s['errors']:>5} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+instrumentation = Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    return instrumentation
+
+
+_SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?: IF NOT EXISTS)?)\s+([\w.]+)", re.IGNORECASE)
+_sql_names: Dict[str, str] = {}
+
+
+def sql_operation_name(query: Any) -> str:
+    """"SELECT profile", "INSERT api_tokens", ... derived from the statement (cached per query text)."""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = str(query)
+    name = _sql_names.get(query)
+    if name is None:
+        words = query.split(None, 1)
+        verb = words[0].upper() if words else "?"
+        table = _SQL_TABLE.search(query)
+        name = f"{verb} {table.group(1)}" if table else verb
+        if len(_sql_names) < 10_000:
+            _sql_names[query] = name
+    return name
+
+
+def register_sql_operation(query: str, name: str) -> None:
+    """Name a statement explicitly, e.g. the EXECUTE of a prepared statement after the statement it runs."""
+    _sql_names[query] = name
+
+
+_cypher_names: Dict[str, str] = {}
+
+
+def cypher_operation_name(query: str) -> str:
+    """Whitespace-collapsed query text, truncated, used as the Neo4j operation name."""
+    name = _cypher_names.get(query)
+    if name is None:
+        name = " ".join(query.split())[:80]
+        if len(_cypher_names) < 10_000:
+            _cypher_names[query] = name
+    return name
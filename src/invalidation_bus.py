@@ -0,0 +1,245 @@
+"""
+Cross-process invalidation of the in-process caches over MongoPostsRepository.
+
+Every process runs one InvalidationBus. It tails a change source (by default
+a MongoDB change stream on posts and post_likes), turns every change into a
+ChangeEvent and hands it to the subscribed handlers, which drop or patch their
+cached entries. Changes made by the process itself come back as well; handlers
+are idempotent, so that only costs a second invalidation.
+
+The bus keeps the resume token of the last delivered change. When the stream
+fails (network error, primary election) it reopens the stream after that
+token, so no change is skipped. If the token has fallen out of the oplog the
+missed changes are unknown: the bus then calls the subscribed reset handlers
+(clear the caches) and continues from the current position. Tokens are not
+persisted: the caches live in process memory, a restarted process starts
+with empty caches and has nothing to catch up on.
+
+Processes serving with TopJodelBackend start the bus from backend.start() when
+the MongoDB deployment supports change streams. The ASGI API
+(AsyncTopJodelBackend) keeps no in-process caches and has nothing to invalidate.
+
+LocalChangeStream is an in-process stand-in for tests and benchmarks without a
+replica set: publish() change documents of the same shape into it.
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Protocol, Tuple
+
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+Handler = Callable[["ChangeEvent"], None]
+
+
+class ResumeTokenLost(Exception):
+    PREFIX = "⚠️ Change stream cannot resume: "
+
+    def __init__(self, message):
+        # store the prefixed message
+        super().__init__(self.PREFIX + str(message))
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    collection: str                 # "posts" or "post_likes"
+    operation: str                  # "insert", "update", "replace" or "delete"
+    document_id: Any                # _id of the changed document
+    user_id: Optional[int] = None   # posts: author, post_likes: liker (not known for deletes)
+    post_id: Optional[str] = None   # posts: the post, post_likes: the liked post (not known for deletes)
+    fields: Dict[str, Any] = field(default_factory=dict)    # updated fields of an update
+
+    @staticmethod
+    def from_change(change: Dict[str, Any]) -> "ChangeEvent":
+        collection = change["ns"]["coll"]
+        document_id = change["documentKey"]["_id"]
+        doc = change.get("fullDocument") or {}
+        fields = dict((change.get("updateDescription") or {}).get("updatedFields") or {})
+        if collection == "posts":
+            post_id = str(document_id)
+        else:
+            post_id = str(doc["post_id"]) if "post_id" in doc else None
+        return ChangeEvent(
+            collection=collection,
+            operation=change["operationType"],
+            document_id=document_id,
+            user_id=int(doc["user_id"]) if "user_id" in doc else None,
+            post_id=post_id,
+            fields=fields,
+        )
+
+
+class ChangeSource(Protocol):
+    def changes(self, resume_token: Any, stop: threading.Event) -> Iterator[Dict[str, Any]]:
+        """
+        Change documents after resume_token (from now when None) until stop is set.
+        Each has the change stream shape: _id (resume token), operationType, ns.coll,
+        documentKey and, where available, fullDocument / updateDescription.
+        Raises ResumeTokenLost when resume_token can no longer be resumed from.
+        """
+        ...
+
+
+def change_streams_available(db) -> bool:
+    """Whether db is served by a replica set or a sharded cluster (change streams need one)."""
+    hello = db.client.admin.command("hello")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+class MongoChangeSource:
+    """Change stream over the given collections of db (requires a replica set)."""
+
+    def __init__(self, db, collections: Tuple[str, ...] = ("posts", "post_likes"), max_await_ms: int = 500):
+        self.db = db
+        self.collections = collections
+        self.max_await_ms = max_await_ms
+
+    def changes(self, resume_token: Any, stop: threading.Event) -> Iterator[Dict[str, Any]]:
+        from pymongo import errors
+
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": list(self.collections)}}},
+            # only what ChangeEvent needs: inserts carry the whole document otherwise
+            {"$project": {
+                "operationType": 1, "ns": 1, "documentKey": 1,
+                "fullDocument.user_id": 1, "fullDocument.post_id": 1,
+                "updateDescription.updatedFields": 1,
+            }},
+        ]
+        try:
+            with self.db.watch(pipeline, resume_after=resume_token, max_await_time_ms=self.max_await_ms) as stream:
+                while not stop.is_set() and stream.alive:
+                    change = stream.try_next()
+                    if change is not None:
+                        yield change
+        except errors.OperationFailure as e:
+            # 286: ChangeStreamHistoryLost, 280: ChangeStreamFatalError
+            if resume_token is not None and e.code in (280, 286):
+                raise ResumeTokenLost(e) from e
+            raise
+
+
+class LocalChangeStream:
+    """
+    In-process change source. publish() appends a change document and assigns its
+    resume token; changes() replays from any token still among the last `history` changes.
+    """
+
+    def __init__(self, history: int = 10_000):
+        self._log: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def publish(self, collection: str, operation: str, document_id: Any, full_document: Optional[Dict[str, Any]] = None,
+                updated_fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        with self._cond:
+            change: Dict[str, Any] = {
+                "_id": {"_data": self._next},
+                "operationType": operation,
+                "ns": {"coll": collection},
+                "documentKey": {"_id": document_id},
+            }
+            if full_document is not None:
+                change["fullDocument"] = full_document
+            if updated_fields is not None:
+                change["updateDescription"] = {"updatedFields": updated_fields}
+            self._next += 1
+            self._log.append(change)
+            self._cond.notify_all()
+            return change
+
+    def changes(self, resume_token: Any, stop: threading.Event) -> Iterator[Dict[str, Any]]:
+        with self._cond:
+            if resume_token is None:
+                position = self._next
+            else:
+                position = resume_token["_data"] + 1
+                if self._log and position < self._log[0]["_id"]["_data"]:
+                    raise ResumeTokenLost(f"token {resume_token} is older than the kept history")
+        while not stop.is_set():
+            with self._cond:
+                if position >= self._next:
+                    self._cond.wait(0.1)
+                    continue
+                first = self._log[0]["_id"]["_data"]
+                if position < first:
+                    raise ResumeTokenLost(f"change {position} was dropped from the kept history")
+                change = self._log[position - first]
+            position += 1
+            yield change
+
+
+class InvalidationBus:
+    def __init__(self, source: ChangeSource, retry_interval: float = 1.0):
+        """
+        :param source: MongoChangeSource, or LocalChangeStream without a replica set
+        :param retry_interval: seconds to wait before reopening a failed stream
+        """
+        self.source = source
+        self.retry_interval = retry_interval
+        self.resume_token: Any = None
+        self.delivered = 0
+
+        self._handlers: List[Handler] = []
+        self._reset_handlers: List[Callable[[], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, handler: Handler, on_reset: Optional[Callable[[], None]] = None) -> None:
+        """
+        Call handler(event) for every change, on the bus thread.
+        :param on_reset: called when changes may have been missed, should drop everything cached
+        """
+        self._handlers.append(handler)
+        if on_reset is not None:
+            self._reset_handlers.append(on_reset)
+
+    def dispatch(self, change: Dict[str, Any]) -> None:
+        """Deliver one change document to the handlers and remember its resume token."""
+        event = ChangeEvent.from_change(change)
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.warning("⚠️ Invalidation handler failed on %s %s: %s", event.operation, event.document_id, e)
+        self.resume_token = change["_id"]
+        self.delivered += 1
+
+    def reset(self) -> None:
+        for on_reset in self._reset_handlers:
+            on_reset()
+
+    # Background thread
+    def start(self) -> None:
+        """Tail the change source in a daemon thread until stop()."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self) -> None:
+        """Tail the source until stop() is called, reopening it after the last resume token on errors."""
+        while not self._stop.is_set():
+            try:
+                for change in self.source.changes(self.resume_token, self._stop):
+                    self.dispatch(change)
+            except ResumeTokenLost as e:
+                logger.warning("%s, resetting the caches", e)
+                self.resume_token = None
+                self.reset()
+            except Exception as e:
+                logger.warning("⚠️ Change stream failed, resuming after %s: %s", self.resume_token, e)
+                if self.resume_token is None:
+                    self.reset()    # nothing to resume from, changes until the reopen are lost
+                self._stop.wait(self.retry_interval)
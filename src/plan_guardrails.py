@@ -0,0 +1,240 @@
+"""
+Query-plan guardrails for the hot queries of all three stores.
+
+Every check asks the database for the plan of a hot query, without running it,
+and fails when the plan no longer uses the intended index. The queries come from
+the repositories themselves (their query builders and statement constants), so a
+changed query is checked as it is run:
+
+  - MongoDB: explain() on the MongoPostsRepository reads must use an IXSCAN on
+    the named index (or the _id fast path) and must not contain a blocking SORT.
+  - PostgreSQL: EXPLAIN on the lookups of SQL/Profil/retrieve.py (including the
+    name lookup of follow_user) and SQL/Authentication/api_token.py must not
+    contain a Seq Scan. Sequential scans are disabled for the EXPLAIN, so on
+    small tables the planner still shows the index it would use at scale; a Seq
+    Scan means no usable index exists.
+  - Neo4j: EXPLAIN on the follow and recommendation queries must seek users
+    through the userId uniqueness constraint or the followers range index
+    instead of scanning the :User label.
+
+Run against the docker compose databases, exits 1 when a plan degraded:
+    python -m src.plan_guardrails
+"""
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from bson import ObjectId
+
+from src.instrumentation import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class PlanCheck:
+    store: str
+    name: str
+    passed: bool
+    detail: str
+
+
+# MongoDB
+def _mongo_stages(plan: Any) -> Iterator[Dict[str, Any]]:
+    """Every stage of an explain() plan, for both the classic and the SBE output format."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan
+        for value in plan.values():
+            yield from _mongo_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _mongo_stages(value)
+
+
+def _query_planner(explain: Dict[str, Any]) -> Dict[str, Any]:
+    # aggregations that are not pushed down whole report the query of their first stage as $cursor
+    if "queryPlanner" in explain:
+        return explain["queryPlanner"]
+    return explain["stages"][0]["$cursor"]["queryPlanner"]
+
+
+def _check_mongo(name: str, explain: Dict[str, Any], indexes: Tuple[str, ...] = ()) -> PlanCheck:
+    """Pass when the plan has no blocking SORT and reads one of indexes (the _id fast path when empty)."""
+    stages = list(_mongo_stages(_query_planner(explain)["winningPlan"]))
+    kinds = [s["stage"] for s in stages]
+    used = {s["indexName"] for s in stages if "indexName" in s}
+
+    if "SORT" in kinds:
+        return PlanCheck("mongodb", name, False, f"in-memory SORT in plan {kinds}")
+    if not indexes:
+        id_lookup = "IDHACK" in kinds or "_id_" in used
+        return PlanCheck("mongodb", name, id_lookup, f"plan {kinds}")
+    return PlanCheck("mongodb", name, bool(used & set(indexes)), f"plan {kinds}, indexes {sorted(used)}")
+
+
+def check_mongo_plans(db) -> List[PlanCheck]:
+    from MongoDB.archive import PostArchiver
+    from MongoDB.mongo_repo import MongoPostsRepository as repo
+
+    (posts_name, likes_name), (archive_name, _) = repo.TIERS
+    posts, likes = db[posts_name], db[likes_name]
+    oid = ObjectId()
+    # 5000 followees (datagen's max_follows), the feed reads them in FEED_CHUNK-sized $in lists
+    chunks = repo.feed_chunks(list(range(1, 5001)))
+    return [
+        _check_mongo(
+            "get_posts_by_user", repo.posts_cursor(posts, [1], 20).explain(), ("user_id_1_created_at_-1",),
+        ),
+        # the $in ranges of a full chunk are merged in created_at order (SORT_MERGE), not sorted in memory
+        _check_mongo(
+            f"get_posts_by_users ({len(chunks)} chunks of {len(chunks[0])})",
+            repo.posts_cursor(posts, chunks[0], 20).explain(),
+            ("user_id_1_created_at_-1",),
+        ),
+        _check_mongo("get_post_by_id", posts.find(repo.owner_query(oid, None)).limit(1).explain()),
+        # MongoDB/archive.py: profile pages past the hot posts, and the next batch to archive
+        _check_mongo(
+            "get_posts_by_user (archive)",
+            repo.posts_cursor(db[archive_name], [1], 20).explain(),
+            ("user_id_1_created_at_-1",),
+        ),
+        _check_mongo(
+            "archive_batch",
+            PostArchiver.oldest_cursor(posts, datetime.now(timezone.utc), 500).explain(),
+            ("created_at_-1",),
+        ),
+        _check_mongo(
+            "add_like", likes.find(repo.like_upsert(oid, 1)[0]).limit(1).explain(), ("post_id_1_user_id_1",),
+        ),
+        _check_mongo(
+            "like_affinity",
+            db.command("explain", {"aggregate": likes_name, "pipeline": repo.affinity_pipeline(1), "cursor": {}},
+                       verbosity="queryPlanner"),
+            ("user_id_1_created_at_-1",),
+        ),
+        _check_mongo(
+            "get_like_count",
+            db.command("explain", {"count": likes_name, "query": repo.likes_query(oid)}, verbosity="queryPlanner"),
+            ("post_id_1", "post_id_1_user_id_1"),
+        ),
+    ]
+
+
+# PostgreSQL
+def sql_hot_queries() -> Dict[str, Tuple[str, Tuple[Any, ...]]]:
+    """name -> (statement, example parameters) of the hot SQL lookups."""
+    from SQL.Authentication import api_token
+    from SQL.Profil import retrieve
+    from SQL.query_builder import unprepared_text
+
+    # follow_user looks the user to follow up by first OR last name
+    by_name = retrieve.profile_ids_statement("OR", ("first_name", "last_name"))
+    names = {"first_name": "Max", "last_name": "Muller"}
+    return {
+        "retrieve_profile_by_id": (retrieve.PROFILE_BY_ID_QUERY, (1,)),
+        "retrieve_profiles_by_user_id": (retrieve.PROFILES_BY_USER_ID_QUERY, (1,)),
+        "retrieve_profiles_by_user_ids": (retrieve.PROFILES_BY_USER_IDS_QUERY, ([1, 2, 3],)),
+        "retrieve_profile_by_username": (retrieve.PROFILE_BY_USERNAME_QUERY, ("test",)),
+        "retrieve_profile_ids": (unprepared_text(by_name), tuple(names[column] for column in by_name.params)),
+        "validate_token": (api_token.VALIDATE_TOKEN_QUERY, (1, "token", datetime.now(timezone.utc))),
+        "revoke_token": (api_token.REVOKE_TOKEN_QUERY, ("token",)),
+    }
+
+
+def _sql_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _sql_nodes(child)
+
+
+def check_sql_plans(conn) -> List[PlanCheck]:
+    checks = []
+    with conn.cursor() as cur:
+        cur.execute("SET enable_seqscan = off;")
+        try:
+            for name, (query, params) in sql_hot_queries().items():
+                cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+                nodes = list(_sql_nodes(cur.fetchone()[0][0]["Plan"]))
+                kinds = [n["Node Type"] for n in nodes]
+                seq_scans = [n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"]
+                if seq_scans:
+                    checks.append(PlanCheck("postgres", name, False, f"Seq Scan on {', '.join(seq_scans)}"))
+                else:
+                    indexes = [n["Index Name"] for n in nodes if "Index Name" in n]
+                    checks.append(PlanCheck("postgres", name, True, f"plan {kinds}, indexes {indexes}"))
+        finally:
+            cur.execute("RESET enable_seqscan;")
+    return checks
+
+
+# Neo4j
+LABEL_SCANS = {"NodeByLabelScan", "AllNodesScan"}
+
+
+def _cypher_operators(plan: Dict[str, Any]) -> Iterator[str]:
+    # operator types carry a runtime suffix since Neo4j 5, e.g. NodeUniqueIndexSeek@neo4j
+    yield plan["operatorType"].split("@")[0]
+    for child in plan.get("children", []):
+        yield from _cypher_operators(child)
+
+
+def check_cypher_plans(driver) -> List[PlanCheck]:
+    from NeoDB.neo4j_repo import Neo4jRepository
+    from src.recommendations import FollowRecommender
+
+    queries = {
+        "follow": (Neo4jRepository.FOLLOW_QUERY, {"follower": 1, "followee": 2}),
+        "follow_many": (Neo4jRepository.FOLLOW_MANY_QUERY, {"follower": 1, "followees": [2, 3]}),
+        "unfollow": (Neo4jRepository.UNFOLLOW_QUERY, {"follower": 1, "followee": 2}),
+        "get_follow_counts": (Neo4jRepository.FOLLOW_COUNTS_QUERY, {"user_ids": [1, 2]}),
+        "recommend_follows": (FollowRecommender.FOF_QUERY, {"user_id": 1, "k": 10}),
+        # most followed users through the followers range index, not a scan of every FOLLOWS edge
+        "recommend_popular": (FollowRecommender.POPULAR_QUERY, FollowRecommender.popular_params(1, 10, 0)),
+    }
+    checks = []
+    with driver.session() as session:
+        for name, (query, params) in queries.items():
+            plan = session.run("EXPLAIN " + query, params).consume().plan
+            operators: Set[str] = set(_cypher_operators(plan))
+            scans = operators & LABEL_SCANS
+            seeks = {o for o in operators if "IndexSeek" in o}
+            if scans or not seeks:
+                checks.append(PlanCheck("neo4j", name, False, f"operators {sorted(operators)}"))
+            else:
+                checks.append(PlanCheck("neo4j", name, True, f"seeks {sorted(seeks)}"))
+    return checks
+
+
+def run_checks() -> List[PlanCheck]:
+    from src.resources import get_registry
+
+    registry = get_registry()
+    checks = check_mongo_plans(registry.mongo_db())
+    with registry.sql_connection() as conn:
+        checks += check_sql_plans(conn)
+    checks += check_cypher_plans(registry.neo4j_driver())
+    return checks
+
+
+def main() -> int:
+    configure_logging()
+    failed = 0
+    for check in run_checks():
+        if check.passed:
+            logger.info("✅ %s %s: %s", check.store, check.name, check.detail)
+        else:
+            failed += 1
+            logger.error("❌ %s %s: %s", check.store, check.name, check.detail)
+    if failed:
+        logger.error("❌ %s query plan(s) degraded", failed)
+        return 1
+    logger.info("✅ all query plans use their indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
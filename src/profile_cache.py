@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from SQL.outbox import RETENTION_SECONDS, fetch_user_changes, outbox_head
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+UserId = int
+Profile = Dict[str, Any]
+
+
+class ProfileCache:
+    """
+    Bounded LRU cache of SQL profiles keyed by user_id.
+
+    get_many() answers what it can from memory and loads all misses with a single
+    call to the loader (one batched SQL query). Entries are dropped with
+    invalidate() whenever a profile changes, and the least recently used entries
+    are evicted once max_size is reached. A load that an invalidate() overlapped
+    is returned to its caller but not stored.
+
+    Changes made by other processes reach the cache through the user outbox
+    (SQL/outbox.py): start() polls it every refresh_interval seconds in a daemon
+    thread and invalidates the users of every event, like UserSearchIndex.refresh.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[List[UserId]], Dict[UserId, Profile]],
+        max_size: int = 10_000,
+        refresh_interval: float = 1.0,
+    ):
+        """
+        :param refresh_interval: seconds between outbox polls of the background refresher
+        """
+        self.loader = loader
+        self.max_size = max_size
+        self.refresh_interval = refresh_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[UserId, Profile]" = OrderedDict()
+        # loads in flight per user, and bumped by invalidate() while one is, so its result is not stored
+        self._loading: Dict[UserId, int] = {}
+        self._generations: Dict[UserId, int] = {}
+        self._lock = threading.Lock()
+
+        self._position: Optional[Tuple[int, int]] = None
+        self._refreshed_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get_many(self, user_ids: Iterable[UserId]) -> Dict[UserId, Profile]:
+        found, missing, generations = self._lookup(user_ids)
+        if missing:
+            loaded: Dict[UserId, Profile] = {}
+            try:
+                loaded = self.loader(missing)
+            finally:
+                self._store(missing, loaded, generations)
+            found.update(loaded)
+        return found
+
+    def invalidate(self, user_id: UserId) -> None:
+        self.invalidate_many([user_id])
+
+    def invalidate_many(self, user_ids: Iterable[UserId]) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                user_id = int(user_id)
+                if user_id in self._loading:
+                    self._generations[user_id] = self._generations.get(user_id, 0) + 1
+                self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for user_id in self._loading:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, user_ids: Iterable[UserId]) -> Tuple[Dict[UserId, Profile], List[UserId], Dict[UserId, int]]:
+        found: Dict[UserId, Profile] = {}
+        missing: List[UserId] = []
+        with self._lock:
+            for user_id in dict.fromkeys(int(u) for u in user_ids):
+                profile = self._entries.get(user_id)
+                if profile is None:
+                    missing.append(user_id)
+                else:
+                    self._entries.move_to_end(user_id)
+                    found[user_id] = profile
+            self.hits += len(found)
+            self.misses += len(missing)
+            generations = {}
+            for user_id in missing:
+                self._loading[user_id] = self._loading.get(user_id, 0) + 1
+                generations[user_id] = self._generations.get(user_id, 0)
+        return found, missing, generations
+
+    def _store(self, missing: List[UserId], profiles: Dict[UserId, Profile], generations: Dict[UserId, int]) -> None:
+        with self._lock:
+            for user_id in missing:
+                if user_id in profiles and self._generations.get(user_id, 0) == generations[user_id]:
+                    self._entries[user_id] = profiles[user_id]
+                    self._entries.move_to_end(user_id)
+                self._loading[user_id] -= 1
+                if not self._loading[user_id]:
+                    del self._loading[user_id]
+                    self._generations.pop(user_id, None)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    # Freshness
+    def refresh(self, batch_size: int = 1000) -> int:
+        """
+        Invalidate the users of the outbox events since the last refresh. The first
+        refresh, and one that fell behind the outbox retention (events may be
+        pruned), clears the cache and continues from the outbox head.
+        :return: number of events applied
+        """
+        now = time.monotonic()
+        if self._position is None or now - self._refreshed_at > RETENTION_SECONDS:
+            self._position = outbox_head()
+            self.clear()
+            self._refreshed_at = now
+            return 0
+        applied = 0
+        while True:
+            events = fetch_user_changes(self._position, batch_size)
+            if events:
+                self.invalidate_many({e["user_id"] for e in events})
+                self._position = (events[-1]["txid"], events[-1]["id"])
+                applied += len(events)
+            if len(events) < batch_size:
+                break
+        self._refreshed_at = now
+        return applied
+
+    # Background refresher
+    def start(self) -> None:
+        """Poll the outbox every refresh_interval seconds in a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="profile-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self) -> None:
+        """Refresh until stop() is called; errors are logged and retried on the next poll."""
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("⚠️ Profile cache refresh failed: %s", e)
+            self._stop.wait(self.refresh_interval)
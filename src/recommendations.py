@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+from MongoDB.mongo_repo import MongoPostsRepository
+from NeoDB.follow_graph import FollowGraph
+from NeoDB.neo4j_repo import Neo4jRepository
+from src.instrumentation import get_logger
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+logger = get_logger(__name__)
+
+UserId = int
+
+
+class FollowRecommender:
+    """
+    "Who to follow" recommendations computed from the follow graph snapshot.
+
+    Scoring
+      - mutual: number of people the user follows who follow the candidate,
+        i.e. the (user, candidate) entry of A @ A for adjacency matrix A
+      - score: mutual * (1 + topic_weight * cosine(liked topics of user, liked topics of candidate))
+
+    precompute() scores every user in row blocks with sparse matrix products and
+    caches the top candidates per user; start() reruns it in a daemon thread
+    whenever the batch is older than max_age. Users missing from the cache
+    (registered or first followed someone after the last run) are answered with
+    a Cypher friends-of-friends query, falling back to the most followed users.
+
+    The popular fallback reads the maintained User.followers counter through its
+    range index: it takes the `scan` most followed users (k plus everyone the user
+    may already follow or already got recommended, see popular_params()) instead
+    of counting every FOLLOWS edge in the graph.
+    """
+
+    FOF_QUERY = """
+        MATCH (u:User {userId: $user_id})-[:FOLLOWS]->(:User)-[:FOLLOWS]->(c:User)
+        WHERE c <> u AND NOT (u)-[:FOLLOWS]->(c)
+        RETURN c.userId AS user_id, count(*) AS mutual
+        ORDER BY mutual DESC, user_id
+        LIMIT $k
+    """
+
+    POPULAR_QUERY = """
+        MATCH (c:User)
+        WHERE c.followers > 0
+        WITH c ORDER BY c.followers DESC LIMIT $scan
+        WHERE c.userId <> $user_id AND NOT EXISTS { (:User {userId: $user_id})-[:FOLLOWS]->(c) }
+        RETURN c.userId AS user_id, c.followers AS followers
+        ORDER BY followers DESC, user_id
+        LIMIT $k
+    """
+
+    def __init__(
+        self,
+        follow_graph: FollowGraph,
+        neo_repo: Neo4jRepository,
+        posts_repo: Optional[MongoPostsRepository] = None,
+        topic_weight: float = 0.5,
+        max_age: float = 3600.0,
+        check_interval: float = 60.0,
+    ):
+        """
+        :param max_age: seconds after which the precomputed batch is stale
+        :param check_interval: seconds between staleness checks of the background refresher
+        """
+        self.follow_graph = follow_graph
+        self.neo_repo = neo_repo
+        self.posts_repo = posts_repo
+        self.topic_weight = topic_weight
+        self.max_age = max_age
+        self.check_interval = check_interval
+
+        self._cache: Dict[UserId, List[Dict[str, Any]]] = {}
+        self._computed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Batch job
+    def precompute(self, k: int = 50, batch_size: int = 4096) -> int:
+        """
+        Score two-hop candidates for every user in the snapshot and cache the top k.
+        :param k: number of recommendations kept per user
+        :param batch_size: users scored per sparse product, bounds peak memory together
+            with the number of two-hop candidates of those users
+        :return: number of users with at least one recommendation
+        """
+        from scipy import sparse  # only the batch job needs scipy
+
+        user_ids, indptr, indices = self.follow_graph.snapshot()
+        n = len(user_ids)
+        adjacency = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(n, n)
+        )
+
+        topics = self._topic_matrix(user_ids) if self.posts_repo is not None and self.topic_weight else None
+
+        cache: Dict[UserId, List[Dict[str, Any]]] = {}
+        for start in range(0, n, batch_size):
+            rows = adjacency[start:start + batch_size]
+            mutual = (rows @ adjacency).tocsr()
+
+            # drop the users themselves and everyone they already follow
+            seen = rows + sparse.eye(rows.shape[0], n, k=start, dtype=np.float32, format="csr")
+            mutual = (mutual - mutual.multiply(seen > 0)).tocsr()
+            mutual.eliminate_zeros()
+            mutual.sort_indices()
+
+            score = mutual.data
+            if topics is not None:
+                # cosine only at the (user, candidate) pairs of mutual, not over every user
+                pair_rows = start + np.repeat(np.arange(mutual.shape[0]), np.diff(mutual.indptr))
+                similarity = np.asarray(topics[pair_rows].multiply(topics[mutual.indices]).sum(axis=1)).ravel()
+                score = mutual.data * (1.0 + self.topic_weight * similarity)
+
+            # score is aligned with mutual.data
+            for r in range(mutual.shape[0]):
+                lo, hi = mutual.indptr[r], mutual.indptr[r + 1]
+                if lo == hi:
+                    continue
+                cols = mutual.indices[lo:hi]
+                values = score[lo:hi]
+                top = np.argsort(-values, kind="stable")[:k]
+                cache[int(user_ids[start + r])] = [
+                    {"user_id": int(user_ids[c]), "mutual": int(m), "score": float(s)}
+                    for c, m, s in zip(cols[top], mutual.data[lo:hi][top], values[top])
+                ]
+
+        with self._lock:
+            self._cache = cache
+            self._computed_at = time.monotonic()
+        logger.info("✅ Precomputed follow recommendations for %s users", len(cache))
+        return len(cache)
+
+    def _topic_matrix(self, user_ids: np.ndarray) -> sparse.csr_matrix:
+        """Row-normalised user x topic matrix of liked-post topic counts."""
+        from scipy import sparse
+
+        rows: List[int] = []
+        cols: List[int] = []
+        counts: List[float] = []
+        topic_index: Dict[str, int] = {}
+        for user_id, topic, count in self.posts_repo.liked_topics_by_user():
+            i = int(np.searchsorted(user_ids, user_id))
+            if i >= len(user_ids) or user_ids[i] != user_id:
+                continue
+            rows.append(i)
+            cols.append(topic_index.setdefault(topic, len(topic_index)))
+            counts.append(count)
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (rows, cols)),
+            shape=(len(user_ids), max(len(topic_index), 1)),
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+    def is_stale(self) -> bool:
+        return self._computed_at is None or time.monotonic() - self._computed_at > self.max_age
+
+    def start(self) -> None:
+        """Precompute in a daemon thread now and whenever the batch becomes stale."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="follow-recommender", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self) -> None:
+        """Check staleness every check_interval seconds until stop(); errors are retried on the next check."""
+        while not self._stop.is_set():
+            if self.is_stale():
+                try:
+                    self.precompute()
+                except Exception as e:
+                    logger.warning("⚠️ Precomputing follow recommendations failed: %s", e)
+            self._stop.wait(self.check_interval)
+
+    # Serving
+    def recommend_follows(self, user_id: UserId, k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Recommend up to k users for user_id to follow.
+        :return: [{"user_id": <int>, "mutual": <int>, "score": <float>}, ...]
+        """
+        cached = self._cache.get(int(user_id))
+        if cached:
+            return cached[:k]
+        return self._from_graph(user_id, k)
+
+    @staticmethod
+    def popular_params(user_id: UserId, k: int, following: int, known: int = 0) -> Dict[str, int]:
+        """
+        POPULAR_QUERY parameters: the scan skips at most `following` followed users and
+        the user itself, and returns `known` extra rows for the friends-of-friends
+        recommendations merge_popular drops.
+        """
+        limit = int(k) + int(known)
+        return {"user_id": int(user_id), "k": limit, "scan": limit + int(following) + 1}
+
+    @staticmethod
+    def merge_popular(recommendations: List[Dict[str, Any]], popular, k: int) -> List[Dict[str, Any]]:
+        """Fill friends-of-friends recommendations up to k with popular users not already in them."""
+        known = {r["user_id"] for r in recommendations}
+        recommendations = recommendations + [
+            {"user_id": r["user_id"], "mutual": 0, "score": 0.0}
+            for r in popular if r["user_id"] not in known
+        ]
+        return recommendations[:k]
+
+    def _from_graph(self, user_id: UserId, k: int) -> List[Dict[str, Any]]:
+        rows = self.neo_repo.run_cypher(self.FOF_QUERY, {"user_id": int(user_id), "k": int(k)})
+        recommendations = [{"user_id": r["user_id"], "mutual": r["mutual"], "score": float(r["mutual"])} for r in rows]
+        if len(recommendations) < k:
+            following = len(self.follow_graph.followees(user_id))
+            params = self.popular_params(user_id, k, following, len(recommendations))
+            popular = self.neo_repo.run_cypher(self.POPULAR_QUERY, params)
+            recommendations = self.merge_popular(recommendations, popular, k)
+        return recommendations[:k]
+
+    def discard(self, user_id: UserId, followed_id: UserId) -> None:
+        """Drop a user that was just followed from the cached recommendations."""
+        with self._lock:
+            cached = self._cache.get(int(user_id))
+            if cached:
+                self._cache[int(user_id)] = [r for r in cached if r["user_id"] != int(followed_id)]
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from SQL.connection import SQLConnectionPool
+
+_registries: "weakref.WeakSet[ResourceRegistry]" = weakref.WeakSet()
+
+
+class ResourceRegistry:
+    """
+    Owns one pooled client per store for the current process:
+      - MongoDB: a MongoClient (connection pool built in)
+      - Neo4j: a driver (connection pool built in)
+      - PostgreSQL: a SQLConnectionPool
+
+    Clients are created lazily on first use and shared by every caller; the
+    driver package of a store is only imported when its client is first needed.
+    close() (or leaving a `with` block) shuts all of them down.
+
+    Fork safety: a forked child must not reuse its parent's sockets, so after a
+    fork every registry forgets the inherited clients (without closing them,
+    they still belong to the parent) and the child creates its own on first use.
+    """
+
+    def __init__(
+        self,
+        mongo_db_name: str = "appdb",
+        mongo_max_pool_size: int = 100,
+        mongo_min_pool_size: int = 0,
+        neo4j_max_pool_size: int = 100,
+        neo4j_acquisition_timeout: float = 60.0,
+        sql_min_conn: int = 1,
+        sql_max_conn: int = 10,
+        sql_acquisition_timeout: float = 30.0,
+    ):
+        self.mongo_db_name = mongo_db_name
+        self.mongo_options: Dict[str, Any] = {"maxPoolSize": mongo_max_pool_size, "minPoolSize": mongo_min_pool_size}
+        self.neo4j_options: Dict[str, Any] = {
+            "max_connection_pool_size": neo4j_max_pool_size,
+            "connection_acquisition_timeout": neo4j_acquisition_timeout,
+        }
+        self.sql_options: Dict[str, Any] = {
+            "minconn": sql_min_conn,
+            "maxconn": sql_max_conn,
+            "timeout": sql_acquisition_timeout,
+        }
+
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._mongo = None
+        self._neo4j = None
+        self._sql: Optional[SQLConnectionPool] = None
+        _registries.add(self)
+
+    # Accessors
+    def mongo_client(self):
+        self._check_pid()
+        if self._mongo is None:
+            with self._lock:
+                if self._mongo is None:
+                    from MongoDB.connection import create_mongo_client
+                    self._mongo = create_mongo_client(**self.mongo_options)
+        return self._mongo
+
+    def mongo_db(self):
+        return self.mongo_client()[self.mongo_db_name]
+
+    def neo4j_driver(self):
+        self._check_pid()
+        if self._neo4j is None:
+            with self._lock:
+                if self._neo4j is None:
+                    from NeoDB.connection import create_neo4j_driver
+                    self._neo4j = create_neo4j_driver(**self.neo4j_options)
+        return self._neo4j
+
+    def sql_pool(self) -> SQLConnectionPool:
+        self._check_pid()
+        if self._sql is None:
+            with self._lock:
+                if self._sql is None:
+                    from SQL.connection import create_sql_pool
+                    self._sql = create_sql_pool(**self.sql_options)
+        return self._sql
+
+    def sql_connection(self):
+        """Borrow a pooled connection; it is returned when its `with` block ends."""
+        return self.sql_pool().getconn()
+
+    # Lifecycle
+    def close(self) -> None:
+        with self._lock:
+            mongo, neo4j, sql = self._mongo, self._neo4j, self._sql
+            self._mongo = self._neo4j = self._sql = None
+        if mongo is not None:
+            mongo.close()
+        if neo4j is not None:
+            neo4j.close()
+        if sql is not None:
+            sql.closeall()
+
+    def __enter__(self) -> "ResourceRegistry":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._after_fork()
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._mongo = self._neo4j = self._sql = None
+
+
+def _after_fork_in_child() -> None:
+    for registry in list(_registries):
+        registry._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+_default: Optional[ResourceRegistry] = None
+_default_lock = threading.Lock()
+
+
+def configure_registry(**options) -> ResourceRegistry:
+    """
+    Replace the process-wide registry with one built from options (see ResourceRegistry).
+    Call before the first database access to size the pools.
+    """
+    global _default
+    with _default_lock:
+        previous, _default = _default, ResourceRegistry(**options)
+    if previous is not None:
+        previous.close()
+    return _default
+
+
+def get_registry() -> ResourceRegistry:
+    """The process-wide registry, created with default pool sizes on first use."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = ResourceRegistry()
+    return _default
+
+
+def close_registry() -> None:
+    global _default
+    with _default_lock:
+        registry, _default = _default, None
+    if registry is not None:
+        registry.close()
+
+
+atexit.register(close_registry)
@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+# SQL
+from SQL.connection import create_async_sql_pool
+from SQL.Authentication.api_token import generate_token
+from SQL.sql_error import AuthenticationError, ProfileError, TokenError
+
+# MongoDB
+from MongoDB.connection import create_async_mongo_client
+from MongoDB.mongo_repo import MongoPostsRepository, NotOwner, Post, PostNotFound
+from pymongo import ReturnDocument, errors
+
+# Neo4j
+from NeoDB.connection import create_async_neo4j_driver
+from NeoDB.neo4j_repo import Neo4jRepository, UserNotFound
+from src.recommendations import FollowRecommender
+from src.instrumentation import cypher_operation_name, get_logger, instrumentation, sql_operation_name
+
+logger = get_logger(__name__)
+
+
+class AsyncTopJodelBackend:
+    """
+    asyncio version of TopJodelBackend built on asyncpg, pymongo's AsyncMongoClient
+    and the async Neo4j driver.
+
+    Lookups that do not depend on each other (token validation, followee fetch,
+    profile reads) are issued concurrently in an asyncio.TaskGroup (see _gather),
+    so a call costs roughly its slowest store instead of the sum of all of them,
+    and the first failure cancels the others. Every store call runs under a
+    timeout (timeout seconds by default, overridable per call) and raises
+    TimeoutError when it expires.
+
+    Use as `async with AsyncTopJodelBackend() as backend:` or call start() / aclose().
+    """
+
+    def __init__(
+        self,
+        timeout: float = 5.0,
+        mongo_db_name: str = "appdb",
+        mongo_max_pool_size: int = 100,
+        neo4j_max_pool_size: int = 100,
+        sql_min_conn: int = 1,
+        sql_max_conn: int = 10,
+    ):
+        self.timeout = timeout
+        self.mongo_db_name = mongo_db_name
+        self.mongo_max_pool_size = mongo_max_pool_size
+        self.neo4j_max_pool_size = neo4j_max_pool_size
+        self.sql_min_conn = sql_min_conn
+        self.sql_max_conn = sql_max_conn
+
+        self.sql_pool = None
+        self.mongo_client = None
+        self.neo4j_driver = None
+
+    # Lifecycle
+    async def start(self) -> "AsyncTopJodelBackend":
+        self.sql_pool = await create_async_sql_pool(self.sql_min_conn, self.sql_max_conn)
+        self.mongo_client = create_async_mongo_client(maxPoolSize=self.mongo_max_pool_size)
+        self.neo4j_driver = create_async_neo4j_driver(max_connection_pool_size=self.neo4j_max_pool_size)
+        db = self.mongo_client[self.mongo_db_name]
+        # hot tier first, like MongoPostsRepository
+        self.tiers = [(db[posts], db[likes]) for posts, likes in MongoPostsRepository.TIERS]
+        (self.posts, self.likes), (self.archived_posts, self.archived_likes) = self.tiers
+        return self
+
+    async def aclose(self) -> None:
+        if self.sql_pool is not None:
+            await self.sql_pool.close()
+        if self.mongo_client is not None:
+            await self.mongo_client.close()
+        if self.neo4j_driver is not None:
+            await self.neo4j_driver.close()
+        self.sql_pool = self.mongo_client = self.neo4j_driver = None
+
+    async def __aenter__(self) -> "AsyncTopJodelBackend":
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+
+    async def _timed(self, coro, timeout: Optional[float] = None, store: str = "", operation: str = ""):
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout or self.timeout):
+                result = await coro
+        except BaseException:
+            if store:
+                instrumentation.record(store, operation, time.perf_counter() - start, error=True)
+            raise
+        if store:
+            rows = len(result) if isinstance(result, list) else None
+            instrumentation.record(store, operation, time.perf_counter() - start, rows=rows)
+        return result
+
+    @staticmethod
+    async def _gather(*coros) -> List[Any]:
+        """
+        Run coros concurrently and return their results in order. The first failure
+        cancels the others and is raised as is, not wrapped in an ExceptionGroup.
+        """
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(coro) for coro in coros]
+        except BaseExceptionGroup as e:
+            error: BaseException = e
+            while isinstance(error, BaseExceptionGroup):
+                error = error.exceptions[0]
+            raise error
+        return [task.result() for task in tasks]
+
+    # Store helpers
+    async def _sql_fetch(self, query: str, *args, timeout: Optional[float] = None):
+        return await self._timed(self.sql_pool.fetch(query, *args), timeout, "postgres", sql_operation_name(query))
+
+    async def _sql_fetchrow(self, query: str, *args, timeout: Optional[float] = None):
+        return await self._timed(self.sql_pool.fetchrow(query, *args), timeout, "postgres", sql_operation_name(query))
+
+    async def _cypher(self, query: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None):
+        async def run():
+            async with self.neo4j_driver.session() as session:
+                result = await session.run(query, params or {})
+                return [record async for record in result]
+        return await self._timed(run(), timeout, "neo4j", cypher_operation_name(query))
+
+    async def _cypher_write(self, query: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None):
+        async def work(tx):
+            result = await tx.run(query, params or {})
+            records = [record async for record in result]
+            summary = await result.consume()
+            return records, summary.counters
+
+        async def run():
+            async with self.neo4j_driver.session() as session:
+                return await session.execute_write(work)
+        return await self._timed(run(), timeout, "neo4j", cypher_operation_name(query))
+
+    async def _validate_token(self, user_id: int, token: str, timeout: Optional[float] = None) -> None:
+        row = await self._sql_fetchrow(
+            "SELECT user_id FROM api_tokens WHERE user_id = $1 AND token = $2 AND expires_at > $3",
+            int(user_id), token, datetime.now(timezone.utc), timeout=timeout,
+        )
+        if row is None:
+            raise TokenError("Invalid or expired token")
+
+    async def _followees(self, user_id: int, timeout: Optional[float] = None) -> List[int]:
+        rows = await self._cypher(
+            "MATCH (:User {userId: $user_id})-[:FOLLOWS]->(f:User) RETURN f.userId AS user_id",
+            {"user_id": int(user_id)}, timeout=timeout,
+        )
+        return [r["user_id"] for r in rows]
+
+    async def _find_post(self, oid, projection: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None):
+        """The post document from posts, or from posts_archive once it was archived."""
+        for posts, _ in self.tiers:
+            doc = await self._timed(posts.find_one({"_id": oid}, projection), timeout)
+            if doc is not None:
+                return doc
+        return None
+
+    async def _missing(self, oid, timeout: Optional[float] = None) -> Exception:
+        """The error for an owner-checked write on oid that matched no post."""
+        if await self._find_post(oid, {"_id": 1}, timeout) is not None:
+            return NotOwner("user is not the owner of the post")
+        return PostNotFound("post not found")
+
+    async def _posts_by_users(self, user_ids: List[int], limit: int, skip: int = 0, timeout: Optional[float] = None) -> List[Post]:
+        async def page(chunk: List[int], limit: int, skip: int) -> List[Dict[str, Any]]:
+            return [d async for d in MongoPostsRepository.posts_cursor(self.posts, chunk, limit, skip)]
+
+        async def run():
+            chunks = MongoPostsRepository.feed_chunks(user_ids)
+            if len(chunks) <= 1:
+                docs = await page(chunks[0], limit, skip) if chunks else []
+            else:
+                # one query per chunk, see MongoPostsRepository.get_posts_by_users
+                pages = await self._gather(*(page(chunk, skip + limit, 0) for chunk in chunks))
+                docs = MongoPostsRepository.merge_newest(pages, limit, skip)
+            return [Post.from_doc(d) for d in docs]
+        return await self._timed(run(), timeout)
+
+    # Sessions
+    async def login(self, email: str, password: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Check the password and issue an api token, like SQL.Authentication.user.login_user.
+        bcrypt runs in a worker thread so it does not block the event loop.
+        :return: {"user_id": <int>, "token": <str>}
+        """
+        import bcrypt
+
+        row = await self._sql_fetchrow(
+            "SELECT id, password_hash FROM users WHERE email = $1", email.strip(), timeout=timeout,
+        )
+        if row is None:
+            raise AuthenticationError(f"User with email '{email}' does not exist.")
+        ok = await asyncio.to_thread(bcrypt.checkpw, password.strip().encode("utf-8"), row["password_hash"].encode("utf-8"))
+        if not ok:
+            raise AuthenticationError("Incorrect password.")
+
+        token = generate_token()
+        await self._timed(self.sql_pool.execute(
+            "INSERT INTO api_tokens (token, user_id, expires_at) VALUES ($1, $2, $3)",
+            token, row["id"], datetime.now(timezone.utc) + timedelta(hours=24),
+        ), timeout, "postgres", "INSERT api_tokens")
+        return {"user_id": row["id"], "token": token}
+
+    async def authenticate(self, token: str, timeout: Optional[float] = None) -> int:
+        """user_id owning a valid token. Raises TokenError otherwise."""
+        row = await self._sql_fetchrow(
+            "SELECT user_id FROM api_tokens WHERE token = $1 AND expires_at > $2",
+            token, datetime.now(timezone.utc), timeout=timeout,
+        )
+        if row is None:
+            raise TokenError("Invalid or expired token")
+        return row["user_id"]
+
+    async def logout(self, token: str, timeout: Optional[float] = None) -> bool:
+        result = await self._timed(
+            self.sql_pool.execute("DELETE FROM api_tokens WHERE token = $1", token),
+            timeout, "postgres", "DELETE api_tokens",
+        )
+        return result != "DELETE 0"
+
+    # Posts
+    async def create_post(self, user_id: int, title: str, text: str, topics: Optional[List[str]] = None,
+                          timeout: Optional[float] = None) -> str:
+        now = datetime.now(timezone.utc)
+        doc = {
+            "user_id": int(user_id), "title": title, "text": text, "topics": topics or [],
+            "likes": 0, "created_at": now, "updated_at": now,
+        }
+        res = await self._timed(self.posts.insert_one(doc), timeout)
+        return str(res.inserted_id)
+
+    async def get_post(self, post_id: str, timeout: Optional[float] = None) -> Post:
+        doc = await self._find_post(MongoPostsRepository._oid(post_id), timeout=timeout)
+        if not doc:
+            raise PostNotFound(f"post {post_id} not found")
+        return Post.from_doc(doc)
+
+    async def edit_post(self, post_id: str, user_id: int, title: Optional[str] = None, text: Optional[str] = None,
+                        topics: Optional[List[str]] = None, timeout: Optional[float] = None) -> Post:
+        """Update the given fields of a post owned by user_id, see MongoPostsRepository.edit_post. Raises NotOwner / PostNotFound."""
+        oid = MongoPostsRepository._oid(post_id)
+        update = MongoPostsRepository.edit_update(title=title, text=text, topics=topics)
+        if update is None:
+            return await self.get_post(post_id, timeout)
+
+        query = MongoPostsRepository.owner_query(oid, user_id)
+        for posts, _ in self.tiers:
+            doc = await self._timed(posts.find_one_and_update(query, update, return_document=ReturnDocument.AFTER), timeout)
+            if doc:
+                return Post.from_doc(doc)
+        raise await self._missing(oid, timeout)
+
+    async def delete_post(self, post_id: str, user_id: int, timeout: Optional[float] = None) -> bool:
+        """Delete a post owned by user_id and its likes, see MongoPostsRepository.delete_post. Raises NotOwner / PostNotFound."""
+        oid = MongoPostsRepository._oid(post_id)
+        query = MongoPostsRepository.owner_query(oid, user_id)
+        # both tiers: a post being archived can be in both for a moment
+        deleted = 0
+        for posts, likes in self.tiers:
+            res = await self._timed(posts.delete_one(query), timeout)
+            if res.deleted_count:
+                await self._timed(likes.delete_many({"post_id": oid}), timeout)
+                deleted += 1
+        if not deleted:
+            raise await self._missing(oid, timeout)
+        return True
+
+    async def add_like(self, post_id: str, user_id: int, timeout: Optional[float] = None) -> bool:
+        """
+        Like a post once per user, see MongoPostsRepository.add_like. The like is
+        stored next to the post, in the archive tier for archived posts.
+        Returns true if the like was created. Raises PostNotFound.
+        """
+        oid = MongoPostsRepository._oid(post_id)
+        like_filter, like_update = MongoPostsRepository.like_upsert(oid, user_id)
+        for posts, likes in self.tiers:
+            if await self._timed(posts.find_one({"_id": oid}, {"_id": 1}), timeout) is None:
+                continue
+            try:
+                res = await self._timed(likes.update_one(like_filter, like_update, upsert=True), timeout)
+            except errors.DuplicateKeyError:
+                return False
+            if res.upserted_id is None:
+                return False
+            inc = await self._timed(posts.update_one({"_id": oid}, {"$inc": {"likes": 1}}), timeout)
+            if inc.matched_count:
+                return True
+            # archived in between: move the like to the archive tier
+            await self._timed(likes.delete_one(like_filter), timeout)
+        raise PostNotFound("post not found")
+
+    # Operations
+    async def get_news_feed(self, user_id: int, limit: int = 10, token: str = "", skip: int = 0, timeout: Optional[float] = None) -> List[Post]:
+        """
+        Latest posts of the users that user_id follows, newest first.
+        Token validation and the followee fetch run concurrently.
+        """
+        lookups = [self._followees(user_id, timeout)]
+        if token:
+            lookups.append(self._validate_token(user_id, token, timeout))
+        followees, *_ = await self._gather(*lookups)
+
+        if not followees:
+            return []
+        return await self._posts_by_users(followees, limit, skip, timeout)
+
+    async def get_profile_card(self, user_id: int, posts: int = 3, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Profile, follow counters and latest posts of a user, read from all three stores concurrently.
+        :return: {"profile": {...}, "followers": <int>, "following": <int>, "posts": [Post, ...]}
+        """
+        profile, counts, latest = await self._gather(
+            self._sql_fetchrow(
+                "SELECT id, user_id, username, first_name, last_name, updated_at FROM profile WHERE user_id = $1",
+                int(user_id), timeout=timeout,
+            ),
+            self.get_follow_counts([user_id], timeout),
+            self._posts_by_users([int(user_id)], posts, timeout=timeout),
+        )
+        if profile is None:
+            raise ProfileError(f"Profile not found for user_id {user_id}")
+        return {"profile": dict(profile), **counts[int(user_id)], "posts": latest}
+
+    async def follow(self, user_id: int, target_user_id: int, timeout: Optional[float] = None) -> bool:
+        """Follow a user by id. Returns true if the follow was created."""
+        if int(user_id) == int(target_user_id):
+            raise ValueError("Users cannot follow themselves.")
+        records, counters = await self._cypher_write(
+            Neo4jRepository.FOLLOW_QUERY, {"follower": int(user_id), "followee": int(target_user_id)}, timeout,
+        )
+        if not records:
+            raise UserNotFound(f"user {user_id} or {target_user_id} not found")
+        return counters.relationships_created > 0
+
+    async def follow_many(self, user_id: int, target_ids: List[int], timeout: Optional[float] = None) -> List[int]:
+        """Follow several users by id in one round trip. Returns the ids that are now followed."""
+        target_ids = list(dict.fromkeys(int(i) for i in target_ids))
+        if not target_ids:
+            return []
+        records, _ = await self._cypher_write(
+            Neo4jRepository.FOLLOW_MANY_QUERY, {"follower": int(user_id), "followees": target_ids}, timeout,
+        )
+        return [r["followee"] for r in records]
+
+    async def unfollow(self, user_id: int, target_user_id: int, timeout: Optional[float] = None) -> bool:
+        """Unfollow a user by id. Returns true if a follow was removed."""
+        _, counters = await self._cypher_write(
+            Neo4jRepository.UNFOLLOW_QUERY, {"follower": int(user_id), "followee": int(target_user_id)}, timeout,
+        )
+        return counters.relationships_deleted > 0
+
+    async def follow_user(self, logged_in_user_id: int, name_to_follow: str = "", last_name_to_follow: str = "",
+                          token: str = "", timeout: Optional[float] = None):
+        """
+        Follow the first user matching the first or last name.
+        Name resolution and token validation run concurrently.
+        """
+        lookups = [self._sql_fetchrow(
+            "SELECT user_id FROM profile WHERE first_name = $1 OR last_name = $2 ORDER BY id LIMIT 1",
+            name_to_follow.strip(), last_name_to_follow.strip(), timeout=timeout,
+        )]
+        if token:
+            lookups.append(self._validate_token(logged_in_user_id, token, timeout))
+        row, *_ = await self._gather(*lookups)
+
+        if row is None:
+            logger.warning("No profile found for name: %s %s", name_to_follow, last_name_to_follow)
+            return f"No profile found for name: {name_to_follow} {last_name_to_follow}"
+
+        await self.follow(logged_in_user_id, row["user_id"], timeout)
+        logger.info("Successfully followed %s %s", name_to_follow, last_name_to_follow)
+
+    async def get_follow_counts(self, user_ids: List[int], timeout: Optional[float] = None) -> Dict[int, Dict[str, int]]:
+        """Follower / following counters of several users, see Neo4jRepository.get_follow_counts."""
+        user_ids = list(dict.fromkeys(int(i) for i in user_ids))
+        counts = {user_id: {"followers": 0, "following": 0} for user_id in user_ids}
+        if user_ids:
+            rows = await self._cypher(Neo4jRepository.FOLLOW_COUNTS_QUERY, {"user_ids": user_ids}, timeout)
+            for r in rows:
+                counts[r["user_id"]] = {"followers": r["followers"], "following": r["following"]}
+        return counts
+
+    async def recommend_follows(self, user_id: int, k: int = 10, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Friends-of-friends recommendations straight from the graph (no precomputed batch),
+        filled up with the most followed users only when they are fewer than k.
+        """
+        fof, counts = await self._gather(
+            self._cypher(FollowRecommender.FOF_QUERY, {"user_id": int(user_id), "k": int(k)}, timeout),
+            self.get_follow_counts([user_id], timeout),
+        )
+        recommendations = [{"user_id": r["user_id"], "mutual": r["mutual"], "score": float(r["mutual"])} for r in fof]
+        if len(recommendations) < k:
+            params = FollowRecommender.popular_params(
+                user_id, k, counts[int(user_id)]["following"], len(recommendations),
+            )
+            popular = await self._cypher(FollowRecommender.POPULAR_QUERY, params, timeout)
+            recommendations = FollowRecommender.merge_popular(recommendations, popular, k)
+        return recommendations[:k]
@@ -1,48 +1,340 @@
+from dataclasses import asdict, replace
+
 # SQL
-from SQL.Authentication.user import *
-from SQL.Profil.retrieve import *
+from SQL.Authentication.api_token import validate_token
+from SQL.Authentication.user import delete_user, register_user
+from SQL.Profil.change import change_profile
+from SQL.Profil.retrieve import retrieve_profile_by_id, retrieve_profile_ids, retrieve_profiles_by_user_ids
+from SQL.sql_error import TokenError
 
 # MongoDB
 from MongoDB.mongo_repo import MongoPostsRepository
-from MongoDB.connection import get_mongo_client
 
 # Neo4j
 from NeoDB.neo4j_repo import Neo4jRepository
-from NeoDB.connection import get_neo4j_driver
+from NeoDB.follow_graph import FollowGraph
+
+from src.feed_cache import FeedCache
+from src.feed_ranking import FeedRanker, RankingWeights
+from src.invalidation_bus import ChangeEvent, ChangeSource, InvalidationBus, MongoChangeSource, change_streams_available
+from src.profile_cache import ProfileCache
+from src.recommendations import FollowRecommender
+from src.resources import ResourceRegistry, get_registry
+from src.user_search import UserSearchIndex
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+# Post fields that an update event can patch into cached feed pages
+_PATCHABLE_FIELDS = frozenset({"title", "text", "topics", "likes", "updated_at"})
 
 
 class TopJodelBackend():
+    """
+    Entry point of the TopJodel backend.
+
+    All store clients come from a ResourceRegistry (the process-wide one by
+    default), so every backend instance and every call reuses the same warm
+    connection pools. close() releases what this backend owns; the registry
+    itself is only closed if it was passed in with owns_resources=True.
+
+    start() runs the background jobs of a serving process (snapshot reconcile,
+    recommendation batch, cross-process cache invalidation, user search index);
+    close() stops them.
+    """
+
+    def __init__(
+        self,
+        resources: ResourceRegistry | None = None,
+        owns_resources: bool = False,
+        mongo_repo: MongoPostsRepository | None = None,
+        neo_repo: Neo4jRepository | None = None,
+    ):
+        self.resources = resources or get_registry()
+        self.owns_resources = owns_resources
+
+        # Repositories can be passed in, e.g. backed by in-process stand-ins for benchmarks
+        self.mongo_repo = mongo_repo or MongoPostsRepository(db=self.resources.mongo_db())
+        self.neo_repo = neo_repo or Neo4jRepository(self.resources.neo4j_driver())
 
-    def __init__(self):
-        client = get_mongo_client()
-        self.mongo_repo = MongoPostsRepository(db=client["appdb"])
+        # Followee / follower lookups are served from an in-process snapshot
+        self.follow_graph = FollowGraph(self.neo_repo)
+        self.recommender = FollowRecommender(self.follow_graph, self.neo_repo, self.mongo_repo)
+
+        # Author profiles for feed pages, invalidated by change_profile
+        self.profile_cache = ProfileCache(retrieve_profiles_by_user_ids)
+
+        # First feed page per user, invalidated by posts of followees and follow changes
+        self.feed_cache = FeedCache()
+
+        # Ranked feed mode, see get_news_feed(ranked=True)
+        self.feed_ranker = FeedRanker(self.mongo_repo)
+
+        # Post changes of other processes, see start_invalidation()
+        self.invalidation_bus: InvalidationBus | None = None
+
+        # Typeahead user search, loaded and kept fresh from the user outbox by start()
+        self.user_search = UserSearchIndex(self.neo_repo.get_follow_counts)
+
+    def start(self, invalidation_source: ChangeSource | None = None) -> "TopJodelBackend":
+        """
+        Start the background jobs of a serving process: the follow graph
+        reconciler, the recommendation batch (recomputed when stale), the
+        invalidation bus (see start_invalidation), the user search index
+        (loaded here, then refreshed from the user outbox) and the profile
+        cache's outbox refresher. Also creates the Neo4j indexes the queries
+        rely on.
+        :param invalidation_source: change source of the bus; without one the bus tails a MongoDB
+            change stream if the deployment is a replica set, and is not started otherwise
+        """
+        self.neo_repo.create_indexes()
+        self.follow_graph.start_reconciler()
+        self.recommender.start()
+        self.user_search.start()
+        self.profile_cache.start()
+        if invalidation_source is not None or change_streams_available(self.mongo_repo.db):
+            self.start_invalidation(invalidation_source)
+        else:
+            logger.info("MongoDB is not a replica set, cross-process cache invalidation is off")
+        return self
 
-        driver = get_neo4j_driver()
-        self.neo_repo = Neo4jRepository(driver)
+    def close(self):
+        self.follow_graph.stop_reconciler()
+        self.recommender.stop()
+        self.user_search.stop()
+        self.profile_cache.stop()
+        if self.invalidation_bus is not None:
+            self.invalidation_bus.stop()
+        self.mongo_repo.stop_views()
+        if self.owns_resources:
+            self.resources.close()
 
+    def __enter__(self):
+        return self
 
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-    def get_news_feed(self, user_id: int, limit: int = 10, token: str = ""):
+    def get_news_feed(self, user_id: int, limit: int = 10, token: str = "", skip: int = 0, with_authors: bool = False,
+                      ranked: bool = False, weights: RankingWeights | None = None):
+        """
+        Latest posts of the users that user_id follows, newest first.
+        :param user_id:
+        :param limit: number of posts
+        :param token: api token of user_id, validated when given
+        :param skip: number of posts to skip (paging)
+        :param with_authors: return posts enriched with author info (see hydrate_authors)
+        :param ranked: order by recency, likes and the user's author / topic affinity instead (see FeedRanker)
+        :param weights: ranking weights for this call, defaults to feed_ranker.weights
+        :return: list of Post, or list of dicts if with_authors
+        """
+        if token and validate_token(user_id, token) is None:
+            raise TokenError("Invalid or expired token")
 
-        client = get_mongo_client()
-        db = client['appdb']
-        posts_repo = MongoPostsRepository(db)
+        if ranked:
+            posts = self.feed_ranker.rank(user_id, self.follow_graph.followees(user_id).tolist(), limit, skip, weights)
+        elif skip + limit <= self.feed_cache.first_k:
+            first_page = self.feed_cache.get_or_compute(
+                user_id, lambda: self._compute_feed(user_id, self.feed_cache.first_k, 0)
+            )
+            posts = first_page[skip:skip + limit]
+        else:
+            posts = self._compute_feed(user_id, limit, skip)
+        return self.hydrate_authors(posts) if with_authors else posts
 
-        driver = get_neo4j_driver()
+    def _compute_feed(self, user_id: int, limit: int, skip: int):
+        followees = self.follow_graph.followees(user_id)
+        if len(followees) == 0:
+            return []
+        return self.mongo_repo.get_posts_by_users(followees.tolist(), limit=limit, skip=skip)
 
-        neo_repo = Neo4jRepository(driver)
+    # Cross-process invalidation
+    def start_invalidation(self, source: ChangeSource | None = None) -> InvalidationBus:
+        """
+        Keep the feed cache and the ranking affinities of this process in sync
+        with post and like changes made by other processes, by tailing a change
+        stream in a background thread. Needed as soon as more than one process serves
+        requests; called by start(), stopped by close().
+        :param source: change source, a MongoDB change stream on the posts database by default
+        """
+        if self.invalidation_bus is None:
+            self.invalidation_bus = InvalidationBus(source or MongoChangeSource(self.mongo_repo.db))
+            self.invalidation_bus.subscribe(self._apply_change, on_reset=self._reset_caches)
+        self.invalidation_bus.start()
+        return self.invalidation_bus
 
-        # Query the neo4j database to get the list of user IDs that the given user follows
-        list_users = neo_repo.run_cypher()
+    def _apply_change(self, event: ChangeEvent) -> None:
+        if event.collection == "posts":
+            if event.operation == "insert" and event.user_id is not None:
+                self.feed_cache.invalidate_many(self.follow_graph.followers(event.user_id).tolist())
+            elif event.operation == "update" and event.fields.keys() <= _PATCHABLE_FIELDS:
+                # likes counters and edits: keep the cached pages, rewrite the post in them
+                self.feed_cache.patch_post(event.post_id, lambda post: replace(post, **event.fields))
+            else:
+                self.feed_cache.invalidate_post(event.post_id)
+        elif event.collection == "post_likes" and event.user_id is not None:
+            self.feed_ranker.invalidate(event.user_id)
 
-        # Get the latest posts from those users
+    def _reset_caches(self) -> None:
+        self.feed_cache.clear()
+        self.feed_ranker.clear()
 
+    def feed_cache_stats(self) -> dict:
+        """Hit / miss counters and hit rate of the feed cache."""
+        return self.feed_cache.stats()
 
-        # Fetch posts for the news feed
-        posts = posts_repo.get_posts_by_user(user_id=user_id, limit=limit)
+    def create_post(self, user_id: int, title: str, text: str, topics: list[str] | None = None) -> str:
+        """
+        Create a post and invalidate the cached feeds of the author's followers.
+        :return: id of the new post
+        """
+        post_id = self.mongo_repo.create_post(user_id, title, text, topics)
+        self.feed_cache.invalidate_many(self.follow_graph.followers(user_id).tolist())
+        return post_id
 
-        return posts
+    def delete_post(self, post_id: str, user_id: int | None = None) -> bool:
+        """
+        Delete a post (only if owned by user_id, when given) and invalidate the
+        cached feeds of the author's followers.
+        """
+        author_id = user_id if user_id is not None else self.mongo_repo.get_post_by_id(post_id).user_id
+        deleted = self.mongo_repo.delete_post(post_id, user_id)
+        self.feed_cache.invalidate_many(self.follow_graph.followers(author_id).tolist())
+        return deleted
 
+    def hydrate_authors(self, posts):
+        """
+        Enrich posts with the username and name of their authors.
+        Distinct authors of the page are served from the profile cache, all misses
+        are fetched with one batched SQL query.
+        :param posts: list of Post
+        :return: [{**post fields, "author": {"user_id", "username", "first_name", "last_name"} or None}, ...]
+        """
+        profiles = self.profile_cache.get_many(post.user_id for post in posts)
+
+        hydrated = []
+        for post in posts:
+            profile = profiles.get(post.user_id)
+            author = None
+            if profile is not None:
+                author = {
+                    "user_id": profile["user_id"],
+                    "username": profile["username"],
+                    "first_name": profile["first_name"],
+                    "last_name": profile["last_name"],
+                }
+            hydrated.append({**asdict(post), "author": author})
+        return hydrated
+
+    def register_user(self, username: str, email: str, password: str, first_name: str, last_name: str) -> int:
+        """
+        Register a user (see SQL.Authentication.user.register_user) and make it
+        searchable in this process right away; other processes pick it up from the outbox.
+        :return: id of the new user
+        """
+        user_id = register_user(username, email, password, first_name, last_name)
+        self.user_search.refresh_users([user_id])
+        return user_id
+
+    def delete_user(self, user_id: int, token: str, email: str, password: str) -> bool:
+        """Delete a user (see SQL.Authentication.user.delete_user) and drop it from the caches of this process."""
+        deleted = delete_user(user_id, token, email, password)
+        self.profile_cache.invalidate(user_id)
+        self.user_search.refresh_users([user_id])
+        return deleted
+
+    def change_profile(self, token: str, user_id: int, profile_id: int, new_profile_data: dict) -> bool:
+        """
+        Change a profile (see SQL.Profil.change.change_profile) and drop the
+        cached copy used for feed hydration.
+        """
+        changed = change_profile(token, user_id, profile_id, new_profile_data)
+        self.profile_cache.invalidate(user_id)
+        self.user_search.refresh_users([user_id])
+        return changed
+
+    def search_users(self, prefix: str, k: int = 10) -> list[dict]:
+        """
+        Search-as-you-type: the k most followed users whose username, first name,
+        last name or "first last" starts with prefix (case-insensitive), served from
+        the in-memory index (see UserSearchIndex). Changes of other processes are
+        picked up by user_search.start().
+        :param prefix: what the user typed so far
+        :param k: number of matches
+        :return: [{"user_id", "username", "first_name", "last_name", "followers"}, ...]
+        """
+        return self.user_search.search(prefix, k)
+
+    def recommend_follows(self, user_id: int, k: int = 10):
+        """
+        Recommend users to follow, ranked by mutual follows and shared liked topics.
+        Served from the precomputed batch (see FollowRecommender.precompute) with a
+        Cypher friends-of-friends fallback for users that are not in it yet.
+        :param user_id:
+        :param k: number of recommendations
+        :return: [{"user_id": <int>, "mutual": <int>, "score": <float>}, ...]
+        """
+        return self.recommender.recommend_follows(user_id, k)
+
+    def follow(self, user_id: int, target_user_id: int) -> bool:
+        """
+        Follow a user by id. Writes the FOLLOWS relationship by the constrained userId
+        in one Cypher round trip, without any SQL lookups.
+        :param user_id: id of the user who follows
+        :param target_user_id: id of the user to follow
+        :return: true if the follow was created, false if it already existed
+        """
+        if int(user_id) == int(target_user_id):
+            raise ValueError("Users cannot follow themselves.")
+
+        created = self.neo_repo.follow(user_id, target_user_id)
+        self.follow_graph.add_edge(user_id, target_user_id)
+        self.recommender.discard(user_id, target_user_id)
+        self.feed_cache.invalidate(user_id)
+        if created:
+            self.user_search.adjust_followers(target_user_id, 1)
+        return created
+
+    def follow_many(self, user_id: int, target_ids: list[int]) -> list[int]:
+        """
+        Follow several users by id in one Cypher round trip.
+        Unknown ids and the user itself are skipped.
+        :param user_id: id of the user who follows
+        :param target_ids: ids of the users to follow
+        :return: ids of the users that are now followed
+        """
+        followed = self.neo_repo.follow_many(user_id, target_ids)
+        for target_user_id in followed:
+            # follow_many also reports follows that already existed
+            if not self.follow_graph.is_following(user_id, target_user_id):
+                self.user_search.adjust_followers(target_user_id, 1)
+            self.follow_graph.add_edge(user_id, target_user_id)
+            self.recommender.discard(user_id, target_user_id)
+        self.feed_cache.invalidate(user_id)
+        return followed
+
+    def unfollow(self, user_id: int, target_user_id: int) -> bool:
+        """
+        Unfollow a user by id.
+        :param user_id: id of the user who unfollows
+        :param target_user_id: id of the user to unfollow
+        :return: true if a follow was removed
+        """
+        removed = self.neo_repo.unfollow(user_id, target_user_id)
+        self.follow_graph.remove_edge(user_id, target_user_id)
+        self.feed_cache.invalidate(user_id)
+        if removed:
+            self.user_search.adjust_followers(target_user_id, -1)
+        return removed
+
+    def get_follow_counts(self, user_ids: list[int]) -> dict[int, dict[str, int]]:
+        """
+        Follower / following counts for several users, read from the counters kept
+        on the user nodes instead of counting relationships.
+        :param user_ids:
+        :return: {user_id: {"followers": <int>, "following": <int>}, ...}
+        """
+        return self.neo_repo.get_follow_counts(user_ids)
 
     def follow_user(self, logged_in_user_id: int, name_to_follow: str="", last_name_to_follow:str = ""):
         """
@@ -57,29 +349,14 @@ class TopJodelBackend():
 
         query = {"first_name": name_to_follow, "last_name": last_name_to_follow}
         profile_ids = retrieve_profile_ids("OR", query)
-        print(f"Found profiles: {profile_ids}")
+        logger.debug("Found profiles: %s", profile_ids)
 
         if len(profile_ids) > 0:
             follow_profile_id = profile_ids[0][0]
-            print(f"Following profile id: {follow_profile_id}")
-            username_to_follow = retrieve_profile_by_id(follow_profile_id)["username"]
-            username_logged_in = retrieve_profiles_by_user_id(logged_in_user_id)[0]["username"]
-            print(f"Logged in: {username_logged_in}")
-
-            query = """
-        MATCH (a:User {username: $logged_in}),
-              (b:User {username: $to_follow})
-        MERGE (a)-[:FOLLOWS]->(b)
-        """
-
-            self.neo_repo.run_cypher(
-                query,
-                {
-                    "logged_in": username_logged_in,
-                    "to_follow": username_to_follow
-                }
-            )
-            print(f"Successfully followed {name_to_follow} {last_name_to_follow}")
+            logger.debug("Following profile id: %s", follow_profile_id)
+            user_id_to_follow = retrieve_profile_by_id(follow_profile_id)["user_id"]
+            self.follow(logged_in_user_id, user_id_to_follow)
+            logger.info("Successfully followed %s %s", name_to_follow, last_name_to_follow)
         else:
-            print(f"No profile found for name: {name_to_follow} {last_name_to_follow}")
+            logger.warning("No profile found for name: %s %s", name_to_follow, last_name_to_follow)
             return f"No profile found for name: {name_to_follow} {last_name_to_follow}"
\ No newline at end of file
@@ -0,0 +1,313 @@
+"""
+Search-as-you-type over users, served from memory.
+
+Every user is indexed under its username, first name, last name and display
+name ("first last"), case-folded. The keys live in one sorted list with a
+parallel array of user rows, so the users matching a prefix are one contiguous
+range found by binary search. Matches are ranked by follower count; for short,
+wide prefixes the best candidates of the range are memoised.
+
+Profiles are loaded in chunks from PostgreSQL through a server-side cursor,
+follower counts from the Neo4j counters. start() does that load and then
+follows the user outbox (SQL/outbox.py) in a daemon thread, from the head it
+saw before loading: every registration, profile change and deletion makes
+refresh() re-read that user's current profile into a small overlay that is
+merged into the sorted arrays once it exceeds compact_threshold users, in the
+style of FollowGraph. Follower counts are adjusted by the backend on follows /
+unfollows and re-read on every full reload.
+
+search() never loads: until start() (or load()) has run it finds nothing.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from SQL.outbox import RETENTION_SECONDS, fetch_user_changes, outbox_head
+from SQL.Profil.retrieve import iter_profile_chunks, retrieve_profiles_by_user_ids
+from src.instrumentation import get_logger
+
+logger = get_logger(__name__)
+
+UserId = int
+FollowerCounts = Callable[[List[UserId]], Dict[UserId, Dict[str, int]]]
+
+_MAX_CHAR = "\U0010ffff"
+
+
+def normalize(text: Optional[str]) -> str:
+    return " ".join(str(text or "").casefold().split())
+
+
+@dataclass(frozen=True)
+class SearchEntry:
+    user_id: UserId
+    username: str
+    first_name: str
+    last_name: str
+    followers: int = 0
+
+    @property
+    def keys(self) -> Tuple[str, ...]:
+        names = (self.username, self.first_name, self.last_name, f"{self.first_name} {self.last_name}")
+        return tuple(dict.fromkeys(key for key in map(normalize, names) if key))
+
+    def as_dict(self, followers: Optional[int] = None) -> Dict[str, object]:
+        return {
+            "user_id": self.user_id, "username": self.username, "first_name": self.first_name,
+            "last_name": self.last_name, "followers": self.followers if followers is None else followers,
+        }
+
+
+class _Sorted:
+    """Immutable sorted key list over a set of entries; followers stay mutable."""
+
+    def __init__(self, entries: List[SearchEntry]):
+        # rows in username order, so ties on followers rank like search() does
+        self.entries = entries = sorted(entries, key=lambda e: e.username)
+        self.rows: Dict[UserId, int] = {e.user_id: i for i, e in enumerate(entries)}
+        self.followers = np.fromiter((e.followers for e in entries), dtype=np.int64, count=len(entries))
+        pairs = sorted((key, row) for row, e in enumerate(entries) for key in e.keys)
+        self.keys: List[str] = [key for key, _ in pairs]
+        self.key_rows = np.fromiter((row for _, row in pairs), dtype=np.int32, count=len(pairs))
+        self.top: Dict[str, np.ndarray] = {}     # prefix -> best rows, for wide ranges
+
+    def range(self, prefix: str) -> Tuple[int, int]:
+        return bisect.bisect_left(self.keys, prefix), bisect.bisect_left(self.keys, prefix + _MAX_CHAR)
+
+    def best_rows(self, prefix: str, n: int, memo_size: int) -> np.ndarray:
+        """Rows of the n most followed users with a key starting with prefix, best first."""
+        lo, hi = self.range(prefix)
+        cached = self.top.get(prefix)
+        if cached is not None and len(cached) >= min(n, hi - lo):
+            return cached[:n]
+        rows = self.key_rows[lo:hi]
+        # a user has at most 4 keys, so the 4n best keys (and their ties) hold the n best users
+        if len(rows) > 4 * n:
+            followers = self.followers[rows]
+            cutoff = -np.partition(-followers, 4 * n - 1)[4 * n - 1]
+            rows = rows[followers >= cutoff]
+        rows = rows[np.lexsort((rows, -self.followers[rows]))]
+        best = np.fromiter(dict.fromkeys(rows.tolist()), dtype=np.int64)[:n]
+        if hi - lo > memo_size:
+            self.top[prefix] = best
+        return best
+
+    def adjust_followers(self, row: int, delta: int) -> None:
+        """
+        Change the follower count of row and drop the memoised prefixes it can reorder:
+        prefixes of its keys, except after a decrease those whose best rows do not hold it.
+        """
+        self.followers[row] = max(0, self.followers[row] + delta)
+        if not self.top:
+            return
+        for key in self.entries[row].keys:
+            for end in range(1, len(key) + 1):
+                best = self.top.get(key[:end])
+                if best is not None and (delta > 0 or row in best):
+                    del self.top[key[:end]]
+
+
+class UserSearchIndex:
+    def __init__(
+        self,
+        follower_counts: FollowerCounts,
+        chunk_size: int = 5000,
+        refresh_interval: float = 1.0,
+        reload_interval: float = 3600.0,
+        compact_threshold: int = 500,
+        memo_size: int = 2000,
+    ):
+        """
+        :param follower_counts: {user_id: {"followers": n, ...}} for a list of users, e.g. Neo4jRepository.get_follow_counts
+        :param chunk_size: profiles per chunk while loading
+        :param refresh_interval: seconds between outbox polls of the background refresher
+        :param reload_interval: seconds between full reloads (fresh follower counts)
+        :param compact_threshold: changed users kept in the overlay before the arrays are rebuilt
+        :param memo_size: ranges wider than this many keys memoise their best users
+        """
+        self.follower_counts = follower_counts
+        self.chunk_size = chunk_size
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self.compact_threshold = compact_threshold
+        self.memo_size = memo_size
+
+        self._base = _Sorted([])
+        self._changed: Dict[UserId, Optional[SearchEntry]] = {}    # None: user deleted
+        self._position: Tuple[int, int] = (0, 0)
+        self._loaded_at: Optional[float] = None
+        self._refreshed_at = 0.0
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._warned = False
+
+    # Loading
+    def load(self) -> None:
+        """Build the index from all profiles and follow the outbox from its current head."""
+        with self._load_lock:
+            start = time.perf_counter()
+            position = outbox_head()
+            entries: List[SearchEntry] = []
+            for chunk in iter_profile_chunks(self.chunk_size):
+                counts = self.follower_counts([p["user_id"] for p in chunk])
+                entries.extend(self._entry(p, counts) for p in chunk)
+            base = _Sorted(entries)
+            with self._lock:
+                self._base, self._changed = base, {}
+                self._position = position
+                self._loaded_at = self._refreshed_at = time.monotonic()
+            logger.info("✅ User search index loaded: %s users, %s keys in %.0f ms",
+                        len(entries), len(base.keys), (time.perf_counter() - start) * 1000)
+
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded_at is None:
+            self.load()
+
+    @staticmethod
+    def _entry(profile: Dict[str, object], counts: Dict[UserId, Dict[str, int]]) -> SearchEntry:
+        user_id = int(profile["user_id"])
+        return SearchEntry(
+            user_id=user_id,
+            username=str(profile["username"]),
+            first_name=str(profile["first_name"]),
+            last_name=str(profile["last_name"]),
+            followers=int(counts.get(user_id, {}).get("followers", 0)),
+        )
+
+    # Freshness
+    def refresh(self, batch_size: int = 1000) -> int:
+        """
+        Apply the outbox events since the last refresh. A full reload replaces this when
+        the last refresh is older than the outbox retention (events may be pruned) or
+        than reload_interval. :return: number of events applied
+        """
+        self._ensure_loaded()
+        now = time.monotonic()
+        if now - self._refreshed_at > RETENTION_SECONDS or now - self._loaded_at > self.reload_interval:
+            self.load()
+            return 0
+        applied = 0
+        while True:
+            events = fetch_user_changes(self._position, batch_size)
+            if events:
+                self.refresh_users({e["user_id"] for e in events})
+                with self._lock:
+                    self._position = (events[-1]["txid"], events[-1]["id"])
+                applied += len(events)
+            if len(events) < batch_size:
+                break
+        self._refreshed_at = now
+        return applied
+
+    def refresh_users(self, user_ids: Iterable[UserId]) -> None:
+        """Re-read the profiles of user_ids; users without one are removed."""
+        user_ids = [int(u) for u in user_ids]
+        if not user_ids or not self.is_loaded():
+            return
+        profiles = retrieve_profiles_by_user_ids(user_ids)
+        counts = self.follower_counts(list(profiles)) if profiles else {}
+        with self._lock:
+            for user_id in user_ids:
+                profile = profiles.get(user_id)
+                self._changed[user_id] = None if profile is None else self._entry(profile, counts)
+            if len(self._changed) > self.compact_threshold:
+                self._compact()
+
+    def adjust_followers(self, user_id: UserId, delta: int) -> None:
+        """Apply a follow (+1) or unfollow (-1) of user_id made by this process."""
+        user_id = int(user_id)
+        with self._lock:
+            entry = self._changed.get(user_id)
+            if entry is not None:
+                self._changed[user_id] = SearchEntry(
+                    entry.user_id, entry.username, entry.first_name, entry.last_name, max(0, entry.followers + delta),
+                )
+            elif user_id not in self._changed:
+                row = self._base.rows.get(user_id)
+                if row is not None:
+                    self._base.adjust_followers(row, delta)
+
+    def _compact(self) -> None:
+        base = self._base
+        entries = [
+            SearchEntry(e.user_id, e.username, e.first_name, e.last_name, int(base.followers[i]))
+            for i, e in enumerate(base.entries) if e.user_id not in self._changed
+        ]
+        entries.extend(e for e in self._changed.values() if e is not None)
+        self._base, self._changed = _Sorted(entries), {}
+
+    # Search
+    def search(self, prefix: str, k: int = 10) -> List[Dict[str, object]]:
+        """
+        The k most followed users with a username, first name, last name or display
+        name starting with prefix (case-insensitive).
+        :return: [{"user_id", "username", "first_name", "last_name", "followers"}, ...]
+        """
+        query = normalize(prefix)
+        if not query or k <= 0:
+            return []
+        if not self.is_loaded():
+            if not self._warned:
+                logger.warning("⚠️ User search index is not loaded yet, call start() first")
+                self._warned = True
+            return []
+        with self._lock:
+            base, changed = self._base, dict(self._changed)
+
+        # base rows of changed users may be stale: ask for that many more and skip them
+        shadowed = sum(1 for user_id in changed if user_id in base.rows
+                       and any(key.startswith(query) for key in base.entries[base.rows[user_id]].keys))
+        results = [
+            base.entries[row].as_dict(int(base.followers[row]))
+            for row in base.best_rows(query, k + shadowed, self.memo_size).tolist()
+            if base.entries[row].user_id not in changed
+        ]
+        results.extend(
+            e.as_dict() for e in changed.values()
+            if e is not None and any(key.startswith(query) for key in e.keys)
+        )
+        results.sort(key=lambda r: (-r["followers"], r["username"]))
+        return results[:k]
+
+    def __len__(self) -> int:
+        with self._lock:
+            removed = sum(1 for user_id in self._changed if user_id in self._base.rows)
+            added = sum(1 for e in self._changed.values() if e is not None)
+            return len(self._base.entries) - removed + added
+
+    # Background refresher
+    def start(self) -> None:
+        """Load the index (if not loaded yet), then poll the outbox every refresh_interval seconds in a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._ensure_loaded()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="user-search", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self) -> None:
+        """Refresh until stop() is called; errors are logged and retried on the next poll."""
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("⚠️ User search refresh failed: %s", e)
+            self._stop.wait(self.refresh_interval)